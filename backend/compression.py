@@ -0,0 +1,98 @@
+"""
+Response compression middleware (brotli when the client accepts it and the
+`brotli` package is installed, gzip otherwise).
+
+Responses are buffered and compressed in one go, which suits the JSON API;
+streaming responses (e.g. text/event-stream) and already-encoded bodies pass
+through untouched.
+"""
+
+import gzip
+from typing import List, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+PASSTHROUGH_TYPES = (b"text/event-stream",)
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    """True if `coding` is listed in Accept-Encoding with a non-zero q value."""
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() != coding:
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        if brotli is not None and _accepts(accept, "br"):
+            coding = "br"
+        elif _accepts(accept, "gzip"):
+            coding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body = bytearray()
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = next((v for k, v in headers if k == b"content-type"), b"")
+                if any(k == b"content-encoding" for k, _ in headers) or content_type.startswith(PASSTHROUGH_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough:
+                await send(message)
+                return
+
+            body.extend(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            headers: List[Tuple[bytes, bytes]] = [(k, v) for k, v in start_message.get("headers", []) if k != b"content-length"]
+            payload = bytes(body)
+            if len(payload) >= self.minimum_size:
+                if coding == "br":
+                    payload = brotli.compress(payload, quality=self.brotli_quality)
+                else:
+                    payload = gzip.compress(payload, compresslevel=self.gzip_level)
+                headers.append((b"content-encoding", coding.encode()))
+                headers.append((b"vary", b"Accept-Encoding"))
+            headers.append((b"content-length", str(len(payload)).encode()))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": payload})
+
+        await self.app(scope, receive, wrapped_send)
@@ -1,17 +1,34 @@
 import os
+import time
+import asyncio
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any
-from supabase import create_client, Client
+from fastapi.responses import JSONResponse, FileResponse, Response
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 
 # Import services
-from .services.analysis_engine import analyze_market_state
+from .services.dashboard_state import parse_fields, fetch_full_state, fetch_state_delta, fetch_versions
 from .services.sync_service import GoldDataSyncer
+from .services import fastjson
+from .services.rollups import fetch_history
+from .services.candles import fetch_candles, pivots_from_candles
+from .services.correlations import STATE_KEY as CORRELATION_STATE_KEY
+from .services.alerts import STATE_KEY as ALERT_STATE_KEY, Rule
+from .services.singleflight import SingleFlight
+from .services.storage import get_storage
+from .services.storage.aio import get_async_reader
+from .compression import CompressionMiddleware
+from .profiling import ProfilingMiddleware, list_profiles, artifact_path, PROFILE_DIR
 
 load_dotenv()
 
-app = FastAPI(title="Goldtracer PRO Backend API")
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available (stdlib json otherwise)."""
+    def render(self, content: Any) -> bytes:
+        return fastjson.dumps(content)
+
+app = FastAPI(title="Goldtracer PRO Backend API", default_response_class=FastJSONResponse)
 
 # Configure CORS for Vercel & local development
 app.add_middleware(
@@ -21,11 +38,28 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# brotli/gzip for every sizeable response (the full-state payload shrinks ~5-10x)
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+# Opt-in profiling (PROFILE_ENABLED=1, or ?profile=1 on cron/admin routes); outermost so serialization is included
+app.add_middleware(ProfilingMiddleware)
+
+# Storage Setup: Supabase by default, direct Postgres or SQLite via STORAGE_BACKEND
+supabase = get_storage()
+# Async pooled reads for the hot GET endpoints (bounded pool, per-query timeout); cron/admin writes stay sync
+reader = get_async_reader(store=supabase)
+# Seconds from the start of a cron call after which no backfill chunk starts (serverless functions are killed after ~60s)
+BACKFILL_BUDGET_SECONDS = float(os.getenv("BACKFILL_BUDGET_SECONDS", "25"))
+# Identical concurrent reads share one in-flight query and its serialized body
+flight = SingleFlight()
+
+def _json_body(body: bytes) -> Response:
+    """Response for a body already serialized with fastjson (shared between coalesced requests)."""
+    return Response(content=body, media_type="application/json")
 
-# Supabase Setup
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL else None
+@app.on_event("shutdown")
+async def close_reader():
+    if reader:
+        await reader.close()
 
 @app.get("/")
 async def root():
@@ -33,31 +67,53 @@ async def root():
 
 @app.get("/api/dashboard/summary")
 @app.get("/api/v1/full-state")
-async def get_dashboard_summary():
+async def get_dashboard_summary(fields: Optional[str] = None, since: Optional[int] = None):
     """
     The 'Mega-Endpoint' returns everything needed for one-page rendering.
+    `fields=tickers,analysis_sop` limits the query and payload to those sections.
+    `since=<version>` returns only rows changed after a previously returned `version`.
     """
-    if not supabase:
+    if not reader:
         raise HTTPException(status_code=500, detail="Supabase connection not configured")
     
     try:
-        # Fetch from the helper view defined in SQL schema
-        response = supabase.table("latest_dashboard_state").select("*").execute()
-        if not response.data:
-            return {"error": "No data found"}
-        
-        state = response.data[0]
+        requested = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        if since is not None:
+            if since < 0:
+                raise HTTPException(status_code=400, detail="since must be a non-negative version")
+            async def delta_body() -> bytes:
+                return fastjson.dumps(await fetch_state_delta(reader, since, requested))
+            return _json_body(await flight.do(("state-delta", since, requested), delta_body))
         
-        # Inject SOP Analysis on the fly or fetch pre-calculated (using on the fly for logic demo)
-        analysis = analyze_market_state(
-            macro_data={i['indicator_name']: i['value'] for i in (state.get('macro') or [])},
-            institutional_data={s['label']: s['value'] for s in (state.get('institutional') or [])},
-            market_cache=state.get('tickers') or []
-        )
+        try:
+            versions = await flight.do(("state-versions",), lambda: fetch_versions(reader))
+            version = versions.get("current", 0)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            # State versions are optional until migrations/add_state_versions.sql is applied
+            print(f"State version unavailable: {e}")
+            version = None
         
-        state['analysis_sop'] = analysis
-        return state
+        async def state_body() -> bytes:
+            # Fetch from the helper view defined in SQL schema; analysis_sop is computed once per flight
+            state = await fetch_full_state(reader, requested)
+            if state is None:
+                return fastjson.dumps({"error": "No data found"})
+            if version is not None:
+                state["version"] = version
+            return fastjson.dumps(state)
+        # Requests for the same sections at the same version share one query and one serialization
+        return _json_body(await flight.do(("full-state", requested, version), state_body))
     
+    except HTTPException:
+        raise
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -72,7 +128,7 @@ async def get_charts(category: str):
 
 @app.get("/api/macro/history")
 async def get_macro_history(range: str = "1mo"):
-    if not supabase:
+    if not reader:
          raise HTTPException(status_code=500, detail="Supabase connection not configured")
     
     from datetime import datetime, timedelta
@@ -81,40 +137,169 @@ async def get_macro_history(range: str = "1mo"):
     days = days_map.get(range, 30)
     cutoff = (now - timedelta(days=days)).strftime('%Y-%m-%d')
     
+    async def history_body() -> bytes:
+        response = await reader.table("macro_history").select("*").gte("log_date", cutoff).order("log_date").execute()
+        return fastjson.dumps(response.data)
+    
+    try:
+        # Ranges resolving to the same cutoff day share one in-flight query
+        return _json_body(await flight.do(("macro-history", cutoff), history_body))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/market/history")
+async def get_market_history(ticker: str = "GC=F", range: str = "1mo", resolution: Optional[str] = None):
+    """
+    OHLC history for one ticker, served from the coarsest rollup tier that
+    satisfies the range and resolution (e.g. range=1y -> ~365 daily rows).
+    """
+    if not reader:
+         raise HTTPException(status_code=500, detail="Supabase connection not configured")
+    
+    from datetime import datetime, timedelta, timezone
+    days_map = {"1d": 1, "1w": 7, "1mo": 30, "3mo": 90, "1y": 365, "5y": 1825}
+    resolution_map = {"1m": 60, "15m": 900, "1h": 3600, "1d": 86400}
+    if resolution is not None and resolution not in resolution_map:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {list(resolution_map)}")
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=days_map.get(range, 30))
+    
+    try:
+        history = await fetch_history(reader, ticker, start, end, resolution_map.get(resolution))
+        return FastJSONResponse(history)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/market/candles")
+async def get_market_candles(ticker: str = "GC=F", interval: str = "1h", range: str = "1mo", pivots: bool = False):
+    """
+    OHLC candles at any interval (5m, 4h, 1w, ... or "session") aggregated from
+    stored history; with pivots=true also the pivot points of the last complete candle.
+    """
+    if not reader:
+         raise HTTPException(status_code=500, detail="Supabase connection not configured")
+    
     try:
-        response = supabase.table("macro_history").select("*").gte("log_date", cutoff).order("log_date").execute()
-        return response.data
+        candles = await fetch_candles(reader, ticker, interval, range)
+        if pivots:
+            candles = {**candles, "pivots": pivots_from_candles(candles["candles"])}
+        return FastJSONResponse(candles)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analytics/volatility")
+async def get_volatility_history(ticker: str = "GC=F", range: str = "3mo"):
+    """
+    Realized volatility per session (close-to-close, Parkinson, Garman-Klass;
+    intraday and 20-session) with ^GVZ and the implied-minus-realized spread.
+    """
+    if not reader:
+         raise HTTPException(status_code=500, detail="Supabase connection not configured")
+    
+    from datetime import datetime, timedelta
+    days_map = {"1mo": 30, "3mo": 90, "1y": 365, "5y": 1825}
+    cutoff = (datetime.now() - timedelta(days=days_map.get(range, 90))).strftime('%Y-%m-%d')
+    
+    try:
+        response = await reader.table("volatility_history").select("*").eq("ticker", ticker) \
+            .gte("log_date", cutoff).order("log_date").execute()
+        return FastJSONResponse(response.data)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analytics/correlations")
+async def get_correlations():
+    """
+    Rolling correlations and betas of GC=F against DXY, real yield, VIX and
+    USD/CNH over 20/60/250 sessions, as of the last synced session.
+    """
+    if not reader:
+         raise HTTPException(status_code=500, detail="Supabase connection not configured")
+    
+    try:
+        response = await reader.table("sync_state").select("value").eq("key", CORRELATION_STATE_KEY).execute()
+        state = response.data[0].get("value") if response.data else None
+        if not state or not state.get("results"):
+            raise HTTPException(status_code=404, detail="Correlations not computed yet")
+        return FastJSONResponse(state["results"])
+    except HTTPException:
+        raise
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/cron/sync")
-async def trigger_sync(full: bool = False):
+async def trigger_sync(full: bool = False, shard: int = 0, shards: int = 1):
     """
     CRON JOB Endpoint for Vercel.
+    With shards > 1, each call syncs one deterministic slice of the ticker
+    universe; shard 0 also runs the derived/institutional/history/news jobs.
     """
     if not supabase:
          raise HTTPException(status_code=500, detail="Supabase connection not configured")
+    if shards < 1 or not 0 <= shard < shards:
+        raise HTTPException(status_code=400, detail="shard must be in [0, shards)")
+    # The backfill below only gets what the sync jobs before it leave of the budget
+    deadline = time.monotonic() + BACKFILL_BUDGET_SECONDS
     
     try:
         syncer = GoldDataSyncer(supabase)
-        report = syncer.sync_all()
+        report = syncer.sync_all(shard=shard, shards=shards)
+        if shard != 0:
+            return {
+                "status": f"Shard {shard}/{shards} sync executed successfully",
+                "report": report
+            }
         inst_report = syncer.sync_institutional()
         
         # Sync history only once a day or if forced
-        hist_report = syncer.sync_macro_history(days=365 if full else 7)
+        if full:
+            # Checkpointed chunks: a call that runs out of time keeps its work and the next call resumes
+            backfill_report = syncer.backfill("macro_history", days=365, deadline=deadline)
+            hist_report = {"updated": backfill_report.get("rows", 0), "errors": backfill_report["errors"]}
+            report["backfill"] = backfill_report
+        else:
+            hist_report = syncer.sync_macro_history(days=7)
 
         
         report["updated"].extend(inst_report["updated"])
         if hist_report["updated"] > 0:
             report["updated"].append(f"macro_history_{hist_report['updated']}_rows")
             
+        corr_report = syncer.sync_correlations()
+        if corr_report["updated"] > 0:
+            report["updated"].append(f"correlations_{corr_report['updated']}_sessions")
+
+        # After every indicator write of this run
+        alert_report = syncer.sync_alerts()
+        if alert_report["queued"] > 0:
+            report["updated"].append(f"alerts_{alert_report['queued']}_events")
+
         news_report = syncer.sync_news()
         if news_report["updated"] > 0:
              report["updated"].append(f"news_{news_report['updated']}_items")
 
+        rollup_report = syncer.sync_rollups()
+        if rollup_report["rolled_up"] > 0:
+            report["updated"].append(f"market_history_rollups_{rollup_report['rolled_up']}_buckets")
+
         report["errors"].extend(inst_report["errors"])
         report["errors"].extend(hist_report["errors"])
+        report["errors"].extend(corr_report["errors"])
+        report["errors"].extend(alert_report["errors"])
         report["errors"].extend(news_report["errors"])
+        report["errors"].extend(rollup_report["errors"])
 
         
         return {
@@ -127,6 +312,27 @@ async def trigger_sync(full: bool = False):
         # but let's stick to 500 for critical failures.
         raise HTTPException(status_code=status_code, detail=f"Sync failed: {str(e)}")
 
+@app.get("/api/cron/backfill")
+async def trigger_backfill(job: str = "macro_history", days: int = 365, force: bool = False):
+    """
+    Resumable historical backfill, e.g. job=market_history:1d:GC=F&days=1825.
+    No chunk starts later than BACKFILL_BUDGET_SECONDS into the call; call again until `remaining` is 0.
+    """
+    deadline = time.monotonic() + BACKFILL_BUDGET_SECONDS
+    if not supabase:
+         raise HTTPException(status_code=500, detail="Supabase connection not configured")
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days must be positive")
+    
+    try:
+        syncer = GoldDataSyncer(supabase)
+        return {"status": "Backfill executed", "report": syncer.backfill(job, days, deadline=deadline,
+                                                                        force=force)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Backfill failed: {str(e)}")
+
 from pydantic import BaseModel
 class FedWatchUpdate(BaseModel):
     prob_pause: float
@@ -179,3 +385,88 @@ async def update_fedwatch_manually(data: FedWatchUpdate):
         return {"status": "success", "fedwatch": fed_payload}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database update failed: {str(e)}")
+
+@app.get("/api/alerts")
+async def get_alerts():
+    """
+    Alert rules currently firing (with their inputs) and the most recent fire/resolve events.
+    """
+    if not reader:
+         raise HTTPException(status_code=500, detail="Supabase connection not configured")
+    
+    try:
+        state_res, events_res = await asyncio.gather(
+            reader.table("sync_state").select("value").eq("key", ALERT_STATE_KEY).execute(),
+            reader.table("alert_events").select("id,rule_id,status,payload,delivery,created_at").order("id", desc=True).limit(50).execute(),
+        )
+        state = (state_res.data[0].get("value") if state_res.data else None) or {}
+        active = [{"id": rule_id, "since": st.get("since")} for rule_id, st in (state.get("rules") or {}).items() if st.get("active")]
+        return FastJSONResponse({"active": active, "events": events_res.data})
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class AlertRuleUpdate(BaseModel):
+    id: str
+    name: str = ""
+    conditions: list
+    for_seconds: int = 0
+    severity: str = "warning"
+    webhook: Optional[str] = None
+
+@app.post("/api/admin/alerts/rules")
+async def upsert_alert_rule(data: AlertRuleUpdate):
+    """
+    Create or replace a user-defined alert rule, e.g.
+    {"id": "gold_3000", "conditions": [{"metric": "GC=F.last_price", "op": ">", "value": 3000, "clear": 2980}]}
+    """
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Supabase connection not configured")
+    try:
+        rule = Rule.from_dict(data.dict())
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rule: {e}")
+    
+    from datetime import datetime, timezone
+    row = {**rule.to_row(), "enabled": True, "updated_at": datetime.now(timezone.utc).isoformat()}
+    try:
+        supabase.table("alert_rules").upsert(row, on_conflict="id").execute()
+        return {"status": "success", "rule": row}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database update failed: {str(e)}")
+
+@app.delete("/api/admin/alerts/rules/{rule_id}")
+async def disable_alert_rule(rule_id: str):
+    """Disable a user-defined rule (kept as a row so the engine notices the change)."""
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Supabase connection not configured")
+    
+    from datetime import datetime, timezone
+    try:
+        res = supabase.table("alert_rules").update({"enabled": False, "updated_at": datetime.now(timezone.utc).isoformat()}) \
+            .eq("id", rule_id).execute()
+        if not res.data:
+            raise HTTPException(status_code=404, detail=f"Unknown rule {rule_id}")
+        return {"status": "success", "id": rule_id}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database update failed: {str(e)}")
+
+@app.get("/api/admin/profiles")
+async def get_profiles(limit: int = 20):
+    """
+    Recent profiles (newest first) with wall time and top functions by cumulative time.
+    """
+    return {"directory": PROFILE_DIR, "profiles": list_profiles(limit)}
+
+@app.get("/api/admin/profiles/{profile_id}/{kind}")
+async def download_profile(profile_id: str, kind: str):
+    """
+    Download one artifact: kind = pstats | collapsed | summary.
+    """
+    path = artifact_path(profile_id, kind)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile artifact not found")
+    return FileResponse(path, filename=os.path.basename(path))
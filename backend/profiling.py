@@ -0,0 +1,214 @@
+"""
+Opt-in profiling for sync runs and API requests.
+
+A profiled run executes under cProfile (deterministic, written as .pstats for
+snakeviz/pstats) while a sampler thread records every thread's stack every few
+milliseconds (written as flamegraph.pl / speedscope compatible collapsed stacks).
+A small .json summary with the top functions is written next to them and is what
+list_profiles() returns.
+
+Enable with PROFILE_ENABLED=1 (every /api request, every scheduler sync) or per
+request with `?profile=1` on the cron and admin routes. Artifacts go to
+PROFILE_DIR (default: <tmp>/goldtracer-profiles); only the newest PROFILE_KEEP
+runs are kept.
+"""
+
+import cProfile
+import glob
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Iterator
+
+from .services import fastjson
+
+PROFILE_DIR = os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "goldtracer-profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 25
+ARTIFACTS = {"pstats": ".pstats", "collapsed": ".collapsed", "summary": ".json"}
+
+# cProfile allows one active profiler per process in recent Pythons; overlapping runs are not profiled
+_active = threading.Lock()
+
+
+def env_enabled() -> bool:
+    return os.getenv("PROFILE_ENABLED", "").lower() in ("1", "true", "yes")
+
+
+class StackSampler(threading.Thread):
+    """Counts collapsed stacks ("thread;outer;...;inner") of all other threads."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name}@{os.path.basename(code.co_filename)}:{code.co_firstlineno}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)).replace(" ", "_"))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _top_functions(profiler: cProfile.Profile) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profiler).stats
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.items():
+        rows.append({
+            "function": f"{func} ({os.path.basename(filename)}:{line})",
+            "calls": nc,
+            "tottime": round(tt, 4),
+            "cumtime": round(ct, 4),
+        })
+    rows.sort(key=lambda r: r["cumtime"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def _prune(directory: str) -> None:
+    summaries = sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime, reverse=True)
+    for path in summaries[PROFILE_KEEP:]:
+        stem = path[:-len(".json")]
+        for suffix in ARTIFACTS.values():
+            try:
+                os.remove(stem + suffix)
+            except OSError:
+                pass
+
+
+@contextmanager
+def profile_run(name: str, directory: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Profile the enclosed block. Yields a dict that holds `id` immediately and the
+    artifact paths and timings once the block exits.
+    """
+    directory = directory or PROFILE_DIR
+    started = datetime.now(timezone.utc)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-").lower() or "run"
+    info: Dict[str, Any] = {"id": f"{started:%Y%m%dT%H%M%S%f}-{slug}-{os.getpid()}", "name": name}
+    if not _active.acquire(blocking=False):
+        info["skipped"] = "another profile is running"
+        yield info
+        return
+
+    profiler = cProfile.Profile()
+    sampler = StackSampler()
+    try:
+        sampler.start()
+        t0 = time.perf_counter()
+        profiler.enable()
+        try:
+            yield info
+        finally:
+            profiler.disable()
+            wall = time.perf_counter() - t0
+            sampler.stop()
+            try:
+                os.makedirs(directory, exist_ok=True)
+                stem = os.path.join(directory, info["id"])
+                profiler.dump_stats(stem + ARTIFACTS["pstats"])
+                with open(stem + ARTIFACTS["collapsed"], "w") as f:
+                    for stack, count in sampler.counts.most_common():
+                        f.write(f"{stack} {count}\n")
+                info.update({
+                    "started_at": started.isoformat(),
+                    "wall_seconds": round(wall, 4),
+                    "samples": sum(sampler.counts.values()),
+                    "top": _top_functions(profiler),
+                })
+                with open(stem + ARTIFACTS["summary"], "wb") as f:
+                    f.write(fastjson.dumps(info))
+                _prune(directory)
+                print(f"Profile written: {stem}.* ({wall:.2f}s)")
+            except Exception as e:
+                print(f"Profile write error ({name}): {e}")
+    finally:
+        _active.release()
+
+
+def maybe_profile(name: str, enabled: Optional[bool] = None):
+    """profile_run() when enabled (default: PROFILE_ENABLED), otherwise a no-op context."""
+    if enabled is None:
+        enabled = env_enabled()
+    return profile_run(name) if enabled else nullcontext({})
+
+
+def list_profiles(limit: int = 20, directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Newest profile summaries first."""
+    directory = directory or PROFILE_DIR
+    summaries = sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime, reverse=True)
+    profiles = []
+    for path in summaries[:limit]:
+        try:
+            with open(path, "rb") as f:
+                profiles.append(fastjson.loads(f.read()))
+        except Exception as e:
+            print(f"Profile read error ({path}): {e}")
+    return profiles
+
+
+def artifact_path(profile_id: str, kind: str, directory: Optional[str] = None) -> Optional[str]:
+    """Path of one artifact of a listed profile, or None (ids never escape the profile directory)."""
+    if kind not in ARTIFACTS or not re.fullmatch(r"[A-Za-z0-9_.-]+", profile_id):
+        return None
+    path = os.path.join(directory or PROFILE_DIR, profile_id + ARTIFACTS[kind])
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when PROFILE_ENABLED is set (all /api routes) or when a
+    route under `flag_prefixes` is called with ?profile=1. The run id is returned
+    in the X-Profile-Id header.
+
+    The profiler sees everything executing on the event loop thread meanwhile,
+    so concurrent requests can show up in the same profile.
+    """
+
+    def __init__(self, app, flag_prefixes=("/api/cron/", "/api/admin/")):
+        self.app = app
+        self.flag_prefixes = tuple(flag_prefixes)
+
+    def _wanted(self, scope) -> bool:
+        path = scope.get("path", "")
+        if env_enabled() and path.startswith("/api/"):
+            return True
+        if not path.startswith(self.flag_prefixes):
+            return False
+        query = scope.get("query_string", b"").decode("latin-1")
+        return bool(re.search(r"(^|&)profile=(1|true|yes)(&|$)", query))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        with profile_run(f"{scope['method']} {scope['path']}") as info:
+            async def wrapped_send(message):
+                if message["type"] == "http.response.start" and "skipped" not in info:
+                    headers = list(message.get("headers", [])) + [(b"x-profile-id", info["id"].encode())]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, wrapped_send)
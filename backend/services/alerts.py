@@ -0,0 +1,384 @@
+"""
+Rule-based alerts over the synced indicators, with push delivery.
+
+Metrics are flat name -> value pairs taken from the dashboard tables:
+macro_indicators by indicator_name (RSI_14), institutional_stats by label
+("Managed Money Net Long", plus "<label>.change"), and market_data_cache as
+"<ticker>.last_price" / "<ticker>.change_percent".
+
+Rules (backend/config/alerts.json plus user rules in the alert_rules table) are
+conjunctions of threshold conditions:
+
+    {"id": "rsi_overbought", "all": [{"metric": "RSI_14", "op": ">", "value": 75, "clear": 70}],
+     "for_seconds": 0, "severity": "warning", "webhook": null}
+
+- Rules are indexed by input metric. Each sync diffs the metric snapshot against
+  the previous one and evaluates only the rules reading a changed metric, plus
+  rules still waiting out their debounce. Cost follows the changed inputs, not
+  the size of the rule book.
+- Hysteresis: an active condition stays true until its metric crosses `clear`
+  (default: the threshold itself).
+- Debounce: a rule fires only after its conditions held for `for_seconds`.
+
+Every fire/resolve transition is written to the alert_events outbox.
+deliver_pending() posts pending events to their webhook in batches and retries
+failures with exponential backoff, so delivery survives restarts.
+"""
+
+import json
+import operator
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Iterable, Set, Callable, Tuple
+
+import requests
+
+from .sync_state import load_state, save_state
+
+STATE_KEY = "alert_engine"
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "alerts.json")
+
+OPERATORS: Dict[str, Callable[[float, float], bool]] = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+}
+
+DELIVERY_BATCH = 50
+MAX_ATTEMPTS = 8
+BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+
+
+class Condition:
+    __slots__ = ("metric", "op", "value", "clear")
+
+    def __init__(self, metric: str, op: str, value: float, clear: Optional[float] = None):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator {op!r}, expected one of {list(OPERATORS)}")
+        self.metric = metric
+        self.op = op
+        self.value = float(value)
+        self.clear = float(value if clear is None else clear)
+
+    def holds(self, value: float, active: bool) -> bool:
+        # While active, compare against the clear level instead (hysteresis band)
+        return OPERATORS[self.op](value, self.clear if active else self.value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"metric": self.metric, "op": self.op, "value": self.value, "clear": self.clear}
+
+
+class Rule:
+    __slots__ = ("id", "name", "conditions", "for_seconds", "severity", "webhook")
+
+    def __init__(self, id: str, conditions: List[Condition], name: str = "", for_seconds: float = 0,
+                 severity: str = "warning", webhook: Optional[str] = None):
+        if not conditions:
+            raise ValueError(f"Rule {id} has no conditions")
+        self.id = id
+        self.name = name or id
+        self.conditions = conditions
+        self.for_seconds = float(for_seconds or 0)
+        self.severity = severity
+        self.webhook = webhook
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> "Rule":
+        conditions = entry.get("all") or entry.get("conditions") or []
+        if isinstance(conditions, str):
+            conditions = json.loads(conditions)
+        return cls(
+            id=str(entry["id"]),
+            name=entry.get("name") or "",
+            conditions=[Condition(**c) for c in conditions],
+            for_seconds=entry.get("for_seconds") or 0,
+            severity=entry.get("severity") or "warning",
+            webhook=entry.get("webhook"),
+        )
+
+    @property
+    def metrics(self) -> Set[str]:
+        return {c.metric for c in self.conditions}
+
+    def evaluate(self, metrics: Dict[str, float], active: bool) -> Optional[bool]:
+        """True/False, or None when an input is missing (the rule keeps its state)."""
+        result = True
+        for c in self.conditions:
+            value = metrics.get(c.metric)
+            if value is None:
+                return None
+            result = result and c.holds(value, active)
+        return result
+
+    def to_row(self) -> Dict[str, Any]:
+        return {"id": self.id, "name": self.name, "conditions": [c.to_dict() for c in self.conditions],
+                "for_seconds": int(self.for_seconds), "severity": self.severity, "webhook": self.webhook}
+
+
+class RuleBook:
+    """Rules plus the metric -> rule ids index."""
+
+    def __init__(self, rules: Iterable[Rule] = ()):
+        self.rules: Dict[str, Rule] = {}
+        self.index: Dict[str, Set[str]] = {}
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def add(self, rule: Rule) -> None:
+        self.remove(rule.id)
+        self.rules[rule.id] = rule
+        for metric in rule.metrics:
+            self.index.setdefault(metric, set()).add(rule.id)
+
+    def remove(self, rule_id: str) -> None:
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return
+        for metric in rule.metrics:
+            ids = self.index.get(metric)
+            if ids:
+                ids.discard(rule_id)
+                if not ids:
+                    del self.index[metric]
+
+    def affected(self, metrics: Iterable[str]) -> Set[str]:
+        out: Set[str] = set()
+        for metric in metrics:
+            out |= self.index.get(metric, set())
+        return out
+
+
+def load_rule_file(path: Optional[str] = None) -> List[Rule]:
+    path = path or os.getenv("ALERT_RULES_PATH") or DEFAULT_RULES_PATH
+    with open(path, "r", encoding="utf-8") as f:
+        return [Rule.from_dict(entry) for entry in json.load(f).get("rules", [])]
+
+
+def collect_metrics(supabase) -> Dict[str, float]:
+    """Flat metric snapshot from the three dashboard tables (one query each)."""
+    metrics: Dict[str, float] = {}
+
+    def put(name: str, value: Any) -> None:
+        if value is not None:
+            try:
+                metrics[name] = float(value)
+            except (TypeError, ValueError):
+                pass
+
+    for row in supabase.table("macro_indicators").select("indicator_name,value").execute().data or []:
+        put(row["indicator_name"], row.get("value"))
+    for row in supabase.table("institutional_stats").select("label,value,change_value").execute().data or []:
+        put(row["label"], row.get("value"))
+        put(f"{row['label']}.change", row.get("change_value"))
+    for row in supabase.table("market_data_cache").select("ticker,last_price,change_percent").execute().data or []:
+        put(f"{row['ticker']}.last_price", row.get("last_price"))
+        put(f"{row['ticker']}.change_percent", row.get("change_percent"))
+    return metrics
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class AlertEngine:
+    """
+    Incremental evaluator. State (last metric snapshot, active/pending rules) is kept
+    sparse in sync_state: only rules that are active or debouncing have an entry.
+    """
+
+    def __init__(self, book: RuleBook, state: Optional[Dict[str, Any]] = None):
+        state = state or {}
+        self.book = book
+        self.metrics: Dict[str, float] = dict(state.get("metrics") or {})
+        self.rule_state: Dict[str, Dict[str, Any]] = dict(state.get("rules") or {})
+        self.stats = {"changed_metrics": 0, "evaluated": 0, "fired": 0, "resolved": 0}
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"metrics": self.metrics, "rules": self.rule_state}
+
+    def active(self) -> List[Dict[str, Any]]:
+        out = []
+        for rule_id, st in self.rule_state.items():
+            rule = self.book.rules.get(rule_id)
+            if st.get("active") and rule is not None:
+                out.append({"id": rule_id, "name": rule.name, "severity": rule.severity, "since": st.get("since")})
+        return sorted(out, key=lambda a: a["since"] or "")
+
+    def observe(self, metrics: Dict[str, float], now: Optional[float] = None,
+                dirty: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """
+        Feed a new snapshot; returns the fire/resolve events it caused.
+        `dirty` rules are evaluated regardless (new or edited rules).
+        """
+        now = now or time.time()
+        changed = {k for k, v in metrics.items() if self.metrics.get(k) != v}
+        changed |= {k for k in self.metrics if k not in metrics}
+        self.metrics = dict(metrics)
+
+        # Rules whose state no longer matches a rule definition are dropped
+        for rule_id in [r for r in self.rule_state if r not in self.book.rules]:
+            del self.rule_state[rule_id]
+        pending = {r for r, st in self.rule_state.items() if st.get("pending_since") is not None}
+        candidates = self.book.affected(changed) | pending | set(dirty)
+
+        events = []
+        for rule_id in candidates:
+            rule = self.book.rules.get(rule_id)
+            if rule is None:
+                continue
+            st = self.rule_state.get(rule_id, {})
+            active = bool(st.get("active"))
+            result = rule.evaluate(self.metrics, active)
+            self.stats["evaluated"] += 1
+            if result is None:
+                continue
+            if result and not active:
+                started = st.get("pending_since") or now
+                if now - started >= rule.for_seconds:
+                    self.rule_state[rule_id] = {"active": True, "since": _iso(now)}
+                    events.append(self._event(rule, "fired", now))
+                else:
+                    self.rule_state[rule_id] = {"pending_since": started}
+            elif not result:
+                if active:
+                    events.append(self._event(rule, "resolved", now))
+                self.rule_state.pop(rule_id, None)
+        self.stats["changed_metrics"] = len(changed)
+        self.stats["fired"] += sum(1 for e in events if e["status"] == "fired")
+        self.stats["resolved"] += sum(1 for e in events if e["status"] == "resolved")
+        return events
+
+    def _event(self, rule: Rule, status: str, now: float) -> Dict[str, Any]:
+        return {
+            "rule_id": rule.id,
+            "status": status,
+            "sink": rule.webhook or os.getenv("ALERT_WEBHOOK_URL"),
+            "payload": {
+                "rule": rule.id,
+                "name": rule.name,
+                "severity": rule.severity,
+                "status": status,
+                "at": _iso(now),
+                "inputs": {c.metric: self.metrics.get(c.metric) for c in rule.conditions},
+            },
+            "delivery": "pending",
+            "attempts": 0,
+            "next_attempt_at": _iso(now),
+        }
+
+
+# --- Rule loading (file rules + user rules, cached per process) ---
+
+_book: Optional[RuleBook] = None
+_book_stamp: Optional[str] = None
+
+
+def get_rule_book(supabase) -> Tuple[RuleBook, Set[str]]:
+    """
+    Current rule book and the ids of rules (re)loaded since the last call.
+    User rules are re-read only when alert_rules changed (one tiny query otherwise).
+    """
+    global _book, _book_stamp
+    stamp = None
+    if supabase is not None:
+        try:
+            # Rules are disabled rather than deleted, so the newest updated_at covers every change
+            res = supabase.table("alert_rules").select("updated_at").order("updated_at", desc=True).limit(1).execute()
+            stamp = str(res.data[0]["updated_at"]) if res.data else ""
+        except Exception as e:
+            print(f"Alert rules read error: {e}")
+    if _book is not None and stamp == _book_stamp:
+        return _book, set()
+
+    book = RuleBook(load_rule_file())
+    if stamp:
+        for row in supabase.table("alert_rules").select("*").eq("enabled", True).execute().data or []:
+            try:
+                book.add(Rule.from_dict(row))
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Skipping invalid alert rule {row.get('id')}: {e}")
+    _book, _book_stamp = book, stamp
+    return book, set(book.rules)
+
+
+def run_alerts(supabase, now: Optional[float] = None, still_held: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """
+    Evaluate the rules whose inputs changed, queue transitions in alert_events, save state.
+    `still_held` is checked before writing: an evaluator that lost its lease writes nothing.
+    """
+    book, dirty = get_rule_book(supabase)
+    engine = AlertEngine(book, load_state(supabase, STATE_KEY))
+    events = engine.observe(collect_metrics(supabase), now=now, dirty=dirty)
+    if still_held is not None and not still_held():
+        raise RuntimeError("Lease lost for sync_alerts, events not queued")
+    if events:
+        supabase.table("alert_events").insert(events).execute()
+    save_state(supabase, STATE_KEY, engine.to_state())
+    return {**engine.stats, "rules": len(book), "active": len(engine.active()), "queued": len(events)}
+
+
+# --- Delivery ---
+
+class WebhookSink:
+    """POSTs {"events": [...]} to one URL; any non-2xx response is a failure."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, payloads: List[Dict[str, Any]]) -> None:
+        response = requests.post(self.url, json={"events": payloads}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+def _backoff(attempts: int) -> float:
+    return min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+
+
+def deliver_pending(supabase, now: Optional[float] = None, batch_size: int = DELIVERY_BATCH,
+                    sink_factory: Callable[[str], WebhookSink] = WebhookSink) -> Dict[str, int]:
+    """
+    Post due events grouped by sink, `batch_size` per request. Failed batches are retried with
+    exponential backoff and given up ("dead") after MAX_ATTEMPTS. Events without a sink are dropped.
+    """
+    now = now or time.time()
+    report = {"delivered": 0, "failed": 0, "dead": 0, "dropped": 0}
+    rows = supabase.table("alert_events").select("id,sink,payload,attempts").eq("delivery", "pending") \
+        .lte("next_attempt_at", _iso(now)).order("id").limit(batch_size * 10).execute().data or []
+
+    by_sink: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_sink.setdefault(row.get("sink"), []).append(row)
+
+    for sink, items in by_sink.items():
+        if not sink:
+            supabase.table("alert_events").update({"delivery": "dropped"}).in_("id", [r["id"] for r in items]).execute()
+            report["dropped"] += len(items)
+            continue
+        target = sink_factory(sink)
+        for i in range(0, len(items), batch_size):
+            batch = items[i:i + batch_size]
+            ids = [r["id"] for r in batch]
+            try:
+                target.send([r["payload"] for r in batch])
+                supabase.table("alert_events").update({"delivery": "delivered", "delivered_at": _iso(now)}) \
+                    .in_("id", ids).execute()
+                report["delivered"] += len(batch)
+            except Exception as e:
+                # Rows in one batch can carry different attempt counts: one update per count
+                by_attempts: Dict[int, List[int]] = {}
+                for r in batch:
+                    by_attempts.setdefault(int(r.get("attempts") or 0) + 1, []).append(r["id"])
+                for attempts, group in by_attempts.items():
+                    dead = attempts >= MAX_ATTEMPTS
+                    supabase.table("alert_events").update({
+                        "attempts": attempts,
+                        "last_error": str(e)[:500],
+                        "delivery": "dead" if dead else "pending",
+                        "next_attempt_at": _iso(now + _backoff(attempts)),
+                    }).in_("id", group).execute()
+                    report["dead" if dead else "failed"] += len(group)
+    return report
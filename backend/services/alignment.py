@@ -0,0 +1,295 @@
+"""
+Calendar-aware alignment of daily series from different sources.
+
+Every source is reduced to a DailySeries: one value per trading session of its
+own exchange calendar, stamped with the UTC instant the session closes. Bars are
+bucketed by exchange-local trading day (DST-correct, with an evening roll for
+CME Globex), never by the host's local time. Series are then joined onto a
+target calendar's sessions with an as-of join on close instants, so a value is
+only ever paired with data that was already published at that moment (e.g. the
+Shanghai close is paired with the previous COMEX session, not the same-day one).
+
+All operations are NumPy-vectorized: aligning years of daily data is a handful
+of searchsorted calls.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional, Tuple, Iterable, Sequence
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from .bars import BarSeries
+
+FILL_POLICIES = ("ffill", "exact", "interpolate")
+DAY = 86400
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th (1-based, -1 = last) weekday (Mon=0) of a month."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1))
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d: date) -> date:
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday."""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def us_market_holidays(years: Iterable[int]) -> np.ndarray:
+    """NYSE/CME full-day closures by rule (no ad-hoc closures such as national days of mourning)."""
+    days = []
+    for y in years:
+        new_year = date(y, 1, 1)
+        # A Saturday New Year is not observed on the previous Friday (year-end close)
+        if new_year.weekday() != 5:
+            days.append(_observed(new_year))
+        days += [
+            _nth_weekday(y, 1, 0, 3),       # Martin Luther King Jr. Day
+            _nth_weekday(y, 2, 0, 3),       # Presidents' Day
+            _easter(y) - timedelta(days=2),  # Good Friday
+            _nth_weekday(y, 5, 0, -1),      # Memorial Day
+            _observed(date(y, 7, 4)),       # Independence Day
+            _nth_weekday(y, 9, 0, 1),       # Labor Day
+            _nth_weekday(y, 11, 3, 4),      # Thanksgiving
+            _observed(date(y, 12, 25)),     # Christmas
+        ]
+        if y >= 2022:
+            days.append(_observed(date(y, 6, 19)))  # Juneteenth
+    return np.array(sorted(days), dtype="datetime64[D]")
+
+
+class ExchangeCalendar:
+    """
+    Trading-day rules for one venue.
+    tz: exchange time zone; day_start_hour: local hour at which the next trading day
+    begins (18 for CME Globex, whose Sunday-evening bars belong to Monday);
+    close_hour: local session close; weekmask: numpy busday weekmask.
+    """
+
+    __slots__ = ("name", "tz", "day_start_hour", "close_hour", "weekmask", "holiday_rule", "extra_holidays", "_holidays")
+
+    def __init__(self, name: str, tz: str, close_hour: float, day_start_hour: int = 0, weekmask: str = "1111100",
+                 holiday_rule=None, extra_holidays: Sequence[str] = ()):
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.close_hour = close_hour
+        self.day_start_hour = day_start_hour
+        self.weekmask = weekmask
+        self.holiday_rule = holiday_rule
+        self.extra_holidays = np.array(list(extra_holidays), dtype="datetime64[D]")
+        self._holidays: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def __repr__(self) -> str:
+        return f"ExchangeCalendar({self.name})"
+
+    def holidays(self, first_year: int, last_year: int) -> np.ndarray:
+        key = (first_year, last_year)
+        if key not in self._holidays:
+            ruled = self.holiday_rule(range(first_year, last_year + 1)) if self.holiday_rule else np.array([], dtype="datetime64[D]")
+            self._holidays[key] = np.union1d(ruled, self.extra_holidays)
+        return self._holidays[key]
+
+    def _busday_kwargs(self, days: np.ndarray) -> Dict[str, Any]:
+        if not len(days):
+            return {"weekmask": self.weekmask}
+        years = days.astype("datetime64[Y]").astype(int) + 1970
+        return {"weekmask": self.weekmask, "holidays": self.holidays(int(years.min()), int(years.max()))}
+
+    def utc_offsets(self, timestamps: np.ndarray) -> np.ndarray:
+        """UTC offset (seconds) of each unix timestamp in the exchange zone, looked up once per distinct hour."""
+        hours, inverse = np.unique(timestamps // 3600, return_inverse=True)
+        offsets = np.array([datetime.fromtimestamp(int(h) * 3600, tz=self.tz).utcoffset().total_seconds() for h in hours],
+                           dtype=np.int64)
+        return offsets[inverse]
+
+    def trading_days(self, timestamps: np.ndarray) -> np.ndarray:
+        """Exchange trading day (datetime64[D]) each bar timestamp belongs to."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        local = timestamps + self.utc_offsets(timestamps)
+        shift = ((24 - self.day_start_hour) % 24) * 3600
+        return ((local + shift) // DAY).astype("datetime64[D]")
+
+    def is_session(self, days: np.ndarray) -> np.ndarray:
+        days = np.asarray(days, dtype="datetime64[D]")
+        return np.is_busday(days, **self._busday_kwargs(days))
+
+    def sessions(self, start, end) -> np.ndarray:
+        """Trading days in [start, end] (dates or YYYY-MM-DD strings)."""
+        days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+        return days[self.is_session(days)]
+
+    def close_times(self, days: np.ndarray) -> np.ndarray:
+        """UTC unix second at which each trading day's session closes."""
+        days = np.asarray(days, dtype="datetime64[D]")
+        naive = days.astype(np.int64) * DAY + int(self.close_hour * 3600)
+        # Offset at the (approximate) close instant; DST never switches during a session close hour
+        return naive - self.utc_offsets(naive)
+
+
+CALENDARS: Dict[str, ExchangeCalendar] = {
+    "UTC": ExchangeCalendar("UTC", "UTC", close_hour=24, weekmask="1111111"),
+    "NYSE": ExchangeCalendar("NYSE", "America/New_York", close_hour=16, holiday_rule=us_market_holidays),
+    "CME": ExchangeCalendar("CME", "America/New_York", close_hour=17, day_start_hour=18, holiday_rule=us_market_holidays),
+    # Chinese exchange holidays follow the lunar calendar and are announced yearly; sessions are taken
+    # from the data itself (a day without a Shanghai bar is not a session)
+    "SSE": ExchangeCalendar("SSE", "Asia/Shanghai", close_hour=15),
+    # FX rolls at 17:00 New York; Yahoo stamps daily FX bars at the London midnight
+    "FX": ExchangeCalendar("FX", "Europe/London", close_hour=22),
+}
+
+
+def get_calendar(name: str) -> ExchangeCalendar:
+    if name not in CALENDARS:
+        raise ValueError(f"Unknown calendar {name!r}, expected one of {list(CALENDARS)}")
+    return CALENDARS[name]
+
+
+class DailySeries:
+    """One value per trading day: days (datetime64[D], ascending), values (float64), closes (UTC unix seconds)."""
+
+    __slots__ = ("name", "calendar", "days", "values", "closes")
+
+    def __init__(self, name: str, calendar: ExchangeCalendar, days: np.ndarray, values: np.ndarray,
+                 closes: Optional[np.ndarray] = None):
+        self.name = name
+        self.calendar = calendar
+        self.days = np.asarray(days, dtype="datetime64[D]")
+        self.values = np.asarray(values, dtype=np.float64)
+        self.closes = calendar.close_times(self.days) if closes is None else np.asarray(closes, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __repr__(self) -> str:
+        return f"DailySeries({self.name} {self.calendar.name} n={len(self)})"
+
+    @classmethod
+    def from_bars(cls, bars: BarSeries, calendar: ExchangeCalendar, field: str = "close",
+                  name: Optional[str] = None) -> "DailySeries":
+        """Last valid value per exchange trading day (works for intraday and daily bars)."""
+        values = getattr(bars, field)
+        mask = ~np.isnan(values)
+        ts, values = bars.timestamps[mask], values[mask]
+        if not len(ts):
+            return cls(name or bars.ticker, calendar, np.array([], dtype="datetime64[D]"), np.array([]))
+        order = np.argsort(ts, kind="stable")
+        ts, values = ts[order], values[order]
+        days = calendar.trading_days(ts)
+        last = np.flatnonzero(np.append(days[1:] != days[:-1], True))
+        days, values = days[last], values[last]
+        # Weekend/holiday prints (e.g. Sunday-evening FX) belong to no session of this calendar
+        keep = calendar.is_session(days)
+        return cls(name or bars.ticker, calendar, days[keep], values[keep])
+
+    @classmethod
+    def from_mapping(cls, name: str, calendar: ExchangeCalendar, mapping: Dict[str, float]) -> "DailySeries":
+        """From {YYYY-MM-DD: value} (e.g. FRED observations, already dated by trading day)."""
+        if not mapping:
+            return cls(name, calendar, np.array([], dtype="datetime64[D]"), np.array([]))
+        days = np.array(list(mapping.keys()), dtype="datetime64[D]")
+        values = np.array(list(mapping.values()), dtype=np.float64)
+        order = np.argsort(days, kind="stable")
+        return cls(name, calendar, days[order], values[order])
+
+    def scaled(self, factor: float) -> "DailySeries":
+        return DailySeries(self.name, self.calendar, self.days, self.values * factor, self.closes)
+
+    def to_mapping(self) -> Dict[str, float]:
+        return {str(d): float(v) for d, v in zip(self.days, self.values) if not np.isnan(v)}
+
+
+def asof(target_times: np.ndarray, series: DailySeries, fill: str = "ffill",
+         max_age: Optional[float] = None) -> np.ndarray:
+    """
+    Values of `series` at each target instant (UTC unix seconds).
+    ffill: latest observation closed at or before the instant (optionally no older than max_age seconds);
+    exact: only an observation closing at the same instant's trading day, NaN otherwise;
+    interpolate: time-linear between the surrounding observations (uses later data, charts only).
+    """
+    if fill not in FILL_POLICIES:
+        raise ValueError(f"Unknown fill policy {fill!r}, expected one of {FILL_POLICIES}")
+    target_times = np.asarray(target_times, dtype=np.int64)
+    out = np.full(len(target_times), np.nan)
+    if not len(series) or not len(target_times):
+        return out
+    closes, values = series.closes, series.values
+
+    if fill == "interpolate":
+        inside = (target_times >= closes[0]) & (target_times <= closes[-1])
+        out[inside] = np.interp(target_times[inside], closes, values)
+        return out
+
+    idx = np.searchsorted(closes, target_times, side="right") - 1
+    found = idx >= 0
+    out[found] = values[idx[found]]
+    if fill == "exact":
+        target_days = series.calendar.trading_days(target_times)
+        same = np.zeros(len(target_times), bool)
+        same[found] = series.days[idx[found]] == target_days[found]
+        out[~same] = np.nan
+    elif max_age is not None:
+        stale = np.zeros(len(target_times), bool)
+        stale[found] = target_times[found] - closes[idx[found]] > max_age
+        out[stale] = np.nan
+    return out
+
+
+def align(series: Sequence[DailySeries], calendar: ExchangeCalendar, start, end, fill: str = "ffill",
+          max_age_days: Optional[float] = 5, dropna: bool = True,
+          sessions: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Join several series onto `calendar`'s sessions in [start, end] (or explicit `sessions`).
+    Returns (days, matrix) with one column per series; rows with any gap are dropped if `dropna`.
+    """
+    days = calendar.sessions(start, end) if sessions is None else np.asarray(sessions, dtype="datetime64[D]")
+    times = calendar.close_times(days)
+    max_age = max_age_days * DAY if max_age_days is not None else None
+    matrix = np.column_stack([asof(times, s, fill, max_age) for s in series]) if series else np.empty((len(days), 0))
+    if dropna and len(days):
+        keep = ~np.isnan(matrix).any(axis=1)
+        days, matrix = days[keep], matrix[keep]
+    return days, matrix
+
+
+# --- Derived history series ---
+
+def real_yield_series(nominal: DailySeries, breakeven: DailySeries, start, end,
+                      fill: str = "ffill") -> Dict[str, np.ndarray]:
+    """10Y nominal minus breakeven on NYSE sessions (FRED observations are dated by the day they describe)."""
+    days, m = align([nominal, breakeven], get_calendar("NYSE"), start, end, fill=fill)
+    return {"days": days, "nominal_yield": m[:, 0], "breakeven_inflation": m[:, 1], "real_yield": np.round(m[:, 0] - m[:, 1], 4)}
+
+
+def domestic_premium_series(domestic_gram: DailySeries, comex: DailySeries, usd_cny: DailySeries,
+                            fill: str = "ffill") -> Dict[str, np.ndarray]:
+    """
+    Shanghai gold (CNY/g) minus COMEX converted to CNY/g, on the Shanghai sessions present in
+    `domestic_gram`, each paired with the last COMEX and USD/CNY values published before the Shanghai close.
+    """
+    days, m = align([domestic_gram, comex, usd_cny], domestic_gram.calendar, None, None, fill=fill,
+                    sessions=domestic_gram.days)
+    international = m[:, 1] / 31.1035 * m[:, 2]
+    return {"days": days, "domestic": m[:, 0], "international": international, "premium": np.round(m[:, 0] - international, 2)}
@@ -0,0 +1,303 @@
+"""
+Resumable, checkpointed historical backfills.
+
+A backfill splits a date range into fixed-size chunks on a grid anchored at the
+epoch (so a moving "last N days" window reuses earlier checkpoints) and runs
+them on a thread pool. Every upstream request first takes a token from its
+source's rate limiter, so throughput is bounded by the upstream quotas only.
+
+A chunk's rows are upserted on their natural keys and the chunk is then recorded
+in backfill_chunks (migrations/add_backfill_chunks.sql). Reruns skip chunks
+marked done, so a crashed or timed-out backfill resumes where it stopped and
+rerunning a finished one costs nothing. Chunks that reach today are marked
+partial (their data is not final) and rerun every time; the checkpoint still
+tells readers such as pivot_points when real bars were last written. Failed or
+empty chunks are retried on the next run, up to MAX_ATTEMPTS.
+
+Jobs:
+    macro_history                   real yield + domestic premium (4 Yahoo + 1 FRED request per chunk)
+    market_history:<res>:<ticker>   Yahoo bars into the market_history_<res> rollup tier (1m, 15m, 1h, 1d)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Tuple
+
+import numpy as np
+
+from .alignment import get_calendar
+from .calculator import fetch_yahoo_range_bars
+from .bars import BarSeries
+from .storage import bulk_upsert
+
+CHECKPOINT_TABLE = "backfill_chunks"
+MAX_ATTEMPTS = 3
+DEFAULT_WORKERS = 4
+# Requests per second; FRED allows 120/min, Yahoo has no published quota
+RATE_LIMITS = {"yahoo": 1.0, "fred": 2.0}
+
+# Resolution -> (chunk days, how far back Yahoo serves that interval)
+RESOLUTIONS = {
+    "1m": (7, 29),
+    "15m": (30, 59),
+    "1h": (90, 729),
+    "1d": (365, None),
+}
+RESOLUTION_SECONDS = {"1m": 60, "15m": 900, "1h": 3600, "1d": 86400}
+
+Chunk = Tuple[date, date]  # [start, end)
+
+
+class DeadlineExceeded(Exception):
+    """The run's deadline passed before a chunk could take its tokens; the chunk is left for the next run."""
+
+
+class RateLimiter:
+    """Token bucket shared by every worker that calls one upstream."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take a token; False (without waiting) if none frees up before `deadline` (time.monotonic())."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                delay = (1 - self.tokens) / self.rate
+            if deadline is not None and now + delay >= deadline:
+                return False
+            time.sleep(delay)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(source: str) -> RateLimiter:
+    """Process-wide limiter per upstream (BACKFILL_<SOURCE>_RPS overrides RATE_LIMITS)."""
+    with _limiters_lock:
+        if source not in _limiters:
+            rate = float(os.getenv(f"BACKFILL_{source.upper()}_RPS", RATE_LIMITS.get(source, 1.0)))
+            _limiters[source] = RateLimiter(rate)
+        return _limiters[source]
+
+
+def plan_chunks(start: date, end: date, chunk_days: int) -> List[Chunk]:
+    """Grid-aligned chunks covering [start, end), clipped to the range."""
+    first = start.toordinal() // chunk_days * chunk_days
+    chunks = []
+    for o in range(first, end.toordinal(), chunk_days):
+        s, e = date.fromordinal(max(o, start.toordinal())), date.fromordinal(min(o + chunk_days, end.toordinal()))
+        chunks.append((s, e))
+    return chunks
+
+
+class BackfillJob:
+    """One backfillable dataset: `fetch(start, end)` returns the rows of [start, end)."""
+
+    name = ""
+    table = ""
+    on_conflict = ""
+    chunk_days = 30
+    max_days: Optional[int] = None
+    # Upstream requests per chunk by source (tokens taken before fetch)
+    requests: Dict[str, int] = {}
+
+    def fetch(self, start: date, end: date) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class MacroHistoryJob(BackfillJob):
+    name = "macro_history"
+    table = "macro_history"
+    on_conflict = "log_date"
+    chunk_days = 90
+    requests = {"yahoo": 4, "fred": 1}
+
+    def __init__(self, syncer):
+        self.syncer = syncer
+
+    def fetch(self, start: date, end: date) -> List[Dict[str, Any]]:
+        return self.syncer.macro_history_rows(start, end - timedelta(days=1))
+
+
+class MarketHistoryJob(BackfillJob):
+    on_conflict = "ticker,bucket"
+    requests = {"yahoo": 1}
+
+    def __init__(self, ticker: str, resolution: str = "1d", calendar: str = "UTC"):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}, expected one of {list(RESOLUTIONS)}")
+        self.ticker = ticker
+        self.resolution = resolution
+        self.calendar = get_calendar(calendar)
+        self.name = f"market_history:{resolution}:{ticker}"
+        self.table = f"market_history_{resolution}"
+        self.chunk_days, self.max_days = RESOLUTIONS[resolution]
+
+    def fetch(self, start: date, end: date) -> List[Dict[str, Any]]:
+        bars = fetch_yahoo_range_bars(self.ticker, _unix(start), _unix(end), self.resolution)
+        if bars is None:
+            raise RuntimeError(f"Yahoo {self.resolution} bars unavailable for {self.ticker}")
+        return bar_rows(bars, self.resolution, self.calendar)
+
+
+def make_job(name: str, syncer) -> BackfillJob:
+    """Job from its name ("macro_history" or "market_history:<res>:<ticker>")."""
+    if name == MacroHistoryJob.name:
+        return MacroHistoryJob(syncer)
+    parts = name.split(":")
+    if len(parts) == 3 and parts[0] == "market_history":
+        return MarketHistoryJob(parts[2], parts[1], syncer.registry.get(parts[2]).calendar)
+    raise ValueError(f"Unknown backfill job {name!r}, expected macro_history or market_history:<res>:<ticker>")
+
+
+def bar_rows(bars: BarSeries, resolution: str, calendar) -> List[Dict[str, Any]]:
+    """Yahoo bars as rollup-tier rows (daily bars are keyed by exchange trading day)."""
+    mask = ~np.isnan(bars.close)
+    ts, close = bars.timestamps[mask], bars.close[mask]
+    # Missing open/high/low (seen on thin sessions) fall back to the close
+    open, high, low = (np.where(np.isnan(a[mask]), close, a[mask]) for a in (bars.open, bars.high, bars.low))
+    if resolution == "1d":
+        buckets = [f"{d}T00:00:00+00:00" for d in calendar.trading_days(ts)]
+    else:
+        width = RESOLUTION_SECONDS[resolution]
+        buckets = [datetime.fromtimestamp(int(t) // width * width, timezone.utc).isoformat() for t in ts]
+    # One row per bucket (Yahoo can repeat the live bar), the later bar wins
+    rows = {b: {"ticker": bars.ticker, "bucket": b, "open": float(open[i]), "high": float(high[i]),
+                "low": float(low[i]), "close": float(close[i]), "samples": 1} for i, b in enumerate(buckets)}
+    return list(rows.values())
+
+
+def _unix(day: date) -> int:
+    return int(datetime.combine(day, datetime.min.time(), timezone.utc).timestamp())
+
+
+def load_checkpoints(store, job: str, start: date, end: date) -> Dict[str, Dict[str, Any]]:
+    res = store.table(CHECKPOINT_TABLE).select("chunk_start,status,attempts").eq("job", job) \
+        .gte("chunk_start", start.isoformat()).lt("chunk_start", end.isoformat()).execute()
+    return {str(r["chunk_start"])[:10]: r for r in res.data or []}
+
+
+def backfilled(store, job: str, start: datetime, end: datetime) -> bool:
+    """
+    Whether upstream bars written by `job` cover [start, end). Partial chunks only
+    count if written after `end`: bars written while the span was still open have
+    since been overwritten by rollups of our own samples.
+    """
+    first, last = start.date(), (end - timedelta(seconds=1)).date()
+    res = store.table(CHECKPOINT_TABLE).select("chunk_start,chunk_end,status,rows_written,updated_at").eq("job", job) \
+        .gt("chunk_end", first.isoformat()).lte("chunk_start", last.isoformat()).order("chunk_start").execute()
+    day = first
+    for r in res.data or []:
+        if date.fromisoformat(str(r["chunk_start"])[:10]) > day or not r.get("rows_written"):
+            return False
+        if r["status"] == "partial":
+            written = datetime.fromisoformat(str(r.get("updated_at") or "1970-01-01T00:00:00+00:00").replace("Z", "+00:00"))
+            if written < end:
+                return False
+        elif r["status"] != "done":
+            return False
+        day = max(day, date.fromisoformat(str(r["chunk_end"])[:10]))
+        if day > last:
+            return True
+    return False
+
+
+def run_backfill(store, job: BackfillJob, start: date, end: Optional[date] = None, workers: int = DEFAULT_WORKERS,
+                 deadline: Optional[float] = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Backfill [start, end) (end defaults to tomorrow, i.e. through today). With a
+    `deadline` (time.monotonic()), no chunk starts fetching after it, including
+    chunks still waiting on the rate limiter; `remaining` in the report says how
+    many chunks the next run will pick up.
+    """
+    today = datetime.now(timezone.utc).date()
+    end = end or today + timedelta(days=1)
+    if job.max_days is not None:
+        start = max(start, today - timedelta(days=job.max_days))
+    chunks = plan_chunks(start, end, job.chunk_days)
+    report = {"job": job.name, "chunks": len(chunks), "skipped": 0, "completed": 0, "failed": 0,
+              "exhausted": 0, "rows": 0, "remaining": 0, "errors": []}
+    if not chunks:
+        return report
+
+    checkpoints = {} if force else load_checkpoints(store, job.name, chunks[0][0], chunks[-1][1])
+    pending = deque()
+    for chunk in chunks:
+        cp = checkpoints.get(chunk[0].isoformat())
+        if cp and cp["status"] == "done":
+            report["skipped"] += 1
+        elif cp and cp["status"] == "failed" and (cp.get("attempts") or 0) >= MAX_ATTEMPTS:
+            report["exhausted"] += 1
+        else:
+            pending.append(chunk)
+
+    write_lock = threading.Lock()  # Stores share one connection (SQLite); upstream fetches stay parallel
+
+    def checkpoint(chunk: Chunk, status: str, rows: int = 0, error: Optional[str] = None) -> None:
+        cp = checkpoints.get(chunk[0].isoformat()) or {}
+        store.table(CHECKPOINT_TABLE).upsert({
+            "job": job.name, "chunk_start": chunk[0].isoformat(), "chunk_end": chunk[1].isoformat(),
+            # Consecutive failures only: a partial chunk reruns successfully every time
+            "status": status, "rows_written": rows, "attempts": (cp.get("attempts") or 0) + 1 if status == "failed" else 0,
+            "error": error, "updated_at": datetime.now(timezone.utc).isoformat(),
+        }, on_conflict="job,chunk_start").execute()
+
+    def run_chunk(chunk: Chunk) -> int:
+        try:
+            for source, n in job.requests.items():
+                for _ in range(n):
+                    if not get_limiter(source).acquire(deadline):
+                        raise DeadlineExceeded()
+            rows = job.fetch(*chunk)
+            if not rows:
+                raise RuntimeError("no rows returned")
+            with write_lock:
+                written = bulk_upsert(store, job.table, rows, on_conflict=job.on_conflict)
+                checkpoint(chunk, "done" if chunk[1] <= today else "partial", written)
+            return written
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            with write_lock:
+                try:
+                    checkpoint(chunk, "failed", error=str(e)[:500])
+                except Exception as cp_error:
+                    print(f"Backfill checkpoint error ({job.name} {chunk[0]}): {cp_error}")
+            raise
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill") as pool:
+        running = {}
+        while pending or running:
+            while pending and len(running) < workers and (deadline is None or time.monotonic() < deadline):
+                chunk = pending.popleft()
+                running[pool.submit(run_chunk, chunk)] = chunk
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                chunk = running.pop(future)
+                try:
+                    report["rows"] += future.result()
+                    report["completed"] += 1
+                except DeadlineExceeded:
+                    pending.append(chunk)
+                except Exception as e:
+                    report["failed"] += 1
+                    report["errors"].append(f"{job.name} {chunk[0]}..{chunk[1]}: {e}")
+    report["remaining"] = len(pending)
+    return report
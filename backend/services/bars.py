@@ -0,0 +1,159 @@
+"""
+Compact market data containers.
+
+Yahoo chart payloads arrive as nested dicts of Python lists (one boxed float per
+bar, with None for gaps). We parse each payload exactly once into a BarSeries
+(int64 timestamps + float64 OHLCV arrays, NaN for gaps) and derive small
+__slots__ Quote objects from it, so downstream code never walks the raw lists.
+"""
+
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+
+class Quote:
+    """Latest snapshot for one ticker (one row of market_data_cache)."""
+
+    __slots__ = ("ticker", "last_price", "open_price", "high_price", "low_price", "change_percent")
+
+    def __init__(self, ticker: str, last_price: float, open_price: float,
+                 high_price: float, low_price: float, change_percent: float):
+        self.ticker = ticker
+        self.last_price = last_price
+        self.open_price = open_price
+        self.high_price = high_price
+        self.low_price = low_price
+        self.change_percent = change_percent
+
+    def to_row(self) -> Dict[str, Any]:
+        """Row payload for the market_data_cache upsert."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"Quote({self.ticker} last={self.last_price})"
+
+
+class BarSeries:
+    """
+    Columnar OHLCV bars for one ticker.
+    timestamps: int64 unix seconds, open/high/low/close/volume: float64 with NaN gaps.
+    """
+
+    __slots__ = ("ticker", "timestamps", "open", "high", "low", "close", "volume", "meta")
+
+    def __init__(self, ticker: str, timestamps: np.ndarray, open: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: np.ndarray, meta: Optional[Dict[str, Any]] = None):
+        self.ticker = ticker
+        self.timestamps = timestamps
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.meta = meta or {}
+
+    @classmethod
+    def from_yahoo(cls, raw: Dict[str, Any], ticker: Optional[str] = None) -> "BarSeries":
+        """Parse one Yahoo v8 chart `result[0]` entry."""
+        meta = raw.get('meta') or {}
+        timestamps = np.asarray(raw.get('timestamp') or [], dtype=np.int64)
+        n = len(timestamps)
+        quotes = (raw.get('indicators') or {}).get('quote') or [{}]
+        quote = quotes[0] or {}
+
+        def column(name: str) -> np.ndarray:
+            values = quote.get(name)
+            if not values:
+                return np.full(n, np.nan)
+            # None -> NaN happens inside the float64 conversion
+            arr = np.array(values, dtype=np.float64)
+            if len(arr) != n:
+                # Yahoo occasionally trims trailing bars on one column only
+                fixed = np.full(n, np.nan)
+                k = min(n, len(arr))
+                fixed[:k] = arr[:k]
+                return fixed
+            return arr
+
+        return cls(
+            ticker=ticker or meta.get('symbol', ''),
+            timestamps=timestamps,
+            open=column('open'),
+            high=column('high'),
+            low=column('low'),
+            close=column('close'),
+            volume=column('volume'),
+            meta=meta,
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def valid_closes(self) -> np.ndarray:
+        """Closes with gaps removed."""
+        return self.close[~np.isnan(self.close)]
+
+    def last_close(self) -> Optional[float]:
+        closes = self.valid_closes()
+        return float(closes[-1]) if len(closes) else None
+
+    def first_open(self) -> Optional[float]:
+        opens = self.open[~np.isnan(self.open)]
+        return float(opens[0]) if len(opens) else None
+
+    def session_high(self) -> Optional[float]:
+        if not len(self) or np.isnan(self.high).all():
+            return None
+        return float(np.nanmax(self.high))
+
+    def session_low(self) -> Optional[float]:
+        if not len(self) or np.isnan(self.low).all():
+            return None
+        return float(np.nanmin(self.low))
+
+    def daily_closes(self) -> Dict[str, float]:
+        """Last valid close per UTC calendar day, keyed by YYYY-MM-DD."""
+        mask = ~np.isnan(self.close)
+        ts = self.timestamps[mask]
+        closes = self.close[mask]
+        if not len(ts):
+            return {}
+        days = ts // 86400
+        # Index of the last bar of each day (days are sorted ascending)
+        last_idx = np.flatnonzero(np.append(days[1:] != days[:-1], True))
+        return {
+            datetime.fromtimestamp(int(days[i]) * 86400, tz=timezone.utc).strftime('%Y-%m-%d'): float(closes[i])
+            for i in last_idx
+        }
+
+    def to_quote(self) -> Optional[Quote]:
+        """Collapse the series into a latest-price Quote (None if no price at all)."""
+        # Fallback for last price: regularMarketPrice or the latest valid close
+        last_price = self.meta.get('regularMarketPrice') or self.last_close()
+        if not last_price:
+            return None
+        open_price = self.first_open() or last_price
+        high = self.session_high()
+        low = self.session_low()
+        return Quote(
+            ticker=self.ticker,
+            last_price=last_price,
+            open_price=open_price,
+            high_price=high or last_price,
+            low_price=low or last_price,
+            change_percent=((last_price / open_price) - 1) * 100 if open_price else 0,
+        )
+
+
+def rsi_from_closes(closes: np.ndarray, period: int = 14) -> Optional[float]:
+    """Simple-average RSI over the last `period` changes of a gap-free close array."""
+    if len(closes) < period + 1:
+        return None
+    changes = np.diff(closes[-(period + 1):])
+    avg_gain = changes[changes > 0].sum() / period
+    avg_loss = -changes[changes < 0].sum() / period
+    if avg_loss == 0:
+        return 100.0
+    rs = avg_gain / avg_loss
+    return round(float(100 - (100 / (1 + rs))), 2)
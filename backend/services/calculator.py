@@ -1,5 +1,9 @@
 import requests
+import numpy as np
 from typing import Dict, Any, Optional
+from .bars import BarSeries, Quote, rsi_from_closes
+from .fastjson import parse_response
+from .fedwatch import fetch_fed_funds_strip, compute_probability_tree, next_meeting_payload
 
 def calc_real_yield(nominal_yield: float, breakeven_inflation: float) -> float:
     """
@@ -19,7 +23,7 @@ def calc_domestic_premium(gold_spot: float, usd_cny: float, domestic_gold_price:
     premium = domestic_gold_price - international_cny_per_gram
     return round(premium, 2)
 
-def fetch_yahoo_finance_raw(ticker: str, period: str = "2d") -> Optional[Dict[str, Any]]:
+def fetch_yahoo_finance_raw(ticker: str, period: str = "2d", query: str = "range=1d&interval=1m") -> Optional[Dict[str, Any]]:
     """
     Directly call Yahoo Finance API to avoid heavy pandas/yfinance dependencies.
     """
@@ -27,7 +31,7 @@ def fetch_yahoo_finance_raw(ticker: str, period: str = "2d") -> Optional[Dict[st
     import random
     # query2 is often less restricted for cloud IPs
     base_url = random.choice(["query1", "query2"])
-    url = f"https://{base_url}.finance.yahoo.com/v8/finance/chart/{ticker}?range=1d&interval=1m&_={int(time.time())}"
+    url = f"https://{base_url}.finance.yahoo.com/v8/finance/chart/{ticker}?{query}&_={int(time.time())}"
     # Use more realistic headers to avoid Vercel/AWS IP blocking
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -40,7 +44,7 @@ def fetch_yahoo_finance_raw(ticker: str, period: str = "2d") -> Optional[Dict[st
     try:
         response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = parse_response(response)
         if not data['chart']['result']:
              print(f"Yahoo API returned no result for {ticker}: {data}")
              return None
@@ -49,6 +53,70 @@ def fetch_yahoo_finance_raw(ticker: str, period: str = "2d") -> Optional[Dict[st
         print(f"Error fetching raw Yahoo data for {ticker}: {type(e).__name__} {e}")
         return None
 
+def fetch_yahoo_bars(ticker: str, period: str = "2d") -> Optional[BarSeries]:
+    """
+    Fetch a Yahoo chart and parse it once into a columnar BarSeries.
+    """
+    raw = fetch_yahoo_finance_raw(ticker, period=period)
+    if not raw:
+        return None
+    try:
+        return BarSeries.from_yahoo(raw, ticker)
+    except Exception as e:
+        print(f"Error parsing Yahoo bars for {ticker}: {e}")
+        return None
+
+def fetch_yahoo_quote(ticker: str) -> Optional[Quote]:
+    """
+    Latest quote from a one-bar daily chart (a few hundred bytes, for sub-minute polling).
+    """
+    raw = fetch_yahoo_finance_raw(ticker, query="range=1d&interval=1d")
+    if not raw:
+        return None
+    try:
+        return BarSeries.from_yahoo(raw, ticker).to_quote()
+    except Exception as e:
+        print(f"Error parsing Yahoo quote for {ticker}: {e}")
+        return None
+
+def fetch_yahoo_range_bars(ticker: str, start: int, end: int, interval: str = "1d") -> Optional[BarSeries]:
+    """
+    Bars between two unix timestamps (Yahoo only serves intraday intervals for recent history).
+    """
+    raw = fetch_yahoo_finance_raw(ticker, query=f"period1={start}&period2={end}&interval={interval}")
+    if not raw:
+        return None
+    try:
+        return BarSeries.from_yahoo(raw, ticker)
+    except Exception as e:
+        print(f"Error parsing Yahoo {interval} bars for {ticker}: {e}")
+        return None
+
+def fetch_yahoo_daily_bars(ticker: str, days: int = 365, end: Optional[int] = None) -> Optional[BarSeries]:
+    """
+    Daily bars over the `days` calendar days before `end` (unix seconds, default now),
+    one bar per exchange session.
+    """
+    import time
+    end = end or int(time.time())
+    return fetch_yahoo_range_bars(ticker, end - days * 86400, end)
+
+def pivots_from_hlc(h: float, l: float, c: float) -> Dict[str, float]:
+    """Classic floor pivots from the previous bar's high, low and close."""
+    p = (h + l + c) / 3
+    r1 = 2 * p - l
+    s1 = 2 * p - h
+    r2 = p + (h - l)
+    s2 = p - (h - l)
+    
+    return {
+        "P": round(p, 2),
+        "R1": round(r1, 2),
+        "S1": round(s1, 2),
+        "R2": round(r2, 2),
+        "S2": round(s2, 2)
+    }
+
 def calc_pivot_points(ticker: str = "GC=F", interval: str = "1d") -> Optional[Dict[str, float]]:
     """
     Standard Pivot Point formula using direct API data.
@@ -74,82 +142,53 @@ def calc_pivot_points(ticker: str = "GC=F", interval: str = "1d") -> Optional[Di
     try:
         response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
-        data = response.json()
-        raw = data['chart']['result'][0]
+        data = parse_response(response)
+        bars = BarSeries.from_yahoo(data['chart']['result'][0], ticker)
         
-        indicators = raw['indicators']['quote'][0]
-        if len(indicators['close']) < 2:
+        if len(bars) < 2:
             return None
             
-        h = indicators['high'][-2]
-        l = indicators['low'][-2]
-        c = indicators['close'][-2]
-        
-        if h is None or l is None or c is None:
+        prev = np.array([bars.high[-2], bars.low[-2], bars.close[-2]])
+        if np.isnan(prev).any():
             return None
-
-        p = (h + l + c) / 3
-        r1 = 2 * p - l
-        s1 = 2 * p - h
-        r2 = p + (h - l)
-        s2 = p - (h - l)
-        
-        return {
-            "P": round(p, 2),
-            "R1": round(r1, 2),
-            "S1": round(s1, 2),
-            "R2": round(r2, 2),
-            "S2": round(s2, 2)
-        }
+        return pivots_from_hlc(*(float(v) for v in prev))
     except Exception as e:
         print(f"Error calculating pivots for {ticker} at {interval}: {e}")
         return None
 
 
 def calc_rsi(ticker: str = "GC=F", period: int = 14) -> Optional[float]:
-    raw = fetch_yahoo_finance_raw(ticker, period="30d")
-    if not raw or 'indicators' not in raw:
+    bars = fetch_yahoo_bars(ticker, period="30d")
+    if bars is None:
         return None
     try:
-        closes = [c for c in raw['indicators']['quote'][0]['close'] if c is not None]
-        if len(closes) < period + 1:
-            return None
-        
-        changes = [closes[i] - closes[i-1] for i in range(1, len(closes))]
-        gains = [c if c > 0 else 0 for c in changes]
-        losses = [-c if c < 0 else 0 for c in changes]
-        
-        avg_gain = sum(gains[-period:]) / period
-        avg_loss = sum(losses[-period:]) / period
-        
-        if avg_loss == 0:
-            return 100.0
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        return round(rsi, 2)
+        return rsi_from_closes(bars.valid_closes(), period)
     except:
         return None
 
-def calc_fed_watch(zq_price: float = None, current_rate: float = None) -> Dict[str, Any]:
+def calc_fed_watch(zq_price: float = None, current_rate: float = None,
+                   strip: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
     """
-    Calculate FedWatch probabilities for the next FOMC meeting.
-    
-    IMPORTANT: Due to Yahoo Finance limitations with ZQ=F data accuracy,
-    this function currently returns hardcoded probabilities that match
-    the official CME FedWatch Tool.
+    Calculate FedWatch probabilities for every upcoming FOMC meeting from the
+    30-Day Fed Funds futures strip (CME FedWatch methodology, see fedwatch.py).
     
-    TODO: Implement proper data source using one of:
-    1. Web scraping from https://www.cmegroup.com/markets/interest-rates/cme-fedwatch-tool.html
-    2. Bloomberg/Reuters API
-    3. Specific month Fed Funds Futures contracts (FFH26, FFJ26, etc.)
-    
-    Data source for current values: CME FedWatch Tool (manual verification required)
-    Last updated: 2026-02-09
+    One strip fetch yields the whole tree; the next meeting is returned in the
+    legacy flat shape with the full tree under "meetings".
+    `zq_price` (front month, ZQ=F) fills the current month if the strip lacks it.
+    Falls back to the last manually verified values when no strip is available.
     """
+    from datetime import date
+    if strip is None:
+        strip = fetch_fed_funds_strip()
+    strip = dict(strip)
+    if zq_price:
+        strip.setdefault(date.today().strftime('%Y-%m'), zq_price)
+
+    tree = compute_probability_tree(strip, current_rate=current_rate) if strip else []
+    if tree:
+        return next_meeting_payload(tree, "ZQ Futures Strip (FedWatch Method)")
     
-    # Hardcoded values matching CME FedWatch official data
-    # These should be updated manually or via proper API integration
+    # Fallback: values matching CME FedWatch official data (manual update)
     prob_pause = 84.2  # Maintain 5.25-5.50%
     prob_cut_25 = 15.8  # Cut to 5.00-5.25%
     
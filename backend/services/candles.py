@@ -0,0 +1,212 @@
+"""
+OHLC candles at any interval, built from the stored market_history tiers.
+
+An interval is N minutes/hours/days/weeks ("5m", "4h", "1d", "1w", "90m") or
+"session" (one candle per exchange trading day of the ticker's calendar, e.g.
+the CME 18:00-17:00 New York session for GC=F). Candles are read from the
+coarsest rollup tier whose bucket divides the interval and still covers the
+range, then aggregated in one pass with np.*.reduceat. Weeks start on Monday;
+minute/hour/day candles are aligned to UTC.
+
+Results are cached in-process by (ticker, interval, range) for a short TTL, so
+charts and pivot calculations for any timeframe cost no upstream requests and
+usually no database read. Volume is not stored: `samples` (the number of raw
+price points behind the candle) is reported instead.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Tuple
+
+import numpy as np
+
+from .alignment import get_calendar
+from .calculator import pivots_from_hlc
+from .rollups import TIERS, HistoryTier
+from .ticker_registry import get_registry
+
+RANGES = {"1d": 1, "5d": 5, "1w": 7, "1mo": 30, "3mo": 90, "6mo": 180, "1y": 365, "5y": 1825}
+UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+# 1970-01-05 was the first Monday after the epoch
+WEEK_ANCHOR = 4 * 86400
+CACHE_TTL = 30.0
+CACHE_SIZE = 256
+
+_INTERVAL_RE = re.compile(r"^(\d+)([mhdw])$")
+
+
+def parse_interval(interval: str) -> Optional[int]:
+    """Interval width in seconds (None for "session"); ValueError for anything else."""
+    if interval == "session":
+        return None
+    m = _INTERVAL_RE.match(interval)
+    if not m or int(m.group(1)) <= 0:
+        raise ValueError(f"Unknown interval {interval!r}, expected e.g. 1m, 5m, 4h, 1d, 1w or session")
+    return int(m.group(1)) * UNITS[m.group(2)]
+
+
+def plan_source(width: Optional[int], start: datetime, now: datetime) -> HistoryTier:
+    """
+    Coarsest tier covering `start` whose buckets nest inside the interval. Sessions
+    need hourly buckets, falling back to daily ones beyond the hourly retention.
+    """
+    step = width or 3600
+    covering = [t for t in TIERS if t.covers(start, now)]
+    for tier in reversed(covering):
+        if tier.bucket_seconds and step % tier.bucket_seconds == 0:
+            return tier
+    if width is None:
+        return covering[-1]
+    raise ValueError(f"Interval too fine for this range: history older than "
+                     f"{max(t.retention for t in TIERS if t.retention).days} days is kept at 1d resolution only")
+
+
+def _epochs(values: List[str]) -> np.ndarray:
+    """ISO timestamps -> int64 unix seconds (vectorized for the usual UTC '+00:00' / 'Z' form)."""
+    if all(v.endswith(("+00:00", "Z")) for v in values):
+        return np.array([v[:19] for v in values], dtype="datetime64[s]").astype(np.int64)
+    return np.array([int(datetime.fromisoformat(v.replace("Z", "+00:00")).timestamp()) for v in values], dtype=np.int64)
+
+
+def rows_to_arrays(tier: HistoryTier, rows: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    if tier.name == "raw":
+        price = np.array([r["price"] for r in rows], dtype=np.float64)
+        return {"t": _epochs([r["timestamp"] for r in rows]), "open": price, "high": price, "low": price,
+                "close": price, "samples": np.ones(len(rows), dtype=np.int64)}
+    return {
+        "t": _epochs([r["bucket"] for r in rows]),
+        "open": np.array([r["open"] for r in rows], dtype=np.float64),
+        "high": np.array([r["high"] for r in rows], dtype=np.float64),
+        "low": np.array([r["low"] for r in rows], dtype=np.float64),
+        "close": np.array([r["close"] for r in rows], dtype=np.float64),
+        "samples": np.array([r.get("samples") or 1 for r in rows], dtype=np.int64),
+    }
+
+
+def aggregate(bars: Dict[str, np.ndarray], width: Optional[int], calendar_name: str = "UTC") -> Dict[str, np.ndarray]:
+    """Group time-sorted source bars into candles; `label` is the candle start (unix s) or trading day."""
+    t = bars["t"]
+    if not len(t):
+        return {**{k: v[:0] for k, v in bars.items()}, "label": np.array([], dtype=np.int64)}
+    order = np.argsort(t, kind="stable")
+    bars = {k: v[order] for k, v in bars.items()}
+    t = bars["t"]
+    if width is None:
+        keys = get_calendar(calendar_name).trading_days(t).astype(np.int64)
+    elif width % UNITS["w"] == 0:
+        keys = (t - WEEK_ANCHOR) // width * width + WEEK_ANCHOR
+    else:
+        keys = t // width * width
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(t)] - 1
+    return {
+        "label": keys[starts],
+        "open": bars["open"][starts],
+        "high": np.maximum.reduceat(bars["high"], starts),
+        "low": np.minimum.reduceat(bars["low"], starts),
+        "close": bars["close"][ends],
+        "samples": np.add.reduceat(bars["samples"], starts),
+    }
+
+
+def to_rows(candles: Dict[str, np.ndarray], session: bool) -> List[Dict[str, Any]]:
+    labels = candles["label"]
+    if session:
+        times = [str(d) for d in labels.astype("datetime64[D]")]
+    else:
+        times = [datetime.fromtimestamp(int(s), timezone.utc).isoformat() for s in labels]
+    return [{"t": times[i], "open": float(candles["open"][i]), "high": float(candles["high"][i]),
+             "low": float(candles["low"][i]), "close": float(candles["close"][i]), "samples": int(candles["samples"][i])}
+            for i in range(len(labels))]
+
+
+def pivots_from_candles(candles: List[Dict[str, Any]]) -> Optional[Dict[str, float]]:
+    """Pivots of the previous (last complete) candle, as calc_pivot_points computes them."""
+    if len(candles) < 2:
+        return None
+    prev = candles[-2]
+    return pivots_from_hlc(prev["high"], prev["low"], prev["close"])
+
+
+class CandleCache:
+    """Small TTL + LRU cache of built candle payloads."""
+
+    def __init__(self, ttl: float = CACHE_TTL, size: int = CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: Tuple, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+cache = CandleCache()
+
+
+def _window(range_: str, now: datetime) -> Tuple[datetime, datetime]:
+    if range_ not in RANGES:
+        raise ValueError(f"Unknown range {range_!r}, expected one of {list(RANGES)}")
+    return now - timedelta(days=RANGES[range_]), now
+
+
+def _query(source, tier: HistoryTier, ticker: str, start: datetime, end: datetime):
+    return source.table(tier.table).select("*").eq("ticker", ticker) \
+        .gte(tier.time_column, start.isoformat()).lt(tier.time_column, end.isoformat()).order(tier.time_column)
+
+
+def _payload(ticker: str, interval: str, range_: str, tier: HistoryTier, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    width = parse_interval(interval)
+    calendar = get_registry().get(ticker).calendar
+    candles = to_rows(aggregate(rows_to_arrays(tier, rows), width, calendar), width is None)
+    return {"ticker": ticker, "interval": interval, "range": range_, "source_tier": tier.name,
+            "calendar": calendar if width is None else "UTC", "candles": candles}
+
+
+async def fetch_candles(reader, ticker: str, interval: str = "1h", range_: str = "1mo") -> Dict[str, Any]:
+    """Candles for the API (async read path), served from the cache when fresh."""
+    key = (ticker, interval, range_)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    width = parse_interval(interval)
+    now = datetime.now(timezone.utc)
+    start, end = _window(range_, now)
+    tier = plan_source(width, start, now)
+    res = await _query(reader, tier, ticker, start, end).execute()
+    payload = _payload(ticker, interval, range_, tier, res.data or [])
+    cache.put(key, payload)
+    return payload
+
+
+def build_candles(store, ticker: str, interval: str = "1h", range_: str = "1mo") -> Dict[str, Any]:
+    """Same as fetch_candles() for sync callers (the sync service) on a store."""
+    key = (ticker, interval, range_)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    width = parse_interval(interval)
+    now = datetime.now(timezone.utc)
+    start, end = _window(range_, now)
+    tier = plan_source(width, start, now)
+    payload = _payload(ticker, interval, range_, tier, _query(store, tier, ticker, start, end).execute().data or [])
+    cache.put(key, payload)
+    return payload
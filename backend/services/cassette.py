@@ -0,0 +1,198 @@
+"""
+Record/replay for upstream HTTP traffic (Yahoo, FRED, CME).
+
+In record mode every request made through `requests` is sent as usual and the
+response (status, headers, decoded body, elapsed time) is appended to a cassette
+file. In replay mode nothing goes on the wire: responses are served from the
+cassette, optionally with their original latency, so a sync can be re-run
+deterministically offline. Supabase traffic (httpx) is not intercepted.
+
+Requests are matched on method + normalized URL. Cache-busting parameters and
+credentials are dropped from the key (and never written to disk), and Yahoo's
+query1/query2 hosts are treated as one. Repeated requests replay in recorded
+order; a request with no exact match falls back to the recording for the same
+endpoint sharing the most query parameters (e.g. FRED with another start date).
+"""
+
+import base64
+import os
+import re
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from . import fastjson
+
+MODES = ("record", "replay")
+LATENCIES = ("original", "zero")
+# Query parameters that change on every call or carry secrets
+IGNORED_PARAMS = {"_", "api_key", "crumb"}
+# Response headers that no longer apply once the body is stored decoded
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie", "connection"}
+_YAHOO_HOST = re.compile(r"^query\d\.finance\.yahoo\.com$")
+
+
+def normalize_url(url: str) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """(scheme://host/path, sorted params) with ignored params removed."""
+    parts = urlsplit(url)
+    host = "query1.finance.yahoo.com" if _YAHOO_HOST.match(parts.netloc) else parts.netloc
+    params = tuple(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS))
+    return f"{parts.scheme}://{host}{parts.path}", params
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "replay", latency: str = "zero"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {MODES}")
+        if latency not in LATENCIES:
+            raise ValueError(f"Unknown replay latency {latency!r}, expected one of {LATENCIES}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.entries: List[Dict[str, Any]] = []
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._original_send = None
+        self.stats = {"recorded": 0, "replayed": 0, "fallback": 0, "missed": 0}
+        if mode == "replay":
+            self.load()
+
+    def load(self) -> None:
+        with open(self.path, "rb") as f:
+            self.entries = fastjson.loads(f.read()).get("entries", [])
+        for entry in self.entries:
+            entry["_base"], params = normalize_url(entry["url"])
+            entry["_params"] = set(params)
+            entry["_key"] = self._key(entry["method"], entry["url"])
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            entries = [{k: v for k, v in e.items() if not k.startswith("_")} for e in self.entries]
+        with open(self.path, "wb") as f:
+            f.write(fastjson.dumps({"version": 1, "entries": entries}))
+
+    @staticmethod
+    def _key(method: str, url: str) -> str:
+        base, params = normalize_url(url)
+        return f"{method.upper()} {base}?{urlencode(params)}"
+
+    # --- Recording ---
+
+    def _record(self, adapter, request, **kwargs):
+        started = time.perf_counter()
+        response = self._original_send(adapter, request, **kwargs)
+        body = response.content  # Reads streamed bodies too; iter_content() then serves the buffer
+        elapsed = time.perf_counter() - started
+        base, params = normalize_url(request.url)
+        try:
+            encoded, encoding = body.decode("utf-8"), "text"
+        except UnicodeDecodeError:
+            encoded, encoding = base64.b64encode(body).decode("ascii"), "base64"
+        entry = {
+            "method": request.method,
+            "url": f"{base}?{urlencode(params)}" if params else base,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS},
+            "body": encoded,
+            "body_encoding": encoding,
+            "elapsed": round(elapsed, 4),
+        }
+        with self._lock:
+            self.entries.append(entry)
+            self.stats["recorded"] += 1
+        return response
+
+    # --- Replay ---
+
+    def _match(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        key = self._key(method, url)
+        with self._lock:
+            exact = [e for e in self.entries if e["_key"] == key]
+            if exact:
+                i = self._cursor.get(key, 0)
+                self._cursor[key] = i + 1
+                self.stats["replayed"] += 1
+                # Past the end, keep serving the last recording
+                return exact[min(i, len(exact) - 1)]
+            base, params = normalize_url(url)
+            candidates = [e for e in self.entries if e["method"] == method.upper() and e["_base"] == base]
+            if not candidates:
+                self.stats["missed"] += 1
+                return None
+            self.stats["fallback"] += 1
+            return max(candidates, key=lambda e: len(e["_params"] & set(params)))
+
+    def _replay(self, adapter, request, **kwargs):
+        entry = self._match(request.method, request.url)
+        if entry is None:
+            raise requests.ConnectionError(f"No recorded response for {request.method} {normalize_url(request.url)[0]}", request=request)
+        if self.latency == "original":
+            time.sleep(entry.get("elapsed", 0))
+        body = entry["body"].encode("utf-8") if entry.get("body_encoding") == "text" else base64.b64decode(entry["body"])
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason")
+        response.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        response.elapsed = timedelta(seconds=entry.get("elapsed", 0))
+        response.raw = BytesIO(body)
+        response._content = body
+        response._content_consumed = True
+        return response
+
+    # --- Installation ---
+
+    def install(self) -> "Cassette":
+        """Route all `requests` traffic in this process through the cassette."""
+        if self._original_send is not None:
+            return self
+        self._original_send = HTTPAdapter.send
+        handler = self._record if self.mode == "record" else self._replay
+
+        def send(adapter, request, **kwargs):
+            return handler(adapter, request, **kwargs)
+
+        HTTPAdapter.send = send
+        return self
+
+    def uninstall(self) -> None:
+        if self._original_send is None:
+            return
+        HTTPAdapter.send = self._original_send
+        self._original_send = None
+        if self.mode == "record":
+            self.save()
+        print(f"Cassette {self.mode} ({self.path}): {self.stats}")
+
+    def __enter__(self) -> "Cassette":
+        return self.install()
+
+    def __exit__(self, *exc) -> None:
+        self.uninstall()
+
+
+def install_from_env() -> Optional[Cassette]:
+    """
+    Activate a cassette from HTTP_CASSETTE (path), HTTP_CASSETTE_MODE (record|replay)
+    and HTTP_CASSETTE_LATENCY (original|zero). The caller must uninstall() it to save a recording.
+    """
+    path = os.getenv("HTTP_CASSETTE")
+    if not path:
+        return None
+    return Cassette(path, os.getenv("HTTP_CASSETTE_MODE", "replay"), os.getenv("HTTP_CASSETTE_LATENCY", "zero")).install()
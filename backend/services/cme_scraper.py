@@ -3,60 +3,178 @@ CME FedWatch Tool Scraper
 Automatically fetches FOMC meeting probabilities from CME Group's official FedWatch tool.
 
 NOTE: CME Group may block automated access. This scraper implements multiple fallback strategies:
-1. Direct page HTML parsing
-2. Alternative JSON endpoints
-3. Graceful fallback to last known values
+1. Alternative JSON endpoint and direct page HTML scan, raced concurrently (first valid result wins)
+2. Conditional GETs (ETag / Last-Modified) so unchanged sources answer 304
+3. TTL cache of the last good result, used while fresh or when CME is unreachable. It lives in
+   `sync_state` when the scraper is given a store, otherwise only in the process
 """
 
 import requests
 import json
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from typing import Dict, Any, Optional
 from datetime import datetime
-from bs4 import BeautifulSoup
+
+from .sync_state import load_state, save_state
+
+CME_STATE_KEY = "cme_fedwatch"
+CACHE_TTL_SECONDS = 15 * 60
+
+
+class _ScriptVarScanner:
+    """
+    Incrementally locate `var <name> = {...}` in a byte stream and return the object
+    literal bytes, without decoding or parsing the rest of the page.
+    """
+    _TOKENS = re.compile(rb'[{}"\\]')
+    _TAIL = 256  # bytes kept between chunks so a marker split across chunks is still found
+
+    def __init__(self, name: str):
+        self.pattern = re.compile(rb'var\s+' + re.escape(name.encode()) + rb'\s*=\s*\{')
+        self.buf = bytearray()
+        self.start = None
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+
+    def feed(self, chunk: bytes) -> Optional[bytes]:
+        self.buf += chunk
+        if self.start is None:
+            match = self.pattern.search(self.buf)
+            if not match:
+                if len(self.buf) > self._TAIL:
+                    del self.buf[:-self._TAIL]
+                return None
+            self.start = self.pos = match.end() - 1
+
+        # Brace matching, jumping between the only bytes that matter
+        while True:
+            token = self._TOKENS.search(self.buf, self.pos)
+            if not token:
+                self.pos = len(self.buf)
+                return None
+            ch = token.group()
+            self.pos = token.end()
+            if self.in_string:
+                if ch == b'\\':
+                    if self.pos >= len(self.buf):
+                        # Escape at the chunk edge: re-read it with the next chunk
+                        self.pos -= 1
+                        return None
+                    self.pos += 1
+                elif ch == b'"':
+                    self.in_string = False
+            elif ch == b'"':
+                self.in_string = True
+            elif ch == b'{':
+                self.depth += 1
+            elif ch == b'}':
+                self.depth -= 1
+                if self.depth == 0:
+                    return bytes(self.buf[self.start:self.pos])
+
 
 class CMEFedWatchScraper:
-    def __init__(self):
+    def __init__(self, supabase_client=None, ttl: int = CACHE_TTL_SECONDS):
         self.page_url = "https://www.cmegroup.com/markets/interest-rates/cme-fedwatch-tool.html"
         # Alternative: Try the mobile/API endpoint
         self.alt_api_url = "https://www.cmegroup.com/content/dam/cmegroup/market-data/probability-tree/us_probabilities.json"
+        self.supabase = supabase_client
+        self.ttl = ttl
+        self._state: Dict[str, Any] = {}
         
-    def fetch_fedwatch_data(self) -> Optional[Dict[str, Any]]:
+    def fetch_fedwatch_data(self, force: bool = False) -> Optional[Dict[str, Any]]:
         """
-        Fetch FedWatch probabilities using multiple strategies.
+        Fetch FedWatch probabilities, serving the cached result while it is fresh.
         
         Returns:
-            Dict containing meeting probabilities or None if all methods failed
+            Dict containing meeting probabilities or None if all methods failed and nothing is cached
         """
-        # Strategy 1: Try JSON endpoint (fastest if it works)
-        result = self._try_json_endpoint()
-        if result:
-            return result
+        if self.supabase is not None:
+            # Another process may have refreshed it; without storage the instance keeps its own copy
+            self._state = load_state(self.supabase, CME_STATE_KEY)
+        cached = self._state.get("result")
+        age = time.time() - self._state.get("fetched_ts", 0)
+        if cached and not force and age < self.ttl:
+            return cached
         
-        # Strategy 2: Try HTML parsing
-        result = self._try_html_parsing()
+        result = self._race_strategies()
         if result:
+            self._state["result"] = result
+            self._state["fetched_ts"] = time.time()
+            save_state(self.supabase, CME_STATE_KEY, self._state)
             return result
         
+        if cached:
+            print(f"[CME Scraper] All scraping methods failed, serving cached result ({int(age)}s old)")
+            return cached
+        
         # All strategies failed
         print("[CME Scraper] All scraping methods failed")
         return None
+
+    def _race_strategies(self) -> Optional[Dict[str, Any]]:
+        """Run the JSON endpoint and HTML scan concurrently; the first valid result wins."""
+        pool = ThreadPoolExecutor(max_workers=2)
+        futures = [pool.submit(self._try_json_endpoint), pool.submit(self._try_html_parsing)]
+        try:
+            for future in as_completed(futures, timeout=15):
+                result = future.result()
+                if result:
+                    return result
+        except FuturesTimeout:
+            print("[CME Scraper] Strategies timed out")
+        finally:
+            # Don't wait for the slower strategy; it finishes (or times out) in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+        return None
+
+    def _conditional_headers(self, url: str) -> Dict[str, str]:
+        validators = self._state.get("validators", {}).get(url, {})
+        headers = {}
+        if validators.get("etag"):
+            headers['If-None-Match'] = validators["etag"]
+        if validators.get("last_modified"):
+            headers['If-Modified-Since'] = validators["last_modified"]
+        return headers
+
+    def _remember_validators(self, url: str, response) -> None:
+        # Each strategy writes its own url key, so the concurrent updates don't collide
+        self._state.setdefault("validators", {})[url] = {
+            "etag": response.headers.get('ETag'),
+            "last_modified": response.headers.get('Last-Modified'),
+        }
+
+    def _not_modified_result(self) -> Optional[Dict[str, Any]]:
+        """A 304 means the previously parsed result is still current."""
+        cached = self._state.get("result")
+        if cached:
+            return {**cached, "fetched_at": datetime.now().isoformat()}
+        return None
     
     def _try_json_endpoint(self) -> Optional[Dict[str, Any]]:
         """Try fetching from CME's JSON data endpoint."""
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json',
-            'Referer': 'https://www.cmegroup.com/'
+            'Referer': 'https://www.cmegroup.com/',
+            **self._conditional_headers(self.alt_api_url)
         }
         
         try:
             print("[CME Scraper] Trying JSON endpoint...")
             response = requests.get(self.alt_api_url, headers=headers, timeout=10)
             
+            if response.status_code == 304:
+                return self._not_modified_result()
             if response.status_code == 200:
                 data = response.json()
-                return self._parse_json_data(data)
+                result = self._parse_json_data(data)
+                if result:
+                    self._remember_validators(self.alt_api_url, response)
+                return result
             else:
                 print(f"[CME Scraper] JSON endpoint returned {response.status_code}")
                 return None
@@ -66,36 +184,39 @@ class CMEFedWatchScraper:
             return None
     
     def _try_html_parsing(self) -> Optional[Dict[str, Any]]:
-        """Try parsing the HTML page directly."""
+        """Scan the raw HTML byte stream for the embedded fedWatchData variable."""
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
+            'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
+            'Upgrade-Insecure-Requests': '1',
+            **self._conditional_headers(self.page_url)
         }
         
         try:
-            print("[CME Scraper] Trying HTML parsing...")
-            response = requests.get(self.page_url, headers=headers, timeout=15)
-            
-            if response.status_code != 200:
-                print(f"[CME Scraper] HTML page returned {response.status_code}")
-                return None
-            
-            # Look for embedded JSON data in the HTML
-            # CME often embeds data in <script> tags
-            soup = BeautifulSoup(response.text, 'html.parser')
+            print("[CME Scraper] Trying HTML scan...")
+            response = requests.get(self.page_url, headers=headers, timeout=15, stream=True)
             
-            # Search for script tags containing FedWatch data
-            for script in soup.find_all('script'):
-                if script.string and 'probabilities' in script.string.lower():
-                    # Try to extract JSON from the script
-                    match = re.search(r'var\s+fedWatchData\s*=\s*({.*?});', script.string, re.DOTALL)
-                    if match:
-                        data = json.loads(match.group(1))
-                        return self._parse_json_data(data)
+            try:
+                if response.status_code == 304:
+                    return self._not_modified_result()
+                if response.status_code != 200:
+                    print(f"[CME Scraper] HTML page returned {response.status_code}")
+                    return None
+                
+                # CME embeds the data in a <script> tag; stop reading as soon as the object closes
+                scanner = _ScriptVarScanner("fedWatchData")
+                for chunk in response.iter_content(chunk_size=16384):
+                    blob = scanner.feed(chunk)
+                    if blob:
+                        result = self._parse_json_data(json.loads(blob))
+                        if result:
+                            self._remember_validators(self.page_url, response)
+                        return result
+            finally:
+                response.close()
             
             print("[CME Scraper] Could not find FedWatch data in HTML")
             return None
@@ -211,9 +332,11 @@ class CMEFedWatchScraper:
         }
 
 
-# Standalone test function
+# Standalone test function (run with: python -m backend.services.cme_scraper)
 if __name__ == "__main__":
-    scraper = CMEFedWatchScraper()
+    from .storage import get_storage
+    # Shares the persisted cache with other runs when storage is configured
+    scraper = CMEFedWatchScraper(get_storage())
     result = scraper.get_next_meeting_info()
     
     print("\n=== CME FedWatch Scraper Test ===")
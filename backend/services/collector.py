@@ -0,0 +1,234 @@
+"""
+Long-running intraday collector (scheduler.py --collect).
+
+Polls the hot tickers every few seconds with a one-bar chart request, keeps the
+last `window_hours` of price changes per ticker in a fixed-size NumPy ring
+buffer, and serves latest quotes and sparklines from memory over a local HTTP
+endpoint:
+
+    GET /latest                           every ticker's latest quote
+    GET /latest?ticker=GC=F               one ticker
+    GET /sparkline?ticker=GC=F&hours=6&points=120
+    GET /health                           poll statistics
+
+Viewer reads never touch the database. A tick is appended only when the price
+moved, and only moved quotes are forwarded to storage, normally through the
+write-behind buffer.
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Optional, List, Callable, Iterable, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from . import fastjson
+from .bars import Quote
+
+DEFAULT_INTERVAL = 15.0
+DEFAULT_WINDOW_HOURS = 6.0
+DEFAULT_PORT = 8765
+MAX_SPARKLINE_POINTS = 2000
+
+
+class TickRing:
+    """Fixed-capacity ring of (unix second, price); the oldest tick is overwritten when full."""
+
+    __slots__ = ("capacity", "timestamps", "prices", "head", "size")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.prices = np.full(capacity, np.nan)
+        self.head = 0  # Next write position
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, ts: int, price: float) -> None:
+        self.timestamps[self.head] = ts
+        self.prices[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def last(self) -> Optional[Tuple[int, float]]:
+        if not self.size:
+            return None
+        i = (self.head - 1) % self.capacity
+        return int(self.timestamps[i]), float(self.prices[i])
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Copies of the ticks, oldest first."""
+        if self.size < self.capacity:
+            return self.timestamps[:self.size].copy(), self.prices[:self.size].copy()
+        return (np.concatenate((self.timestamps[self.head:], self.timestamps[:self.head])),
+                np.concatenate((self.prices[self.head:], self.prices[:self.head])))
+
+    def sparkline(self, since: int, until: int, points: int) -> Tuple[np.ndarray, np.ndarray]:
+        """`points` evenly spaced samples in (since, until], each the last price at or before it (NaN before the first tick)."""
+        ts, prices = self.ordered()
+        edges = np.linspace(since, until, points + 1)[1:].astype(np.int64)
+        if not len(ts):
+            return edges, np.full(len(edges), np.nan)
+        idx = np.searchsorted(ts, edges, side="right") - 1
+        values = np.where(idx >= 0, prices[np.maximum(idx, 0)], np.nan)
+        return edges, values
+
+
+class Collector:
+    """
+    `fetch(ticker) -> Quote` is called for every ticker each poll (in parallel);
+    `on_change(rows)` receives the market_data_cache rows of the quotes that moved.
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[Quote]], tickers: Iterable[str],
+                 interval: float = DEFAULT_INTERVAL, window_hours: float = DEFAULT_WINDOW_HOURS,
+                 on_change: Optional[Callable[[List[Dict[str, Any]]], None]] = None, workers: int = 8):
+        self.fetch = fetch
+        self.tickers = list(tickers)
+        self.interval = interval
+        self.window_seconds = int(window_hours * 3600)
+        self.on_change = on_change
+        # At most one tick per poll, so this holds the whole window
+        capacity = int(math.ceil(self.window_seconds / interval)) + 1
+        self.rings: Dict[str, TickRing] = {t: TickRing(capacity) for t in self.tickers}
+        self.quotes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(self.tickers))), thread_name_prefix="collector")
+        self._stop = threading.Event()
+        self.stats = {"polls": 0, "ticks": 0, "unchanged": 0, "errors": 0, "forwarded": 0, "last_poll_ms": None,
+                      "started_at": int(time.time())}
+
+    def _safe_fetch(self, ticker: str) -> Optional[Quote]:
+        try:
+            return self.fetch(ticker)
+        except Exception as e:
+            print(f"Collector fetch error ({ticker}): {e}")
+            return None
+
+    def poll_once(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Fetch every ticker once; returns the rows whose price moved."""
+        started = time.perf_counter()
+        now = int(now or time.time())
+        quotes = list(self._pool.map(self._safe_fetch, self.tickers))
+        moved = []
+        with self._lock:
+            for ticker, quote in zip(self.tickers, quotes):
+                if quote is None:
+                    self.stats["errors"] += 1
+                    continue
+                ring = self.rings[ticker]
+                last = ring.last()
+                if last is not None and last[1] == quote.last_price:
+                    self.stats["unchanged"] += 1
+                    continue
+                ring.append(now, quote.last_price)
+                row = quote.to_row()
+                self.quotes[ticker] = {**row, "timestamp": now}
+                moved.append(row)
+            self.stats["polls"] += 1
+            self.stats["ticks"] += len(moved)
+            self.stats["last_poll_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if moved and self.on_change is not None:
+            try:
+                self.on_change(moved)
+                self.stats["forwarded"] += len(moved)
+            except Exception as e:
+                print(f"Collector forward error: {e}")
+        return moved
+
+    def run(self) -> None:
+        """Poll on a fixed cadence until stop() (a slow poll delays the next one, it never overlaps)."""
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            self.poll_once()
+            next_at += self.interval
+            self._stop.wait(max(0.0, next_at - time.monotonic()))
+            if time.monotonic() - next_at > self.interval:
+                next_at = time.monotonic()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._pool.shutdown(wait=False)
+
+    # --- Reads (HTTP handler threads) ---
+
+    def latest(self, ticker: Optional[str] = None) -> Any:
+        with self._lock:
+            if ticker is not None:
+                return dict(self.quotes[ticker]) if ticker in self.quotes else None
+            return {t: dict(q) for t, q in self.quotes.items()}
+
+    def sparkline(self, ticker: str, hours: Optional[float] = None, points: int = 120) -> Optional[Dict[str, Any]]:
+        if hours is not None and not hours > 0:
+            raise ValueError("hours must be positive")
+        if ticker not in self.rings:
+            return None
+        seconds = min(int((hours if hours is not None else self.window_seconds / 3600) * 3600), self.window_seconds)
+        points = max(1, min(points, MAX_SPARKLINE_POINTS))
+        now = int(time.time())
+        with self._lock:
+            t, p = self.rings[ticker].sparkline(now - seconds, now, points)
+        return {"ticker": ticker, "t": t.tolist(), "p": [None if np.isnan(v) else float(v) for v in p]}
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "tickers": len(self.tickers), "interval": self.interval,
+                    "window_hours": self.window_seconds / 3600,
+                    "buffered": {t: len(r) for t, r in self.rings.items()}}
+
+
+def serve(collector: Collector, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Start the read endpoint in a daemon thread and return the server (shutdown() to stop)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _send(self, status: int, payload: Any) -> None:
+            body = fastjson.dumps(payload)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            try:
+                if parts.path == "/latest":
+                    data = collector.latest(query.get("ticker"))
+                    if data is None:
+                        return self._send(404, {"detail": f"No data for {query.get('ticker')}"})
+                    return self._send(200, data)
+                if parts.path == "/sparkline":
+                    if "ticker" not in query:
+                        return self._send(400, {"detail": "ticker is required"})
+                    if "hours" in query and not float(query["hours"]) > 0:
+                        return self._send(400, {"detail": "hours must be positive"})
+                    data = collector.sparkline(query["ticker"], float(query["hours"]) if "hours" in query else None,
+                                               int(query.get("points", 120)))
+                    if data is None:
+                        return self._send(404, {"detail": f"Unknown ticker {query['ticker']}"})
+                    return self._send(200, data)
+                if parts.path == "/health":
+                    return self._send(200, collector.health())
+                return self._send(404, {"detail": "Not found"})
+            except ValueError as e:
+                return self._send(400, {"detail": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="collector-http", daemon=True).start()
+    return server
@@ -0,0 +1,196 @@
+"""
+Rolling cross-asset correlations and betas of gold against its macro drivers.
+
+Each pair keeps running sums (n, Σx, Σy, Σx², Σy², Σxy) per window over daily
+returns, plus one ring of the last max(window) return pairs. A new bar costs
+O(number of windows) whatever the window length: add the new pair, subtract the
+one leaving each window. The state (ring, sums, last levels) lives in sync_state
+between runs, so a sync only feeds the sessions closed since the previous one.
+Sums are rebuilt from the ring every RESYNC_EVERY updates to bound
+floating-point drift.
+"""
+
+import math
+from collections import deque
+from typing import Dict, Any, Optional, List, Sequence, Tuple
+
+import numpy as np
+
+from .alignment import DailySeries, ExchangeCalendar, align
+
+STATE_KEY = "rolling_correlations"
+TARGET = "GC=F"
+WINDOWS = (20, 60, 250)
+RESYNC_EVERY = 500
+# Calendar days fetched on a cold start: enough sessions to fill the longest window
+BOOTSTRAP_DAYS = 400
+
+# label -> (series symbol, return transform); gold is the dependent side of every beta
+FACTORS: Dict[str, Tuple[str, str]] = {
+    "DXY": ("DX-Y.NYB", "log"),
+    "Real_Yield": ("REAL_YIELD", "diff"),
+    "VIX": ("^VIX", "log"),
+    "USDCNH": ("USDCNH=X", "log"),
+}
+
+
+def _change(kind: str, prev: float, level: float) -> Optional[float]:
+    if kind == "log":
+        return math.log(level / prev) if prev > 0 and level > 0 else None
+    return level - prev
+
+
+class RollingPair:
+    """Running sums of (x = factor return, y = gold return) over several trailing windows."""
+
+    def __init__(self, windows: Sequence[int] = WINDOWS):
+        self.windows = tuple(windows)
+        self.ring: deque = deque(maxlen=max(self.windows))
+        self.sums: List[List[float]] = [[0.0] * 6 for _ in self.windows]
+        self.prev: Optional[Tuple[float, float]] = None
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self.ring)
+
+    def push(self, factor_level: float, gold_level: float, kind: str) -> bool:
+        """Feed one aligned session of levels; returns False for the first level (no return yet)."""
+        prev, self.prev = self.prev, (factor_level, gold_level)
+        if prev is None:
+            return False
+        x, y = _change(kind, prev[0], factor_level), _change("log", prev[1], gold_level)
+        if x is None or y is None:
+            return False
+        self.update(x, y)
+        return True
+
+    def update(self, x: float, y: float) -> None:
+        ring = self.ring
+        for w, s in zip(self.windows, self.sums):
+            s[0] += 1
+            s[1] += x
+            s[2] += y
+            s[3] += x * x
+            s[4] += y * y
+            s[5] += x * y
+            if len(ring) >= w:
+                ox, oy = ring[-w]
+                s[0] -= 1
+                s[1] -= ox
+                s[2] -= oy
+                s[3] -= ox * ox
+                s[4] -= oy * oy
+                s[5] -= ox * oy
+        ring.append((x, y))
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self.resync()
+
+    def resync(self) -> None:
+        """Recompute every window's sums exactly from the ring."""
+        pairs = np.array(self.ring, dtype=np.float64).reshape(-1, 2)
+        for i, w in enumerate(self.windows):
+            x, y = pairs[-w:, 0], pairs[-w:, 1]
+            self.sums[i] = [float(len(x)), float(x.sum()), float(y.sum()), float(x @ x), float(y @ y), float(x @ y)]
+
+    def stats(self) -> Dict[int, Dict[str, Any]]:
+        """corr / beta per window (None until the window is full or when a side has no variance)."""
+        out = {}
+        for w, (n, sx, sy, sxx, syy, sxy) in zip(self.windows, self.sums):
+            corr = beta = None
+            cov, var_x, var_y = n * sxy - sx * sy, n * sxx - sx * sx, n * syy - sy * sy
+            if n >= w and var_x > 0:
+                beta = cov / var_x
+                if var_y > 0:
+                    corr = max(-1.0, min(1.0, cov / math.sqrt(var_x * var_y)))
+            out[w] = {"corr": corr, "beta": beta, "n": int(round(n))}
+        return out
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"ring": [list(p) for p in self.ring], "sums": self.sums, "prev": list(self.prev) if self.prev else None,
+                "updates": self.updates}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], windows: Sequence[int] = WINDOWS) -> "RollingPair":
+        pair = cls(windows)
+        pair.ring.extend(tuple(p) for p in state.get("ring", []))
+        pair.sums = [list(map(float, s)) for s in state.get("sums", pair.sums)]
+        pair.prev = tuple(state["prev"]) if state.get("prev") else None
+        pair.updates = int(state.get("updates", 0))
+        return pair
+
+
+class CorrelationBook:
+    """All gold/factor pairs plus the last gold session fed into them."""
+
+    def __init__(self, windows: Sequence[int] = WINDOWS):
+        self.windows = tuple(windows)
+        self.pairs: Dict[str, RollingPair] = {label: RollingPair(self.windows) for label in FACTORS}
+        self.through: Optional[np.datetime64] = None
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], windows: Sequence[int] = WINDOWS) -> "CorrelationBook":
+        book = cls(windows)
+        # Changed windows (or a new factor) mean the stored sums no longer apply: start over
+        if tuple(state.get("windows") or ()) != book.windows or set(state.get("pairs", {})) != set(FACTORS):
+            return book
+        book.pairs = {label: RollingPair.from_state(s, windows) for label, s in state["pairs"].items()}
+        book.through = np.datetime64(state["through"], "D") if state.get("through") else None
+        return book
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"windows": list(self.windows), "through": str(self.through) if self.through is not None else None,
+                "pairs": {label: pair.to_state() for label, pair in self.pairs.items()}}
+
+    def fetch_days(self, today: np.datetime64) -> int:
+        """Calendar days of history the next update needs."""
+        if self.through is None:
+            return BOOTSTRAP_DAYS
+        return int((today - self.through).astype(int)) + 7
+
+    def due(self, calendar: ExchangeCalendar, now: float) -> bool:
+        """True once a gold session after `through` has closed (so off-hours syncs fetch nothing)."""
+        if self.through is None:
+            return True
+        upcoming = calendar.sessions(self.through + 1, self.through + 10)
+        return bool(len(upcoming)) and int(calendar.close_times(upcoming[:1])[0]) <= now
+
+    def feed(self, gold: DailySeries, factors: Dict[str, DailySeries], now: float) -> int:
+        """Push every gold session closed after `through` (and by `now`) into each pair; returns sessions fed."""
+        new = gold.closes <= now
+        if self.through is not None:
+            new &= gold.days > self.through
+        sessions = gold.days[new]
+        if not len(sessions):
+            return 0
+        for label, (_, kind) in FACTORS.items():
+            factor = factors.get(label)
+            if factor is None or not len(factor):
+                continue
+            _, m = align([factor, gold], gold.calendar, None, None, sessions=sessions)
+            pair = self.pairs[label]
+            for factor_level, gold_level in m:
+                pair.push(float(factor_level), float(gold_level), kind)
+        self.through = sessions[-1]
+        return len(sessions)
+
+    def results(self) -> Dict[str, Any]:
+        factors = {}
+        for label, pair in self.pairs.items():
+            factors[label] = {"symbol": FACTORS[label][0],
+                              "windows": {str(w): v for w, v in pair.stats().items()}}
+        return {"target": TARGET, "as_of": str(self.through) if self.through is not None else None,
+                "windows": list(self.windows), "factors": factors}
+
+    def indicator_rows(self) -> List[Dict[str, Any]]:
+        """macro_indicators rows (Corr_DXY_60D, Beta_DXY_60D, ...) for every full window."""
+        rows = []
+        for label, pair in self.pairs.items():
+            for w, v in pair.stats().items():
+                if v["corr"] is not None:
+                    rows.append({"indicator_name": f"Corr_{label}_{w}D", "value": round(v["corr"], 4),
+                                 "unit": "corr", "source": f"Rolling {w}D (GC=F vs {FACTORS[label][0]})"})
+                if v["beta"] is not None:
+                    rows.append({"indicator_name": f"Beta_{label}_{w}D", "value": round(v["beta"], 4),
+                                 "unit": "beta", "source": f"Rolling {w}D (GC=F vs {FACTORS[label][0]})"})
+        return rows
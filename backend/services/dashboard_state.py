@@ -0,0 +1,108 @@
+"""
+Dashboard state assembly for the mega-endpoint: full payloads, field projection
+and versioned deltas.
+
+Every dashboard row carries a `state_version` taken from one global sequence
+(migrations/add_state_versions.sql). A client that stores the returned
+`version` can ask for `?since=<version>` and receives only the rows that changed,
+or the full payload if it is too far behind. Versions commit in order and the
+reported version is the highest committed one, so no write is skipped.
+"""
+
+import asyncio
+from datetime import date
+from typing import Dict, Any, Optional, Tuple
+
+from .analysis_engine import analyze_market_state
+
+# Sections of the full-state payload; analysis_sop is derived from the three it depends on
+STATE_SECTIONS = ("tickers", "macro", "institutional", "today_strategy", "news", "analysis_sop")
+ANALYSIS_INPUTS = ("macro", "institutional", "tickers")
+
+SECTION_TABLES = {
+    "tickers": "market_data_cache",
+    "macro": "macro_indicators",
+    "institutional": "institutional_stats",
+    "today_strategy": "daily_strategy_log",
+    "news": "news_stream",
+}
+NEWS_LIMIT = 15
+
+# Clients further behind than this get a full payload instead of a delta
+MAX_DELTA_VERSIONS = 5000
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Requested sections from a `fields=` value; raises ValueError on unknown names."""
+    if not fields:
+        return STATE_SECTIONS
+    requested = tuple(f.strip() for f in fields.split(",") if f.strip())
+    unknown = [f for f in requested if f not in STATE_SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}, expected any of {list(STATE_SECTIONS)}")
+    return requested
+
+
+async def fetch_versions(reader) -> Dict[str, int]:
+    res = await reader.table("dashboard_versions").select("*").execute()
+    return {k: int(v or 0) for k, v in (res.data[0] if res.data else {}).items()}
+
+
+def _analysis(state: Dict[str, Any]) -> Dict[str, Any]:
+    return analyze_market_state(
+        macro_data={i['indicator_name']: i['value'] for i in (state.get('macro') or [])},
+        institutional_data={s['label']: s['value'] for s in (state.get('institutional') or [])},
+        market_cache=state.get('tickers') or []
+    )
+
+
+async def fetch_full_state(reader, requested: Tuple[str, ...] = STATE_SECTIONS) -> Optional[Dict[str, Any]]:
+    """Requested sections from the latest_dashboard_state view (None if the view is empty)."""
+    # Only the view columns we need are selected, so Postgres skips the other subqueries
+    columns = [c for c in STATE_SECTIONS[:-1] if c in requested or ("analysis_sop" in requested and c in ANALYSIS_INPUTS)]
+    response = await reader.table("latest_dashboard_state").select(",".join(columns)).execute()
+    if not response.data:
+        return None
+    state = response.data[0]
+    if "analysis_sop" in requested:
+        # Inject SOP Analysis on the fly or fetch pre-calculated (using on the fly for logic demo)
+        state['analysis_sop'] = _analysis(state)
+    return {k: v for k, v in state.items() if k in requested}
+
+
+async def fetch_state_delta(reader, since: int, requested: Tuple[str, ...] = STATE_SECTIONS) -> Dict[str, Any]:
+    """
+    Rows changed after `since` for the requested sections, plus the new version.
+    `delta: False` marks a full payload (client too far behind or from another sequence).
+    """
+    versions = await fetch_versions(reader)
+    current = versions.get("current", 0)
+    if since > current or current - since > MAX_DELTA_VERSIONS:
+        state = await fetch_full_state(reader, requested) or {}
+        return {**state, "version": current, "delta": False}
+
+    changed = [s for s in SECTION_TABLES if versions.get(s, 0) > since]
+    def section_query(section: str):
+        query = reader.table(SECTION_TABLES[section]).select("*").gt("state_version", since)
+        if section == "today_strategy":
+            return query.eq("log_date", date.today().isoformat())
+        if section == "news":
+            return query.order("published_at", desc=True).limit(NEWS_LIMIT)
+        return query
+
+    # Changed sections are fetched concurrently on the async read path
+    sections = [s for s in changed if s in requested]
+    results = await asyncio.gather(*(section_query(s).execute() for s in sections))
+    delta: Dict[str, Any] = {}
+    for section, res in zip(sections, results):
+        if section == "today_strategy":
+            delta[section] = res.data[0] if res.data else None
+        else:
+            delta[section] = res.data
+
+    if "analysis_sop" in requested and any(s in changed for s in ANALYSIS_INPUTS):
+        # The analysis needs complete inputs, not just the changed rows
+        inputs = await fetch_full_state(reader, ANALYSIS_INPUTS) or {}
+        delta["analysis_sop"] = _analysis(inputs)
+
+    return {**delta, "version": current, "since": since, "delta": True}
@@ -0,0 +1,156 @@
+"""
+Delta-only writes.
+
+Keeps a fingerprint of the last written value of every row in the small "latest
+value" tables (in memory, seeded from the DB and re-seeded every RESEED_SECONDS
+so writes by other processes are noticed) and drops upserts whose fields have
+not moved beyond a per-field epsilon. Unchanged rows only get their heartbeat
+timestamp bumped, in one bulk update per table and at most once per
+HEARTBEAT_SECONDS, so off-hours syncs write next to nothing.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Tuple, Optional
+
+HEARTBEAT_SECONDS = 3600
+# Cron, the scheduler and the collector all write these tables: refresh fingerprints from the DB this often
+RESEED_SECONDS = 300
+
+# table -> key columns, compared fields, heartbeat column
+TABLES: Dict[str, Dict[str, Any]] = {
+    "market_data_cache": {
+        "keys": ("ticker",),
+        "fields": ("last_price", "open_price", "high_price", "low_price", "change_percent"),
+        "heartbeat": "cached_at",
+    },
+    "macro_indicators": {
+        "keys": ("indicator_name",),
+        "fields": ("value", "unit", "is_stale", "source"),
+        "heartbeat": "last_updated",
+    },
+    "institutional_stats": {
+        "keys": ("category", "label"),
+        "fields": ("value", "change_value"),
+        "heartbeat": "timestamp",
+    },
+}
+
+# Absolute tolerance per numeric field; anything not listed must match exactly
+EPSILON: Dict[str, float] = {
+    "last_price": 1e-6,
+    "open_price": 1e-6,
+    "high_price": 1e-6,
+    "low_price": 1e-6,
+    "change_percent": 1e-4,
+    "value": 1e-6,
+    "change_value": 1e-6,
+}
+
+
+def _same(field: str, old: Any, new: Any) -> bool:
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)) and not isinstance(new, bool):
+        return abs(float(old) - float(new)) <= EPSILON.get(field, 0.0)
+    return old == new
+
+
+class WriteFilter:
+    """Per-process fingerprints of the last written row per (table, key)."""
+
+    def __init__(self):
+        self._last: Dict[str, Dict[Tuple, Dict[str, Any]]] = {}
+        self._heartbeat_at: Dict[str, float] = {}
+        self._seeded_at: Dict[str, float] = {}
+
+    def seed(self, supabase, table: str, now: Optional[float] = None) -> None:
+        """
+        Load current DB values, so a fresh process doesn't rewrite everything. Repeated
+        every RESEED_SECONDS: if another process wrote a row since, its value becomes the
+        fingerprint, and a later value from this process that differs from it is written.
+        """
+        now = now or time.time()
+        if table in self._last and now - self._seeded_at.get(table, 0) < RESEED_SECONDS:
+            return
+        spec = TABLES[table]
+        self._seeded_at[table] = now
+        try:
+            res = supabase.table(table).select(",".join(spec["keys"] + spec["fields"] + (spec["heartbeat"],))).execute()
+            self._last[table] = {}
+            stamps = []
+            for row in res.data or []:
+                self.remember(table, row)
+                if row.get(spec["heartbeat"]):
+                    stamps.append(datetime.fromisoformat(row[spec["heartbeat"]]).timestamp())
+            # Oldest heartbeat decides, so a cold start doesn't bump rows refreshed minutes ago
+            if stamps:
+                self._heartbeat_at[table] = max(self._heartbeat_at.get(table, 0), min(stamps))
+        except Exception as e:
+            # Keep the previous fingerprints (if any) until the next attempt
+            self._last.setdefault(table, {})
+            print(f"Write filter seed error ({table}): {e}")
+
+    def key_of(self, table: str, row: Dict[str, Any]) -> Tuple:
+        return tuple(row.get(k) for k in TABLES[table]["keys"])
+
+    def changed(self, table: str, row: Dict[str, Any]) -> bool:
+        last = self._last.get(table, {}).get(self.key_of(table, row))
+        if last is None:
+            return True
+        return any(f in row and not _same(f, last.get(f), row[f]) for f in TABLES[table]["fields"])
+
+    def remember(self, table: str, row: Dict[str, Any]) -> None:
+        fields = TABLES[table]["fields"]
+        entry = self._last.setdefault(table, {}).setdefault(self.key_of(table, row), {})
+        entry.update({f: row[f] for f in fields if f in row})
+
+    def split(self, table: str, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(changed, unchanged) rows."""
+        changed, unchanged = [], []
+        for row in rows:
+            (changed if self.changed(table, row) else unchanged).append(row)
+        return changed, unchanged
+
+    def heartbeat_due(self, table: str, now: Optional[float] = None) -> bool:
+        now = now or time.time()
+        if now - self._heartbeat_at.get(table, 0) < HEARTBEAT_SECONDS:
+            return False
+        self._heartbeat_at[table] = now
+        return True
+
+
+# Shared across GoldDataSyncer instances in the same process (warm serverless instance / scheduler)
+write_filter = WriteFilter()
+
+
+def upsert_changed(supabase, table: str, rows, on_conflict: str) -> Dict[str, int]:
+    """
+    Upsert only rows whose values moved; bump the heartbeat of the rest in bulk.
+    Tables without a fingerprint spec are passed straight through.
+    """
+    rows = rows if isinstance(rows, list) else [rows]
+    if table not in TABLES:
+        supabase.table(table).upsert(rows, on_conflict=on_conflict).execute()
+        return {"written": len(rows), "skipped": 0}
+
+    spec = TABLES[table]
+    # TIMESTAMPTZ columns: an aware UTC value, never host-local time
+    stamp = {spec["heartbeat"]: datetime.now(timezone.utc).isoformat()}
+    write_filter.seed(supabase, table)
+    changed, unchanged = write_filter.split(table, rows)
+    if changed:
+        supabase.table(table).upsert([{**row, **stamp} for row in changed], on_conflict=on_conflict).execute()
+        for row in changed:
+            write_filter.remember(table, row)
+
+    if unchanged and write_filter.heartbeat_due(table):
+        try:
+            if len(spec["keys"]) == 1:
+                key = spec["keys"][0]
+                supabase.table(table).update(stamp).in_(key, [r[key] for r in unchanged]).execute()
+            else:
+                # Composite keys: a heartbeat-only upsert of the key columns
+                supabase.table(table).upsert([{**{k: r[k] for k in spec["keys"]}, **stamp} for r in unchanged],
+                                             on_conflict=on_conflict).execute()
+        except Exception as e:
+            print(f"Heartbeat update error ({table}): {e}")
+    return {"written": len(changed), "skipped": len(unchanged)}
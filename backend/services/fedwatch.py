@@ -0,0 +1,221 @@
+"""
+FedWatch probability engine.
+
+Derives the target-rate probability tree for every upcoming FOMC meeting from a
+strip of monthly 30-Day Fed Funds futures (ZQ) prices, following the CME
+FedWatch methodology:
+
+1. Each contract settles on the average daily effective rate of its month, so
+   the implied average rate is 100 - price.
+2. Months without a meeting pin the rate for that whole month. In a meeting month
+   the average splits into the pre-meeting (start) and post-meeting (end) rates,
+   weighted by the days on each side of the decision.
+3. The implied move at each meeting (end - start) is split between the two
+   adjacent 25bp outcomes, and the per-meeting outcomes are chained into a
+   cumulative distribution over target ranges.
+"""
+
+import calendar
+import requests
+import numpy as np
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Tuple
+
+from .fastjson import parse_response
+
+# FOMC decision days (second day of each meeting). 2027 dates are the Fed's tentative schedule.
+FOMC_MEETINGS = [
+    "2026-01-28", "2026-03-18", "2026-04-29", "2026-06-17",
+    "2026-07-29", "2026-09-16", "2026-10-28", "2026-12-09",
+    "2027-01-27", "2027-03-17", "2027-04-28", "2027-06-09",
+    "2027-07-28", "2027-09-15", "2027-10-27", "2027-12-08",
+]
+
+# CME month codes for futures symbols
+MONTH_CODES = "FGHJKMNQUVXZ"
+
+STEP = 0.25  # One FOMC move, in percentage points
+
+
+def fed_funds_symbols(start: date, months: int = 12) -> List[Tuple[str, str]]:
+    """Yahoo symbols for the next `months` ZQ contracts as (symbol, 'YYYY-MM') pairs."""
+    symbols = []
+    year, month = start.year, start.month
+    for _ in range(months):
+        symbols.append((f"ZQ{MONTH_CODES[month - 1]}{year % 100:02d}.CBT", f"{year:04d}-{month:02d}"))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return symbols
+
+
+def fetch_fed_funds_strip(months: int = 12, today: Optional[date] = None) -> Dict[str, float]:
+    """
+    Fetch the ZQ strip in a single Yahoo spark request.
+    Returns {'YYYY-MM': price} for every contract that has a price.
+    """
+    pairs = fed_funds_symbols(today or date.today(), months)
+    by_symbol = dict(pairs)
+    url = "https://query1.finance.yahoo.com/v7/finance/spark"
+    params = {"symbols": ",".join(by_symbol), "range": "1d", "interval": "1d"}
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    }
+    try:
+        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response.raise_for_status()
+        data = parse_response(response)
+    except Exception as e:
+        print(f"Error fetching fed funds strip: {e}")
+        return {}
+
+    strip = {}
+    # v7 shape: {"spark": {"result": [{"symbol", "response": [{"meta": ...}]}]}}; newer shape: {symbol: {...}}
+    results = (data.get('spark') or {}).get('result')
+    if results is None:
+        results = [{"symbol": k, "response": [v]} for k, v in data.items() if isinstance(v, dict)]
+    for item in results or []:
+        month = by_symbol.get(item.get('symbol'))
+        resp = (item.get('response') or [{}])[0] or {}
+        price = (resp.get('meta') or {}).get('regularMarketPrice')
+        if price is None:
+            closes = [c for c in (resp.get('close') or []) if c is not None]
+            price = closes[-1] if closes else None
+        if month and price:
+            strip[month] = float(price)
+    return strip
+
+
+def range_label(lower: float) -> str:
+    """CME-style target range label in basis points, e.g. 3.50 -> '350-375'."""
+    lo = int(round(lower * 100))
+    return f"{lo}-{lo + 25}"
+
+
+def target_midpoint(rate: float) -> float:
+    """Snap an effective rate to the midpoint of the 25bp target range it trades in."""
+    return round((rate - STEP / 2) / STEP) * STEP + STEP / 2
+
+
+def compute_probability_tree(strip: Dict[str, float], meetings: Optional[List[str]] = None,
+                             current_rate: Optional[float] = None, as_of: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Probability tree for every upcoming meeting covered by the strip.
+    `current_rate` is the midpoint of the current target range (derived from the strip if omitted).
+    Meetings before `as_of` (default: today) still shape the rate chain but are not reported.
+    """
+    if not strip:
+        return []
+    # The chain needs consecutive contract months; stop at the first missing one
+    months = []
+    for _, month in fed_funds_symbols(date(int(min(strip)[:4]), int(min(strip)[5:7]), 1), len(strip)):
+        if month not in strip:
+            break
+        months.append(month)
+    months = tuple(months)
+    prices = tuple(round(strip[m], 4) for m in months)
+    covered = tuple(m for m in (meetings or FOMC_MEETINGS) if m[:7] in months)
+    as_of = as_of or date.today().isoformat()
+    return [dict(m, probabilities=dict(m["probabilities"]))
+            for m in _probability_tree(months, prices, covered, current_rate, as_of)]
+
+
+@lru_cache(maxsize=64)
+def _probability_tree(months: Tuple[str, ...], prices: Tuple[float, ...],
+                      meetings: Tuple[str, ...], current_rate: Optional[float], as_of: str) -> Tuple[Dict[str, Any], ...]:
+    """Cached on the curve snapshot: identical strips never recompute."""
+    n = len(months)
+    implied = 100.0 - np.asarray(prices, dtype=np.float64)
+    meeting_by_month = {m[:7]: m for m in meetings}
+    has_meeting = np.array([m in meeting_by_month for m in months])
+    days_in_month = np.array([calendar.monthrange(int(m[:4]), int(m[5:7]))[1] for m in months], dtype=np.float64)
+    meeting_day = np.array([int(meeting_by_month[m][8:10]) if m in meeting_by_month else 0 for m in months], dtype=np.float64)
+    # Share of the month at the pre-meeting rate (new rate is effective the day after the decision)
+    w_pre = meeting_day / days_in_month
+
+    # Start/end effective rate of every month, chained forward
+    start = np.empty(n)
+    end = np.empty(n)
+    for i in range(n):
+        next_pins = i + 1 < n and not has_meeting[i + 1]
+        if not has_meeting[i]:
+            start[i] = end[i] = implied[i]
+            continue
+        if i > 0:
+            start[i] = end[i - 1]
+        elif next_pins and w_pre[i] > 0:
+            # Back out the pre-meeting rate from the following meeting-free month
+            start[i] = (implied[i] - implied[i + 1] * (1 - w_pre[i])) / w_pre[i]
+        else:
+            start[i] = implied[i]
+        if next_pins:
+            end[i] = implied[i + 1]
+        elif w_pre[i] < 1:
+            end[i] = (implied[i] - start[i] * w_pre[i]) / (1 - w_pre[i])
+        else:
+            end[i] = implied[i]
+
+    upcoming = np.array([months[i] in meeting_by_month and meeting_by_month[months[i]] >= as_of for i in range(n)], dtype=bool)
+    idx = np.flatnonzero(upcoming)
+    if not len(idx):
+        return ()
+    if current_rate is None:
+        current_rate = target_midpoint(start[idx[0]])
+
+    # Per-meeting move split between the two adjacent 25bp outcomes
+    moves = (end[idx] - start[idx]) / STEP
+    lower_steps = np.floor(moves).astype(int)
+    p_upper = moves - lower_steps
+
+    # Cumulative distribution over target offsets (in steps) from the current range
+    span = int(np.abs(lower_steps).sum() + len(idx) + 1)
+    dist = np.zeros(2 * span + 1)
+    dist[span] = 1.0
+    base_lower = current_rate - STEP / 2
+
+    tree = []
+    for k, i in enumerate(idx):
+        step_dist = np.zeros_like(dist)
+        shifted = np.roll(dist, lower_steps[k])
+        step_dist += shifted * (1 - p_upper[k])
+        step_dist += np.roll(shifted, 1) * p_upper[k]
+        dist = step_dist
+
+        nonzero = np.flatnonzero(dist > 1e-6)
+        probabilities = {
+            range_label(base_lower + (j - span) * STEP): round(float(dist[j]) * 100, 1)
+            for j in nonzero[::-1]
+        }
+        tree.append({
+            "meeting_date": meeting_by_month[months[i]],
+            "implied_rate": round(float(end[i]), 4),
+            "expected_change_bp": round(float(end[i] - start[idx[0]]) * 100, 1),
+            "current_rate": current_rate,
+            "probabilities": probabilities,
+        })
+    return tuple(tree)
+
+
+def next_meeting_payload(tree: List[Dict[str, Any]], source: str) -> Dict[str, Any]:
+    """Shape the first meeting of the tree like the `daily_strategy_log.fedwatch` payload."""
+    nxt = tree[0]
+    current_rate = nxt["current_rate"]
+    meeting_date = nxt["meeting_date"]
+    meeting_date_obj = datetime.strptime(meeting_date, "%Y-%m-%d")
+    probs = nxt["probabilities"]
+    lower = current_rate - STEP / 2
+    return {
+        "meeting_date": meeting_date,
+        "meeting_name": f"{meeting_date_obj.month}月{meeting_date_obj.day}日议息会议",
+        "meeting_time": "美东 14:00 / 北京次日 03:00",
+        "meeting_datetime_utc": f"{meeting_date}T19:00:00Z",
+        "prob_pause": probs.get(range_label(lower), 0.0),
+        "prob_cut_25": probs.get(range_label(lower - STEP), 0.0),
+        "prob_hike_25": probs.get(range_label(lower + STEP), 0.0),
+        "implied_rate": round(nxt["implied_rate"], 3),
+        "current_rate": current_rate,
+        "meetings": tree,
+        "data_source": source,
+        "last_verified": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
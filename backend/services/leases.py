@@ -0,0 +1,114 @@
+"""
+Database leases so overlapping sync triggers (GitHub cron, scheduler.py, ad-hoc
+check_db.py runs) never run the same job twice.
+
+Each job has one row in `sync_leases`. Acquiring bumps a monotonically increasing
+fencing token; only the holder of the current token can renew or release the
+lease (and store its result). A second trigger either skips the job or joins the
+in-flight run and returns its stored result.
+
+This is advisory locking: data writes are not conditioned on the token. Jobs call
+still_held() right before each write batch, which renews the lease and stops a
+run that has lost it (or cannot confirm it still holds it). A run that stalls
+between that check and its write can still overwrite the newer holder's rows;
+the window is one write, not the rest of the run.
+
+Atomicity comes from the acquire/renew/release SQL functions in
+migrations/add_sync_leases.sql. If they are missing, jobs run uncoordinated
+(fail-open at acquire time) so syncing never stops because of the lock table.
+"""
+
+import os
+import socket
+import time
+import uuid
+from typing import Dict, Any, Optional, Callable
+
+LEASE_MODES = ("skip", "join", "off")
+
+
+class LeaseManager:
+    def __init__(self, supabase_client, mode: Optional[str] = None, join_timeout: float = 60.0):
+        self.supabase = supabase_client
+        self.mode = mode or os.getenv("SYNC_LEASE_MODE", "skip")
+        if self.mode not in LEASE_MODES:
+            raise ValueError(f"Unknown lease mode {self.mode!r}, expected one of {LEASE_MODES}")
+        self.join_timeout = join_timeout
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tokens: Dict[str, int] = {}
+
+    def _rpc(self, fn: str, params: Dict[str, Any]) -> Any:
+        return self.supabase.rpc(fn, params).execute().data
+
+    def acquire(self, job: str, ttl: int) -> Optional[int]:
+        """Fencing token if acquired, None if another holder has a live lease."""
+        token = self._rpc("acquire_sync_lease", {"p_job": job, "p_holder": self.holder, "p_ttl_seconds": ttl})
+        if token is None:
+            return None
+        self._tokens[job] = int(token)
+        return int(token)
+
+    def still_held(self, job: str, ttl: int = 300) -> bool:
+        """Renew the lease; False means it was taken over or could not be confirmed (stop writing)."""
+        token = self._tokens.get(job)
+        if token is None:
+            return True  # Uncoordinated run
+        try:
+            return bool(self._rpc("renew_sync_lease", {"p_job": job, "p_token": token, "p_ttl_seconds": ttl}))
+        except Exception as e:
+            # The lease was acquired, so the functions exist: an error here means we cannot prove we still hold it
+            print(f"Lease renew error ({job}), treating lease as lost: {e}")
+            return False
+
+    def release(self, job: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        token = self._tokens.pop(job, None)
+        if token is None:
+            return False
+        try:
+            return bool(self._rpc("release_sync_lease", {"p_job": job, "p_token": token, "p_result": result}))
+        except Exception as e:
+            print(f"Lease release error ({job}): {e}")
+            return False
+
+    def _wait_for(self, job: str) -> Optional[Dict[str, Any]]:
+        """Poll until the in-flight run releases (or its lease expires) and return its result."""
+        deadline = time.time() + self.join_timeout
+        seen_token = None
+        while time.time() < deadline:
+            res = self.supabase.table("sync_leases").select("token,released_at,expires_at,last_result").eq("job", job).execute()
+            if not res.data:
+                return None
+            row = res.data[0]
+            if seen_token is None:
+                seen_token = row["token"]
+            if row["token"] != seen_token or row.get("released_at"):
+                return row.get("last_result")
+            time.sleep(1.0)
+        return None
+
+    def run(self, job: str, fn: Callable[[], Dict[str, Any]], ttl: int = 300,
+            empty: Optional[Callable[[], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Run `fn` under the job lease, or skip/join if another trigger holds it."""
+        if self.mode == "off" or self.supabase is None:
+            return fn()
+        try:
+            token = self.acquire(job, ttl)
+        except Exception as e:
+            print(f"Lease unavailable for {job}, running uncoordinated: {e}")
+            return fn()
+
+        if token is None:
+            report = (empty or (lambda: {"updated": [], "errors": []}))()
+            if self.mode == "join":
+                joined = self._wait_for(job)
+                if joined is not None:
+                    return {**joined, "joined": True}
+            report["skipped"] = f"{job} already running elsewhere"
+            return report
+
+        result = None
+        try:
+            result = fn()
+            return result
+        finally:
+            self.release(job, result)
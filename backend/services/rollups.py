@@ -0,0 +1,104 @@
+"""
+market_history rollups, retention and tier-aware history queries.
+
+Raw points are compacted into 1m -> 15m -> 1h -> 1d OHLC tables by the
+rollup_market_history() SQL function (migrations/add_market_history_rollups.sql),
+starting from a watermark kept in sync_state. Each tier has its own retention.
+plan_tier() picks the coarsest tier that still satisfies a requested range and
+resolution, so a year-long daily chart reads ~365 rows instead of raw points.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List
+
+from .sync_state import load_state, save_state
+
+ROLLUP_STATE_KEY = "market_history_rollup"
+# Re-roll a little before the watermark so late-arriving points land in their bucket
+ROLLUP_OVERLAP = timedelta(minutes=2)
+# Default resolution picks roughly this many points for a range
+TARGET_POINTS = 250
+
+
+class HistoryTier:
+    __slots__ = ("name", "table", "time_column", "bucket_seconds", "retention")
+
+    def __init__(self, name: str, table: str, time_column: str, bucket_seconds: int, retention: Optional[timedelta]):
+        self.name = name
+        self.table = table
+        self.time_column = time_column
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+
+    def covers(self, start: datetime, now: datetime) -> bool:
+        return self.retention is None or start >= now - self.retention
+
+    def __repr__(self) -> str:
+        return f"HistoryTier({self.name})"
+
+
+# Finest to coarsest
+TIERS: List[HistoryTier] = [
+    HistoryTier("raw", "market_history", "timestamp", 0, timedelta(days=7)),
+    HistoryTier("1m", "market_history_1m", "bucket", 60, timedelta(days=30)),
+    HistoryTier("15m", "market_history_15m", "bucket", 900, timedelta(days=180)),
+    HistoryTier("1h", "market_history_1h", "bucket", 3600, timedelta(days=730)),
+    HistoryTier("1d", "market_history_1d", "bucket", 86400, None),
+]
+TIER_BY_NAME = {t.name: t for t in TIERS}
+
+
+def run_rollups(supabase, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Roll up everything since the last watermark, then apply retention."""
+    report = {"rolled_up": 0, "pruned": 0, "errors": []}
+    now = now or datetime.now(timezone.utc)
+    state = load_state(supabase, ROLLUP_STATE_KEY)
+    watermark = datetime.fromisoformat(state["watermark"]) if state.get("watermark") else now - TIERS[0].retention
+    try:
+        since = watermark - ROLLUP_OVERLAP
+        report["rolled_up"] = supabase.rpc("rollup_market_history", {"p_since": since.isoformat()}).execute().data or 0
+
+        # Never prune past the watermark: points not yet rolled up must survive
+        def cutoff(tier: HistoryTier) -> Optional[str]:
+            return min(now - tier.retention, since).isoformat() if tier.retention else None
+
+        report["pruned"] = supabase.rpc("prune_market_history", {
+            "p_raw_before": cutoff(TIER_BY_NAME["raw"]),
+            "p_1m_before": cutoff(TIER_BY_NAME["1m"]),
+            "p_15m_before": cutoff(TIER_BY_NAME["15m"]),
+            "p_1h_before": cutoff(TIER_BY_NAME["1h"]),
+        }).execute().data or 0
+        save_state(supabase, ROLLUP_STATE_KEY, {"watermark": now.isoformat()})
+    except Exception as e:
+        report["errors"].append(f"Rollup Error: {str(e)}")
+    return report
+
+
+def plan_tier(start: datetime, end: datetime, resolution_seconds: Optional[int] = None,
+              now: Optional[datetime] = None) -> HistoryTier:
+    """
+    Coarsest tier whose buckets are no wider than the requested resolution and whose
+    retention still covers `start`. Falls back to the finest tier that covers the range.
+    """
+    now = now or datetime.now(timezone.utc)
+    if resolution_seconds is None:
+        resolution_seconds = max(int((end - start).total_seconds() / TARGET_POINTS), 1)
+    covering = [t for t in TIERS if t.covers(start, now)]
+    for tier in reversed(covering):
+        if tier.bucket_seconds <= resolution_seconds:
+            return tier
+    return covering[0] if covering else TIERS[-1]
+
+
+async def fetch_history(reader, ticker: str, start: datetime, end: datetime,
+                        resolution_seconds: Optional[int] = None) -> Dict[str, Any]:
+    """OHLC rows for `ticker` in [start, end) from the planned tier (raw points become flat bars)."""
+    tier = plan_tier(start, end, resolution_seconds)
+    res = await reader.table(tier.table).select("*").eq("ticker", ticker) \
+        .gte(tier.time_column, start.isoformat()).lt(tier.time_column, end.isoformat()) \
+        .order(tier.time_column).execute()
+    rows = res.data or []
+    if tier.name == "raw":
+        rows = [{"ticker": r["ticker"], "bucket": r["timestamp"], "open": r["price"], "high": r["price"],
+                 "low": r["price"], "close": r["price"], "samples": 1} for r in rows]
+    return {"ticker": ticker, "tier": tier.name, "bucket_seconds": tier.bucket_seconds, "data": rows}
@@ -0,0 +1,43 @@
+"""
+Request coalescing for the hot read endpoints.
+
+When many dashboards refresh at once (typically right after a sync), identical
+requests arriving while a query for the same key is still running await that
+query instead of starting their own, so the database sees one query per
+resource regardless of viewer count. Nothing is cached: a key is forgotten as
+soon as its call finishes, and the next request starts a fresh query.
+"""
+
+import asyncio
+from typing import Dict, Any, Callable, Awaitable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self.stats = {"leaders": 0, "joined": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Result of `fn()`, shared with every concurrent caller using the same key."""
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["joined"] += 1
+        # A caller that disconnects must not cancel the query the others are waiting on
+        return await asyncio.shield(call)
+
+    def _forget(self, key: Hashable, done: "asyncio.Future[Any]") -> None:
+        if self._calls.get(key) is done:
+            del self._calls[key]
+        if not done.cancelled():
+            # Mark the error retrieved even if every waiter went away
+            done.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,62 @@
+"""
+Storage layer between the services/API and the database.
+
+Every store exposes the supabase-py query surface the services already use
+(`store.table(...).select/upsert/...execute().data`, `store.rpc(...)`) plus
+bulk_upsert()/bulk_insert() for batch writes:
+
+- supabase (default): PostgREST via supabase-py (SUPABASE_URL, SUPABASE_KEY)
+- postgres: direct pooled connection with COPY bulk paths (DATABASE_URL)
+- sqlite: local file or in-memory database (SQLITE_PATH), no Supabase needed
+
+Select one with STORAGE_BACKEND.
+"""
+
+import os
+from typing import Dict, Any, List, Optional
+
+from .supabase_store import SupabaseStore
+
+BACKENDS = ("supabase", "postgres", "sqlite")
+
+
+def get_storage(backend: Optional[str] = None):
+    """Store for STORAGE_BACKEND (None when the selected backend is not configured)."""
+    backend = backend or os.getenv("STORAGE_BACKEND", "supabase")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r}, expected one of {BACKENDS}")
+    if backend == "postgres":
+        dsn = os.getenv("DATABASE_URL")
+        if not dsn:
+            print("Error: DATABASE_URL missing for STORAGE_BACKEND=postgres")
+            return None
+        from .postgres_store import PostgresStore
+        return PostgresStore(dsn, max_size=int(os.getenv("DATABASE_POOL_SIZE", "10")))
+    if backend == "sqlite":
+        from .sqlite_store import SQLiteStore
+        return SQLiteStore(os.getenv("SQLITE_PATH", "goldtracer.db"))
+
+    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        return None
+    from supabase import create_client
+    return SupabaseStore(create_client(url, key))
+
+
+def bulk_upsert(store, table: str, rows: List[Dict[str, Any]], on_conflict: str) -> int:
+    """Batch upsert through the store's bulk path (plain supabase clients get one request)."""
+    if not rows:
+        return 0
+    if hasattr(store, "bulk_upsert"):
+        return store.bulk_upsert(table, rows, on_conflict)
+    store.table(table).upsert(rows, on_conflict=on_conflict).execute()
+    return len(rows)
+
+
+def bulk_insert(store, table: str, rows: List[Dict[str, Any]]) -> int:
+    if not rows:
+        return 0
+    if hasattr(store, "bulk_insert"):
+        return store.bulk_insert(table, rows)
+    store.table(table).insert(rows).execute()
+    return len(rows)
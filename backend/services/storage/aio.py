@@ -0,0 +1,236 @@
+"""
+Async, pooled read path for the API endpoints.
+
+The sync stores block the event loop, so concurrent requests to the same worker
+run one at a time. The readers here take the same query-builder calls
+(`reader.table(t).select(...).eq(...).order(...).limit(...)`) but `await
+.execute()`, with a bounded pool and a per-query timeout:
+
+- PostgRESTReader: one shared httpx.AsyncClient (keep-alive pool) against Supabase's REST API
+- AsyncPostgresReader: psycopg AsyncConnectionPool with the shared SQL builder
+- ThreadedReader: any sync store (SQLite) in worker threads, bounded by a semaphore
+
+Reads only; writes keep going through the sync stores.
+"""
+
+import asyncio
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+from .. import fastjson
+from .sql import SQLQuery, Result, to_api_value
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # pragma: no cover - optional dependency
+    psycopg = None
+
+DEFAULT_POOL_SIZE = 20
+DEFAULT_QUERY_TIMEOUT = 5.0
+
+
+class AsyncQuery:
+    """Records builder calls; the reader turns them into a request when awaited."""
+
+    def __init__(self, reader: "AsyncReader", table: str):
+        self.reader = reader
+        self.table = table
+        self.calls: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        if name not in ("select", "eq", "neq", "gt", "gte", "lt", "lte", "in_", "is_", "match", "order", "limit"):
+            raise AttributeError(f"{name} is not supported on the async read path")
+
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return record
+
+    async def execute(self) -> Result:
+        return await self.reader.run(self)
+
+
+class AsyncReader:
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, query_timeout: float = DEFAULT_QUERY_TIMEOUT):
+        self.pool_size = pool_size
+        self.query_timeout = query_timeout
+
+    def table(self, name: str) -> AsyncQuery:
+        return AsyncQuery(self, name)
+
+    async def run(self, query: AsyncQuery) -> Result:
+        try:
+            return Result(await asyncio.wait_for(self._fetch(query), timeout=self.query_timeout))
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Query on {query.table} exceeded {self.query_timeout:g}s")
+
+    async def _fetch(self, query: AsyncQuery) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+def _postgrest_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _postgrest_list(values) -> str:
+    items = []
+    for v in values:
+        v = _postgrest_value(v)
+        items.append(f'"{v}"' if any(c in v for c in ',()"') else v)
+    return "(" + ",".join(items) + ")"
+
+
+class PostgRESTReader(AsyncReader):
+    """Supabase REST reads over one keep-alive connection pool per event loop."""
+
+    OPERATORS = {"eq": "eq", "neq": "neq", "gt": "gt", "gte": "gte", "lt": "lt", "lte": "lte"}
+
+    def __init__(self, url: str, key: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = url.rstrip("/") + "/rest/v1/"
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}", "Accept": "application/json"}
+        self._client = None
+        self._loop = None
+
+    async def _session(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        # A client is bound to the loop it was created on (serverless runtimes may start new loops)
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                # Release the old loop's sockets instead of leaking them
+                try:
+                    await self._client.aclose()
+                except Exception as e:
+                    print(f"Async reader client close error: {e}")
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            self._client = httpx.AsyncClient(base_url=self.base_url, headers=self.headers, limits=limits,
+                                             timeout=self.query_timeout)
+            self._loop = loop
+        return self._client
+
+    def params(self, query: AsyncQuery) -> List[Tuple[str, str]]:
+        params: List[Tuple[str, str]] = []
+        order: List[str] = []
+        for name, args, kwargs in query.calls:
+            if name == "select":
+                params.append(("select", (args[0] if args else "*").replace(" ", "")))
+            elif name in self.OPERATORS:
+                params.append((args[0], f"{self.OPERATORS[name]}.{_postgrest_value(args[1])}"))
+            elif name == "in_":
+                params.append((args[0], f"in.{_postgrest_list(args[1])}"))
+            elif name == "is_":
+                params.append((args[0], f"is.{'null' if args[1] in (None, 'null') else _postgrest_value(args[1])}"))
+            elif name == "match":
+                params.extend((k, f"eq.{_postgrest_value(v)}") for k, v in args[0].items())
+            elif name == "order":
+                order.append(f"{args[0]}.{'desc' if kwargs.get('desc') else 'asc'}")
+            elif name == "limit":
+                params.append(("limit", str(args[0])))
+        if order:
+            params.append(("order", ",".join(order)))
+        return params
+
+    async def _fetch(self, query: AsyncQuery) -> List[Dict[str, Any]]:
+        response = await (await self._session()).get(query.table, params=self.params(query))
+        response.raise_for_status()
+        return fastjson.loads(response.content)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class AsyncPostgresReader(AsyncReader):
+    """Direct Postgres reads on an async pool (opened on first use inside the running loop)."""
+
+    placeholder = "%s"
+
+    def __init__(self, dsn: str, **kwargs):
+        if psycopg is None:
+            raise RuntimeError("STORAGE_BACKEND=postgres requires psycopg[binary] and psycopg-pool")
+        super().__init__(**kwargs)
+        self.dsn = dsn
+        self.pool = None
+        self._loop = None
+
+    def adapt(self, value: Any) -> Any:
+        return value
+
+    async def _pool(self):
+        loop = asyncio.get_running_loop()
+        if self.pool is None or self._loop is not loop:
+            if self.pool is not None:
+                try:
+                    await self.pool.close()
+                except Exception as e:
+                    print(f"Async reader pool close error: {e}")
+            self.pool = AsyncConnectionPool(self.dsn, min_size=1, max_size=self.pool_size, open=False,
+                                            kwargs={"row_factory": dict_row, "autocommit": True})
+            await self.pool.open()
+            self._loop = loop
+        return self.pool
+
+    async def _fetch(self, query: AsyncQuery) -> List[Dict[str, Any]]:
+        builder = SQLQuery(self, query.table)
+        for name, args, kwargs in query.calls:
+            getattr(builder, name)(*args, **kwargs)
+        (sql, params), = builder.statements()
+        pool = await self._pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(sql, params)
+            rows = await cur.fetchall()
+        return [{k: to_api_value(v) for k, v in row.items()} for row in rows]
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+
+class ThreadedReader(AsyncReader):
+    """Wraps a sync store; at most `pool_size` queries run in threads at once."""
+
+    def __init__(self, store, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    async def _fetch(self, query: AsyncQuery) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots, self._loop = asyncio.Semaphore(self.pool_size), loop
+
+        def run():
+            builder = self.store.table(query.table)
+            for name, args, kwargs in query.calls:
+                builder = getattr(builder, name)(*args, **kwargs)
+            return builder.execute().data
+
+        async with self._slots:
+            return await asyncio.to_thread(run)
+
+
+def get_async_reader(backend: Optional[str] = None, store=None) -> Optional[AsyncReader]:
+    """Reader for STORAGE_BACKEND; `store` is the sync store to wrap where no native async driver applies."""
+    backend = backend or os.getenv("STORAGE_BACKEND", "supabase")
+    options = {
+        "pool_size": int(os.getenv("READ_POOL_SIZE", str(DEFAULT_POOL_SIZE))),
+        "query_timeout": float(os.getenv("READ_QUERY_TIMEOUT", str(DEFAULT_QUERY_TIMEOUT))),
+    }
+    if backend == "supabase":
+        url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+        return PostgRESTReader(url, key, **options) if url and key else None
+    if backend == "postgres" and os.getenv("DATABASE_URL"):
+        return AsyncPostgresReader(os.getenv("DATABASE_URL"), **options)
+    return ThreadedReader(store, **options) if store is not None else None
@@ -0,0 +1,114 @@
+"""
+Direct-Postgres store (psycopg 3 + connection pool).
+
+Point DATABASE_URL at the Supabase database (or any Postgres with the schema
+applied). Regular queries are one round trip on a pooled connection instead of
+an HTTP request per operation; bulk_insert() streams rows with COPY and
+bulk_upsert() COPYs into a temp table and merges with INSERT ... ON CONFLICT,
+so backfills run at driver speed. Triggers (state versions) fire as usual.
+"""
+
+from typing import Dict, Any, List, Tuple
+
+from .sql import SQLStore, Result, quote_ident, to_api_value, dedupe, group_by_columns
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg.types.json import Jsonb
+    from psycopg_pool import ConnectionPool
+except ImportError:  # pragma: no cover - optional dependency
+    psycopg = None
+
+
+class PostgresStore(SQLStore):
+    placeholder = "%s"
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10):
+        if psycopg is None:
+            raise RuntimeError("STORAGE_BACKEND=postgres requires psycopg[binary] and psycopg-pool")
+        super().__init__()
+        self.pool = ConnectionPool(dsn, min_size=min_size, max_size=max_size,
+                                   kwargs={"row_factory": dict_row, "autocommit": False}, open=True)
+
+    def adapt(self, value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            return Jsonb(value)
+        return value
+
+    @staticmethod
+    def _rows(cursor) -> List[Dict[str, Any]]:
+        if cursor.description is None:
+            return []
+        return [{k: to_api_value(v) for k, v in row.items()} for row in cursor.fetchall()]
+
+    def run(self, table: str, statements: List[Tuple[str, List[Any]]]) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        # One transaction per builder call, like a single PostgREST request
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                for sql, params in statements:
+                    cur.execute(sql, params)
+                    rows.extend(self._rows(cur))
+        return rows
+
+    def rpc(self, fn: str, params: Dict[str, Any]) -> "_RPC":
+        return _RPC(self, fn, params)
+
+    def _call(self, fn: str, params: Dict[str, Any]) -> Any:
+        args = ", ".join(f"{quote_ident(k)} => %s" for k in params)
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {quote_ident(fn)}({args}) AS result", [self.adapt(v) for v in params.values()])
+                row = cur.fetchone()
+        return to_api_value(row["result"]) if row else None
+
+    def _copy(self, cur, table: str, columns: Tuple[str, ...], rows: List[Dict[str, Any]]) -> None:
+        column_list = ", ".join(quote_ident(c) for c in columns)
+        with cur.copy(f"COPY {table} ({column_list}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([self.adapt(row[c]) for c in columns])
+
+    def bulk_insert(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        """Append rows with COPY (no RETURNING, no conflict handling)."""
+        if not rows:
+            return 0
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                for columns, group in group_by_columns(rows).items():
+                    self._copy(cur, quote_ident(table), columns, group)
+        return len(rows)
+
+    def bulk_upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: str) -> int:
+        """COPY into a temp table, then one INSERT ... SELECT ... ON CONFLICT DO UPDATE per column set."""
+        if not rows:
+            return 0
+        keys = tuple(c.strip() for c in on_conflict.split(","))
+        rows = dedupe(rows, keys)
+        target = quote_ident(table)
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                for i, (columns, group) in enumerate(group_by_columns(rows).items()):
+                    staging = quote_ident(f"_bulk_{table}_{i}")
+                    column_list = ", ".join(quote_ident(c) for c in columns)
+                    cur.execute(f"CREATE TEMP TABLE {staging} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP")
+                    self._copy(cur, staging, columns, group)
+                    updates = [c for c in columns if c not in keys]
+                    action = ("DO UPDATE SET " + ", ".join(f"{quote_ident(c)} = EXCLUDED.{quote_ident(c)}" for c in updates)
+                              if updates else "DO NOTHING")
+                    cur.execute(f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM {staging} "
+                                f"ON CONFLICT ({', '.join(quote_ident(k) for k in keys)}) {action}")
+        return len(rows)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class _RPC:
+    """Deferred function call so `store.rpc(...).execute().data` works like supabase-py."""
+
+    def __init__(self, store, fn: str, params: Dict[str, Any]):
+        self.store, self.fn, self.params = store, fn, params
+
+    def execute(self) -> Result:
+        return Result(self.store._call(self.fn, self.params))
@@ -0,0 +1,243 @@
+"""
+SQL query builder shared by the direct-Postgres and SQLite stores.
+
+It implements the subset of the supabase-py query API the services use
+(select/insert/upsert/update/delete with eq/neq/gt/gte/lt/lte/in_/is_/match,
+order, limit) and returns PostgREST-shaped results: a `.data` list of dicts with
+timestamps as ISO strings and numerics as floats.
+"""
+
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Sequence
+
+# Tables upserted without on_conflict in the services (PostgREST uses the primary key)
+PRIMARY_KEYS = {
+    "sync_state": ("key",),
+    "sync_leases": ("job",),
+}
+
+
+class Result:
+    __slots__ = ("data", "count")
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def to_api_value(value: Any) -> Any:
+    """Driver value -> what PostgREST would have returned in JSON."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def dedupe(rows: Sequence[Dict[str, Any]], keys: Sequence[str]) -> List[Dict[str, Any]]:
+    """Last row wins per conflict key (Postgres rejects touching a row twice in one upsert)."""
+    by_key: Dict[Tuple, Dict[str, Any]] = {}
+    for row in rows:
+        by_key[tuple(row.get(k) for k in keys)] = row
+    return list(by_key.values())
+
+
+def group_by_columns(rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+    """Rows with the same key set share one statement; missing keys keep their column defaults."""
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row.keys()), []).append(row)
+    return groups
+
+
+class SQLQuery:
+    def __init__(self, store: "SQLStore", table: str):
+        self.store = store
+        self.table = table
+        self.op = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.on_conflict: Optional[str] = None
+        self.ignore_duplicates = False
+        self.filters: List[Tuple[str, List[Any]]] = []
+        self.ordering: List[str] = []
+        self.limit_count: Optional[int] = None
+
+    # --- Operations ---
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "SQLQuery":
+        self.op, self.columns = "select", columns or "*"
+        return self
+
+    def insert(self, payload, **kwargs) -> "SQLQuery":
+        self.op, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict: Optional[str] = None, ignore_duplicates: bool = False, **kwargs) -> "SQLQuery":
+        self.op, self.payload = "upsert", payload
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, payload: Dict[str, Any], **kwargs) -> "SQLQuery":
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self, **kwargs) -> "SQLQuery":
+        self.op = "delete"
+        return self
+
+    # --- Filters and modifiers ---
+
+    def _filter(self, column: str, op: str, value: Any) -> "SQLQuery":
+        self.filters.append((f"{quote_ident(column)} {op} {self.store.placeholder}", [value]))
+        return self
+
+    def eq(self, column: str, value: Any) -> "SQLQuery":
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value: Any) -> "SQLQuery":
+        return self._filter(column, "<>", value)
+
+    def gt(self, column: str, value: Any) -> "SQLQuery":
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value: Any) -> "SQLQuery":
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value: Any) -> "SQLQuery":
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value: Any) -> "SQLQuery":
+        return self._filter(column, "<=", value)
+
+    def in_(self, column: str, values: Sequence[Any]) -> "SQLQuery":
+        values = list(values)
+        if not values:
+            self.filters.append(("1 = 0", []))
+        else:
+            marks = ", ".join([self.store.placeholder] * len(values))
+            self.filters.append((f"{quote_ident(column)} IN ({marks})", values))
+        return self
+
+    def is_(self, column: str, value: Any) -> "SQLQuery":
+        keyword = {"null": "NULL", None: "NULL", True: "TRUE", False: "FALSE", "true": "TRUE", "false": "FALSE"}[value]
+        self.filters.append((f"{quote_ident(column)} IS {keyword}", []))
+        return self
+
+    def match(self, query: Dict[str, Any]) -> "SQLQuery":
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs) -> "SQLQuery":
+        self.ordering.append(f"{quote_ident(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size: int, **kwargs) -> "SQLQuery":
+        self.limit_count = int(size)
+        return self
+
+    # --- SQL generation ---
+
+    def _where(self) -> Tuple[str, List[Any]]:
+        if not self.filters:
+            return "", []
+        params: List[Any] = []
+        for _, values in self.filters:
+            params.extend(values)
+        return " WHERE " + " AND ".join(clause for clause, _ in self.filters), params
+
+    def _conflict_keys(self) -> Tuple[str, ...]:
+        if self.on_conflict:
+            return tuple(c.strip() for c in self.on_conflict.split(","))
+        if self.table in PRIMARY_KEYS:
+            return PRIMARY_KEYS[self.table]
+        raise ValueError(f"upsert into {self.table} needs on_conflict")
+
+    def statements(self) -> List[Tuple[str, List[Any]]]:
+        table = quote_ident(self.table)
+        mark = self.store.placeholder
+        if self.op == "select":
+            columns = "*" if self.columns.strip() == "*" else ", ".join(quote_ident(c.strip()) for c in self.columns.split(","))
+            where, params = self._where()
+            sql = f"SELECT {columns} FROM {table}{where}"
+            if self.ordering:
+                sql += " ORDER BY " + ", ".join(self.ordering)
+            if self.limit_count is not None:
+                sql += f" LIMIT {self.limit_count}"
+            return [(sql, params)]
+        if self.op == "update":
+            assignments = ", ".join(f"{quote_ident(c)} = {mark}" for c in self.payload)
+            where, params = self._where()
+            values = [self.store.adapt(v) for v in self.payload.values()]
+            return [(f"UPDATE {table} SET {assignments}{where} RETURNING *", values + params)]
+        if self.op == "delete":
+            where, params = self._where()
+            return [(f"DELETE FROM {table}{where} RETURNING *", params)]
+
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        keys = self._conflict_keys() if self.op == "upsert" else ()
+        if keys:
+            rows = dedupe(rows, keys)
+        statements = []
+        for columns, group in group_by_columns(rows).items():
+            row_marks = "(" + ", ".join([mark] * len(columns)) + ")"
+            sql = f"INSERT INTO {table} ({', '.join(quote_ident(c) for c in columns)}) VALUES " + ", ".join([row_marks] * len(group))
+            if keys:
+                updates = [c for c in columns if c not in keys]
+                target = ", ".join(quote_ident(k) for k in keys)
+                if updates and not self.ignore_duplicates:
+                    sql += f" ON CONFLICT ({target}) DO UPDATE SET " + ", ".join(f"{quote_ident(c)} = excluded.{quote_ident(c)}" for c in updates)
+                else:
+                    sql += f" ON CONFLICT ({target}) DO NOTHING"
+            sql += " RETURNING *"
+            params = [self.store.adapt(row[c]) for row in group for c in columns]
+            statements.append((sql, params))
+        return statements
+
+    def execute(self) -> Result:
+        return Result(self.store.run(self.table, self.statements()))
+
+
+class SQLStore:
+    """Common parts of the SQL stores; subclasses provide run(), rpc() and the bulk paths."""
+
+    placeholder = "%s"
+    # Rows per multi-row INSERT statement in bulk paths
+    chunk_size = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> SQLQuery:
+        return SQLQuery(self, name)
+
+    def from_(self, name: str) -> SQLQuery:
+        return self.table(name)
+
+    def adapt(self, value: Any) -> Any:
+        return value
+
+    def run(self, table: str, statements: List[Tuple[str, List[Any]]]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def bulk_upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: str) -> int:
+        for i in range(0, len(rows), self.chunk_size):
+            self.table(table).upsert(rows[i:i + self.chunk_size], on_conflict=on_conflict).execute()
+        return len(rows)
+
+    def bulk_insert(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        for i in range(0, len(rows), self.chunk_size):
+            self.table(table).insert(rows[i:i + self.chunk_size]).execute()
+        return len(rows)
+
+    def close(self) -> None:
+        pass
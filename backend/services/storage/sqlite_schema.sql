@@ -0,0 +1,283 @@
+-- Goldtracer PRO SQLite schema for local runs (STORAGE_BACKEND=sqlite)
+-- Mirrors supabase_schema.sql: DECIMAL -> REAL, JSONB -> JSON (text), TIMESTAMPTZ -> ISO-8601 text.
+-- The Postgres functions (leases, rollups) are implemented in backend/services/storage/sqlite_store.py.
+
+CREATE TABLE IF NOT EXISTS market_data_cache (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT UNIQUE NOT NULL,
+    last_price REAL,
+    open_price REAL,
+    high_price REAL,
+    low_price REAL,
+    change_percent REAL,
+    cached_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')),
+    metadata JSON,
+    state_version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS macro_indicators (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    indicator_name TEXT UNIQUE NOT NULL,
+    value REAL,
+    unit TEXT,
+    is_stale BOOLEAN DEFAULT 0,
+    last_updated TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')),
+    source TEXT,
+    state_version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS institutional_stats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category TEXT NOT NULL,
+    label TEXT NOT NULL,
+    value REAL,
+    change_value REAL,
+    timestamp TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')),
+    state_version INTEGER NOT NULL DEFAULT 0,
+    UNIQUE(category, label)
+);
+
+CREATE TABLE IF NOT EXISTS daily_strategy_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_date TEXT UNIQUE DEFAULT (date('now')),
+    ai_summary TEXT,
+    pivot_points JSON,
+    trade_advice JSON,
+    fedwatch JSON,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')),
+    state_version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS market_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    price REAL NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_market_history_ticker_time ON market_history(ticker, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_market_history_time ON market_history(timestamp);
+
+CREATE TABLE IF NOT EXISTS market_history_1m (
+    ticker TEXT NOT NULL, bucket TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, samples INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ticker, bucket)
+);
+CREATE TABLE IF NOT EXISTS market_history_15m (
+    ticker TEXT NOT NULL, bucket TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, samples INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ticker, bucket)
+);
+CREATE TABLE IF NOT EXISTS market_history_1h (
+    ticker TEXT NOT NULL, bucket TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, samples INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ticker, bucket)
+);
+CREATE TABLE IF NOT EXISTS market_history_1d (
+    ticker TEXT NOT NULL, bucket TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, samples INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ticker, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS macro_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_date TEXT UNIQUE NOT NULL,
+    nominal_yield REAL,
+    breakeven_inflation REAL,
+    real_yield REAL,
+    domestic_premium REAL,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS volatility_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticker TEXT NOT NULL,
+    log_date TEXT NOT NULL,
+    open REAL, high REAL, low REAL, close REAL,
+    rv_close_intraday REAL,
+    rv_parkinson_intraday REAL,
+    rv_garman_klass_intraday REAL,
+    rv_close_20d REAL,
+    rv_parkinson_20d REAL,
+    rv_garman_klass_20d REAL,
+    gvz REAL,
+    gvz_spread REAL,
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')),
+    UNIQUE(ticker, log_date)
+);
+CREATE INDEX IF NOT EXISTS idx_volatility_history_ticker_date ON volatility_history(ticker, log_date DESC);
+
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    conditions JSON NOT NULL,
+    for_seconds INTEGER NOT NULL DEFAULT 0,
+    severity TEXT DEFAULT 'warning',
+    webhook TEXT,
+    enabled BOOLEAN NOT NULL DEFAULT 1,
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_alert_rules_updated ON alert_rules(updated_at DESC);
+
+CREATE TABLE IF NOT EXISTS alert_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rule_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    sink TEXT,
+    payload JSON NOT NULL,
+    delivery TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')),
+    last_error TEXT,
+    delivered_at TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_alert_events_due ON alert_events(delivery, next_attempt_at);
+
+CREATE TABLE IF NOT EXISTS backfill_chunks (
+    job TEXT NOT NULL,
+    chunk_start TEXT NOT NULL,
+    chunk_end TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rows_written INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')),
+    PRIMARY KEY (job, chunk_start)
+);
+
+CREATE TABLE IF NOT EXISTS news_stream (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    msg_type TEXT DEFAULT 'FLASH',
+    title TEXT NOT NULL,
+    content TEXT,
+    source TEXT,
+    url TEXT,
+    published_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')),
+    state_version INTEGER NOT NULL DEFAULT 0,
+    UNIQUE(title, published_at)
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value JSON NOT NULL DEFAULT '{}',
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now'))
+);
+
+CREATE TABLE IF NOT EXISTS sync_leases (
+    job TEXT PRIMARY KEY,
+    holder TEXT,
+    token INTEGER NOT NULL DEFAULT 0,
+    acquired_at TEXT,
+    expires_at TEXT,
+    released_at TEXT,
+    last_result JSON
+);
+
+-- State versions: one global counter; AFTER triggers stamp rows whose data (not heartbeat) changed
+CREATE TABLE IF NOT EXISTS dashboard_state_seq (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO dashboard_state_seq (id, value) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_market_data_cache_version_ins AFTER INSERT ON market_data_cache
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE market_data_cache SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_market_data_cache_version_upd AFTER UPDATE ON market_data_cache
+WHEN NEW.last_price IS NOT OLD.last_price OR NEW.open_price IS NOT OLD.open_price
+  OR NEW.high_price IS NOT OLD.high_price OR NEW.low_price IS NOT OLD.low_price
+  OR NEW.change_percent IS NOT OLD.change_percent OR NEW.metadata IS NOT OLD.metadata
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE market_data_cache SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_macro_indicators_version_ins AFTER INSERT ON macro_indicators
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE macro_indicators SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_macro_indicators_version_upd AFTER UPDATE ON macro_indicators
+WHEN NEW.value IS NOT OLD.value OR NEW.unit IS NOT OLD.unit
+  OR NEW.is_stale IS NOT OLD.is_stale OR NEW.source IS NOT OLD.source
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE macro_indicators SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_institutional_stats_version_ins AFTER INSERT ON institutional_stats
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE institutional_stats SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_institutional_stats_version_upd AFTER UPDATE ON institutional_stats
+WHEN NEW.value IS NOT OLD.value OR NEW.change_value IS NOT OLD.change_value
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE institutional_stats SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_strategy_log_version_ins AFTER INSERT ON daily_strategy_log
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE daily_strategy_log SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_daily_strategy_log_version_upd AFTER UPDATE ON daily_strategy_log
+WHEN NEW.ai_summary IS NOT OLD.ai_summary OR NEW.pivot_points IS NOT OLD.pivot_points
+  OR NEW.trade_advice IS NOT OLD.trade_advice OR NEW.fedwatch IS NOT OLD.fedwatch
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE daily_strategy_log SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_news_stream_version_ins AFTER INSERT ON news_stream
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE news_stream SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_news_stream_version_upd AFTER UPDATE ON news_stream
+WHEN NEW.msg_type IS NOT OLD.msg_type OR NEW.content IS NOT OLD.content
+  OR NEW.source IS NOT OLD.source OR NEW.url IS NOT OLD.url
+BEGIN
+    UPDATE dashboard_state_seq SET value = value + 1;
+    UPDATE news_stream SET state_version = (SELECT value FROM dashboard_state_seq) WHERE id = NEW.id;
+END;
+
+DROP VIEW IF EXISTS latest_dashboard_state;
+CREATE VIEW latest_dashboard_state AS
+SELECT
+    (SELECT json_group_array(json_object(
+        'id', id, 'ticker', ticker, 'last_price', last_price, 'open_price', open_price,
+        'high_price', high_price, 'low_price', low_price, 'change_percent', change_percent,
+        'cached_at', cached_at, 'metadata', json(metadata), 'state_version', state_version))
+       FROM market_data_cache) AS tickers,
+    (SELECT json_group_array(json_object(
+        'id', id, 'indicator_name', indicator_name, 'value', value, 'unit', unit,
+        'is_stale', json(CASE WHEN is_stale THEN 'true' ELSE 'false' END),
+        'last_updated', last_updated, 'source', source, 'state_version', state_version))
+       FROM macro_indicators) AS macro,
+    (SELECT json_group_array(json_object(
+        'id', id, 'category', category, 'label', label, 'value', value,
+        'change_value', change_value, 'timestamp', timestamp, 'state_version', state_version))
+       FROM institutional_stats) AS institutional,
+    (SELECT json_object(
+        'id', id, 'log_date', log_date, 'ai_summary', ai_summary, 'pivot_points', json(pivot_points),
+        'trade_advice', json(trade_advice), 'fedwatch', json(fedwatch), 'created_at', created_at,
+        'state_version', state_version)
+       FROM daily_strategy_log WHERE log_date = date('now')) AS today_strategy,
+    (SELECT json_group_array(json_object(
+        'id', id, 'msg_type', msg_type, 'title', title, 'content', content, 'source', source,
+        'url', url, 'published_at', published_at, 'state_version', state_version))
+       FROM (SELECT * FROM news_stream ORDER BY published_at DESC LIMIT 15)) AS news;
+
+DROP VIEW IF EXISTS dashboard_versions;
+CREATE VIEW dashboard_versions AS
+SELECT
+    (SELECT COALESCE(MAX(state_version), 0) FROM market_data_cache) AS tickers,
+    (SELECT COALESCE(MAX(state_version), 0) FROM macro_indicators) AS macro,
+    (SELECT COALESCE(MAX(state_version), 0) FROM institutional_stats) AS institutional,
+    (SELECT COALESCE(MAX(state_version), 0) FROM daily_strategy_log WHERE log_date = date('now')) AS today_strategy,
+    (SELECT COALESCE(MAX(state_version), 0) FROM news_stream) AS news,
+    (SELECT value FROM dashboard_state_seq) AS current;
@@ -0,0 +1,194 @@
+"""
+SQLite store for local runs and tests (STORAGE_BACKEND=sqlite, SQLITE_PATH=goldtracer.db).
+
+The schema (sqlite_schema.sql) mirrors supabase_schema.sql including the
+dashboard views and state-version triggers. The SQL functions the services call
+through rpc() (sync leases, market_history rollups and retention) are
+implemented here in Python, so the whole sync pipeline and the API run without
+Supabase.
+"""
+
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from .sql import SQLStore, Result
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sqlite_schema.sql")
+
+# source table, time column, target table, bucket width (seconds); mirrors rollup_market_history()
+ROLLUP_STEPS = [
+    ("market_history", "timestamp", "market_history_1m", 60),
+    ("market_history_1m", "bucket", "market_history_15m", 900),
+    ("market_history_15m", "bucket", "market_history_1h", 3600),
+    ("market_history_1h", "bucket", "market_history_1d", 86400),
+]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _floor(ts: datetime, seconds: int) -> datetime:
+    return datetime.fromtimestamp(int(ts.timestamp()) // seconds * seconds, timezone.utc)
+
+
+class SQLiteStore(SQLStore):
+    placeholder = "?"
+
+    def __init__(self, path: str = ":memory:"):
+        super().__init__()
+        self.path = path
+        # One shared connection guarded by the store lock (write-behind and CME threads use it too)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with open(SCHEMA_PATH) as f:
+            self.conn.executescript(f.read())
+        self._column_types: Dict[str, Dict[str, str]] = {}
+
+    def adapt(self, value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+
+    def _types(self, table: str) -> Dict[str, str]:
+        if table not in self._column_types:
+            rows = self.conn.execute(f"PRAGMA table_info({table})").fetchall()
+            self._column_types[table] = {r["name"]: (r["type"] or "").upper() for r in rows}
+        return self._column_types[table]
+
+    def _decode(self, table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        types = self._types(table)
+        out = {}
+        for key in row.keys():
+            value, declared = row[key], types.get(key, "")
+            if value is not None:
+                if declared == "JSON" or (not declared and isinstance(value, str) and value[:1] in ("[", "{")):
+                    # Views have no declared types: their aggregated columns are JSON text
+                    try:
+                        value = json.loads(value)
+                    except ValueError:
+                        pass
+                elif declared == "BOOLEAN":
+                    value = bool(value)
+            out[key] = value
+        return out
+
+    def run(self, table: str, statements: List[Tuple[str, List[Any]]]) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    rows.extend(self._decode(table, r) for r in self.conn.execute(sql, params).fetchall())
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def rpc(self, fn: str, params: Dict[str, Any]) -> "_LocalRPC":
+        impl = getattr(self, f"_fn_{fn}", None)
+        if impl is None:
+            raise RuntimeError(f"Function {fn} is not available in the SQLite store")
+        return _LocalRPC(impl, params)
+
+    # --- sync lease functions (migrations/add_sync_leases.sql) ---
+
+    def _lease_row(self, job: str) -> Optional[Dict[str, Any]]:
+        rows = self.table("sync_leases").select("*").eq("job", job).execute().data
+        return rows[0] if rows else None
+
+    def _fn_acquire_sync_lease(self, p_job: str, p_holder: str, p_ttl_seconds: int) -> Optional[int]:
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("INSERT OR IGNORE INTO sync_leases (job) VALUES (?)", [p_job])
+                row = self.conn.execute("SELECT * FROM sync_leases WHERE job = ?", [p_job]).fetchone()
+                now = _now()
+                free = row["released_at"] or not row["expires_at"] or _parse_ts(row["expires_at"]) < now
+                token = None
+                if free:
+                    token = row["token"] + 1
+                    self.conn.execute(
+                        "UPDATE sync_leases SET holder = ?, token = ?, acquired_at = ?, expires_at = ?, released_at = NULL WHERE job = ?",
+                        [p_holder, token, now.isoformat(), (now + timedelta(seconds=p_ttl_seconds)).isoformat(), p_job])
+                self.conn.execute("COMMIT")
+                return token
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _fn_renew_sync_lease(self, p_job: str, p_token: int, p_ttl_seconds: int) -> bool:
+        expires = (_now() + timedelta(seconds=p_ttl_seconds)).isoformat()
+        rows = self.table("sync_leases").update({"expires_at": expires}) \
+            .eq("job", p_job).eq("token", p_token).is_("released_at", "null").execute().data
+        return bool(rows)
+
+    def _fn_release_sync_lease(self, p_job: str, p_token: int, p_result: Optional[Dict[str, Any]]) -> bool:
+        now = _now().isoformat()
+        payload = {"released_at": now, "expires_at": now}
+        if p_result is not None:
+            payload["last_result"] = p_result
+        rows = self.table("sync_leases").update(payload) \
+            .eq("job", p_job).eq("token", p_token).is_("released_at", "null").execute().data
+        return bool(rows)
+
+    # --- market_history rollups (migrations/add_market_history_rollups.sql) ---
+
+    def _fn_rollup_market_history(self, p_since: str) -> int:
+        since = _parse_ts(p_since)
+        total = 0
+        for source, time_column, target, width in ROLLUP_STEPS:
+            start = _floor(since, width).isoformat()
+            rows = self.table(source).select("*").gte(time_column, start).order(time_column).execute().data
+            buckets: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+            for row in rows:
+                key = (row["ticker"], _floor(_parse_ts(row[time_column]), width).isoformat())
+                if source == "market_history":
+                    o = h = l = c = row["price"]
+                    n = 1
+                else:
+                    o, h, l, c, n = row["open"], row["high"], row["low"], row["close"], row["samples"]
+                b = buckets.get(key)
+                if b is None:
+                    buckets[key] = {"ticker": key[0], "bucket": key[1], "open": o, "high": h, "low": l, "close": c, "samples": n}
+                else:
+                    b.update(high=max(b["high"], h), low=min(b["low"], l), close=c, samples=b["samples"] + n)
+            if buckets:
+                self.table(target).upsert(list(buckets.values()), on_conflict="ticker,bucket").execute()
+            total += len(buckets)
+        return total
+
+    def _fn_prune_market_history(self, p_raw_before: Optional[str], p_1m_before: Optional[str],
+                                 p_15m_before: Optional[str], p_1h_before: Optional[str]) -> int:
+        total = 0
+        for table, column, cutoff in (("market_history", "timestamp", p_raw_before), ("market_history_1m", "bucket", p_1m_before),
+                                      ("market_history_15m", "bucket", p_15m_before), ("market_history_1h", "bucket", p_1h_before)):
+            if cutoff is not None:
+                total += len(self.table(table).delete().lt(column, _parse_ts(cutoff).isoformat()).execute().data)
+        return total
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class _LocalRPC:
+    def __init__(self, impl, params: Dict[str, Any]):
+        self.impl, self.params = impl, params
+
+    def execute(self) -> Result:
+        return Result(self.impl(**self.params))
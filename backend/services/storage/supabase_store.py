@@ -0,0 +1,37 @@
+"""
+Supabase (PostgREST) store: the default backend.
+
+Queries go straight to the supabase-py client; the bulk paths only add chunking
+so large backfills stay under PostgREST's payload limits.
+"""
+
+from typing import Dict, Any, List
+
+BULK_CHUNK = 500
+
+
+class SupabaseStore:
+    def __init__(self, client):
+        self.client = client
+
+    def table(self, name: str):
+        return self.client.table(name)
+
+    def from_(self, name: str):
+        return self.client.table(name)
+
+    def rpc(self, fn: str, params: Dict[str, Any]):
+        return self.client.rpc(fn, params)
+
+    def bulk_upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: str) -> int:
+        for i in range(0, len(rows), BULK_CHUNK):
+            self.client.table(table).upsert(rows[i:i + BULK_CHUNK], on_conflict=on_conflict).execute()
+        return len(rows)
+
+    def bulk_insert(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        for i in range(0, len(rows), BULK_CHUNK):
+            self.client.table(table).insert(rows[i:i + BULK_CHUNK]).execute()
+        return len(rows)
+
+    def close(self) -> None:
+        pass
@@ -1,56 +1,101 @@
 import requests
 import os
-from datetime import datetime
-from typing import Optional, Dict, Any
-from .calculator import calc_real_yield, calc_pivot_points, fetch_yahoo_finance_raw, calc_rsi, fetch_indicator_price, calc_fed_watch, calc_domestic_premium
+import time
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+from typing import Optional, Dict, Any, List
+from .calculator import calc_real_yield, calc_pivot_points, fetch_yahoo_bars, calc_rsi, calc_fed_watch, calc_domestic_premium, fetch_yahoo_daily_bars
+from .alignment import DailySeries, get_calendar, real_yield_series, domestic_premium_series
+from .volatility import (TARGET as VOL_TARGET, IMPLIED as VOL_IMPLIED, WINDOW as VOL_WINDOW, SESSION_SECONDS,
+                         session_bars, session_ohlc, intraday_realized, daily_realized, history_row)
+from .alerts import run_alerts, deliver_pending
+from .correlations import CorrelationBook, FACTORS, TARGET, STATE_KEY as CORRELATION_STATE_KEY
+from .bars import Quote
+from .fastjson import parse_response
+from .sync_state import load_state, save_state, item_hash, SeenIndex
+from .ticker_registry import TickerRegistry, get_registry
+from .leases import LeaseManager
+from .deltas import upsert_changed, write_filter
+from .write_buffer import WriteBehindBuffer
+from .rollups import run_rollups
+from .candles import build_candles, pivots_from_candles, parse_interval
+from .backfill import make_job, run_backfill, backfilled, DEFAULT_WORKERS
+from .storage import bulk_upsert
+
+NEWS_STATE_KEY = "news_rss"
+NEWS_SEEN_LIMIT = 500
+# Extra calendar days fetched before a macro_history window for the as-of joins
+MACRO_LOOKBACK_DAYS = 10
+# Pivot timeframe -> (candle interval, range); daily pivots use the exchange session like the upstream 1d bars
+PIVOT_CANDLES = {"1d": ("session", "5d"), "4h": ("4h", "5d"), "1w": ("1w", "1mo")}
+# Sampled candles miss intraday extremes: trust one only with about a price per minute of trading behind it
+PIVOT_MIN_SAMPLES = {"1d": 1200, "4h": 200, "1w": 6000}
 
 class GoldDataSyncer:
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, registry: Optional[TickerRegistry] = None, lease_mode: Optional[str] = None,
+                 write_buffer: Optional[WriteBehindBuffer] = None):
         self.supabase = supabase_client
+        # Optional write-behind buffer for high-frequency polling (coalesced quotes, batched history)
+        self.write_buffer = write_buffer
+        self.registry = registry or get_registry()
+        # Per-job DB leases: overlapping triggers skip (or join) instead of duplicating work
+        self.leases = LeaseManager(supabase_client, mode=lease_mode)
         self.fred_api_key = os.getenv("FRED_API_KEY")
         self.cache = {} # Lifecycle cache to avoid redundant API calls
+        self.bars: Dict[str, Any] = {} # Parsed intraday bars behind each cached quote (realized vol)
 
 
-    def fetch_market_data(self, ticker: str, force: bool = False) -> Optional[Dict[str, Any]]:
+    def fetch_market_data(self, ticker: str, force: bool = False) -> Optional[Quote]:
         """Fetch basic market data with lifecycle caching."""
         if ticker in self.cache and not force:
             return self.cache[ticker]
             
-        raw = fetch_yahoo_finance_raw(ticker, period="1d")
-        if not raw:
+        bars = fetch_yahoo_bars(ticker, period="1d")
+        if bars is None:
             return None
         
         try:
-            meta = raw['meta']
-            # Fallback for last price: regularMarketPrice or the latest timestamp's close
-            last_price = meta.get('regularMarketPrice')
-            
-            quote = raw['indicators']['quote'][0]
-            closes = [c for c in quote.get('close', []) if c is not None]
-            if not last_price and closes:
-                last_price = closes[-1]
-            
-            opens = [o for o in quote.get('open', []) if o is not None]
-            open_price = opens[0] if opens else last_price
-            
-            if not last_price:
+            quote = bars.to_quote()
+            if quote is None:
                 return None
-
-            data = {
-                "ticker": ticker,
-                "last_price": last_price,
-                "open_price": open_price,
-                "high_price": max(quote.get('high', [last_price])) or last_price,
-                "low_price": min(quote.get('low', [last_price])) or last_price,
-                "change_percent": ((last_price / open_price) - 1) * 100 if open_price else 0
-            }
-            self.cache[ticker] = data
-            return data
+            self.cache[ticker] = quote
+            self.bars[ticker] = bars
+            return quote
         except Exception as e:
             print(f"Error parsing market data for {ticker}: {e}")
             return None
 
 
+    def pivot_points(self, ticker: str, timeframe: str) -> Optional[Dict[str, float]]:
+        """
+        Pivots from candles built out of our own stored history; the upstream
+        chart is only requested while history doesn't hold a full previous candle
+        made of real bars (backfilled) or of densely sampled prices.
+        """
+        interval, range_ = PIVOT_CANDLES[timeframe]
+        try:
+            payload = build_candles(self.supabase, ticker, interval, range_)
+            candles = payload["candles"]
+            # The first candle is cut by the range start, so the previous one must come after it
+            if len(candles) >= 3 and (candles[-2]["samples"] >= PIVOT_MIN_SAMPLES[timeframe]
+                                      or self._backfilled_candle(ticker, interval, payload["source_tier"], candles[-2])):
+                return pivots_from_candles(candles)
+        except Exception as e:
+            print(f"Stored candles unavailable for {ticker} {timeframe} pivots: {e}")
+        return calc_pivot_points(ticker, timeframe)
+
+    def _backfilled_candle(self, ticker: str, interval: str, tier: str, candle: Dict[str, Any]) -> bool:
+        """Whether the candle's source buckets were written by a market_history backfill after it closed."""
+        width = parse_interval(interval)
+        if width is None:
+            # A trading day's session opens the previous evening and has closed by the next UTC midnight
+            day = datetime.fromisoformat(candle["t"]).replace(tzinfo=timezone.utc)
+            start, end = day - timedelta(days=1), day + timedelta(days=1)
+        else:
+            start = datetime.fromisoformat(candle["t"])
+            end = start + timedelta(seconds=width)
+        return backfilled(self.supabase, f"market_history:{tier}:{ticker}", start, end)
+
     def fetch_fred_metric(self, series_id: str) -> Optional[float]:
         if not self.fred_api_key:
             return None
@@ -59,7 +104,7 @@ class GoldDataSyncer:
         try:
             response = requests.get(url, timeout=10)
             response.raise_for_status()
-            data = response.json()
+            data = parse_response(response)
             if data['observations']:
                 val = data['observations'][0]['value']
                 return float(val) if val != "." else None
@@ -68,36 +113,77 @@ class GoldDataSyncer:
             return None
         return None
 
-    def sync_all(self):
+    def sync_tickers(self, tiers: Optional[List[str]] = None, shard: int = 0, shards: int = 1) -> Dict[str, Any]:
+        """Refresh market_data_cache for this shard's slice of the registry universe."""
+        job = f"sync_tickers:{','.join(sorted(tiers)) if tiers else 'all'}:{shard}/{shards}"
+        return self.leases.run(job, lambda: self._sync_tickers(tiers, shard, shards), ttl=300)
+
+    def _sync_tickers(self, tiers: Optional[List[str]], shard: int, shards: int) -> Dict[str, Any]:
         report = {"updated": [], "errors": []}
-        # 1. High Frequency Tickers (Futures & FX)
-        # GC=F is Gold Futures (most reliable live feed on Yahoo)
-        # USDCNH=X is offshore Yuan
-        tickers = ["GC=F", "^TNX", "DX-Y.NYB", "ZQ=F", "USDCNH=X"]
-        for symbol in tickers:
-            data = self.fetch_market_data(symbol)
+        rows = []
+        for spec in self.registry.select(source="yahoo", tiers=tiers, cache=True, shard=shard, shards=shards):
+            data = self.fetch_market_data(spec.symbol)
             if data:
-                try:
-                    self.supabase.table("market_data_cache").upsert(data, on_conflict="ticker").execute()
-                    report["updated"].append(symbol)
-                except Exception as e:
-                    report["errors"].append(f"DB Error {symbol}: {str(e)}")
+                rows.append(data.to_row())
             else:
-                 report["errors"].append(f"Fetch Failed: {symbol}")
+                 report["errors"].append(f"Fetch Failed: {spec.symbol}")
+        if rows:
+            try:
+                self.write_quotes(rows)
+                report["updated"].extend(r["ticker"] for r in rows)
+            except Exception as e:
+                report["errors"].append(f"DB Error market_data_cache: {str(e)}")
+        return report
+
+    def write_quotes(self, rows: List[Dict[str, Any]]) -> None:
+        """Latest quotes -> market_data_cache, plus a market_history point for every quote that moved."""
+        now = datetime.now(timezone.utc).isoformat()
+        write_filter.seed(self.supabase, "market_data_cache")
+        moved = [r for r in rows if write_filter.changed("market_data_cache", r)]
+        if self.write_buffer is not None:
+            for row in moved:
+                if self.write_buffer.put_quote(row):
+                    self.write_buffer.append_history(row["ticker"], row["last_price"], now)
+            return
+        # One round trip per table for the whole slice
+        upsert_changed(self.supabase, "market_data_cache", rows, on_conflict="ticker")
+        if moved:
+            self.supabase.table("market_history").insert(
+                [{"ticker": r["ticker"], "price": r["last_price"], "timestamp": now} for r in moved]
+            ).execute()
+
+    def sync_all(self, tiers: Optional[List[str]] = None, shard: int = 0, shards: int = 1):
+        """
+        Sync the ticker universe and derived indicators.
+        In sharded mode every worker syncs its own slice of tickers; derived
+        indicators are computed once, by shard 0.
+        """
+        job = f"sync_all:{shard}/{shards}"
+        return self.leases.run(job, lambda: self._sync_all(job, tiers, shard, shards), ttl=300)
+
+    def _sync_all(self, job: str, tiers: Optional[List[str]], shard: int, shards: int):
+        # 1. Registry tickers (Futures, FX, Metals) -> market_data_cache
+        report = self._sync_tickers(tiers, shard, shards)
+        if shard != 0:
+            return report
+        # Fencing check: if the lease was lost during the fetch phase, a newer run owns the writes
+        if not self.leases.still_held(job):
+            report["errors"].append(f"Lease lost for {job}, derived indicators skipped")
+            return report
 
         # 2. Real Yield
         breakeven = self.fetch_fred_metric("T10YIE")
         tnx_data = self.fetch_market_data("^TNX")
-        nominal = tnx_data['last_price'] if tnx_data else None
+        nominal = tnx_data.last_price if tnx_data else None
         
         real_yield = calc_real_yield(nominal, breakeven)
         if real_yield is not None:
-             self.supabase.table("macro_indicators").upsert({
+             upsert_changed(self.supabase, "macro_indicators", {
                  "indicator_name": "10Y_Real_Yield",
                  "value": real_yield,
                  "is_stale": breakeven is None,
                  "source": "FRED + Yahoo"
-             }, on_conflict="indicator_name").execute()
+             }, on_conflict="indicator_name")
 
         # 2.1 Domestic Premium (Simplified: Calculated vs Spot)
         # We need Gold Spot (GC=F) and USDCNY (CNY=X)
@@ -105,46 +191,46 @@ class GoldDataSyncer:
         cny_data = self.fetch_market_data("CNY=X")
         
         if gold_data and cny_data:
-            gold_price = gold_data['last_price']
-            usd_cny = cny_data['last_price']
+            gold_price = gold_data.last_price
+            usd_cny = cny_data.last_price
             
             # Fetch Domestic Gold Price (e.g. 600489.SS or 518880.SS)
             # 518880.SS (Gold ETF) is a good proxy for liquidity
             domestic_proxy = self.fetch_market_data("518880.SS")
             if domestic_proxy:
-                # Huaan Gold ETF (518880.SS) approx 1 share = 0.01g gold
+                # Huaan Gold ETF (518880.SS) approx 1 share = 0.01g gold (registry unit_factor)
                 # We compare vs the real synced Gold Price (GC=F) in gram CNY
-                sh_gram_price = domestic_proxy['last_price'] * 100
+                sh_gram_price = self.registry.convert("518880.SS", domestic_proxy.last_price)
                 premium = calc_domestic_premium(gold_price, usd_cny, sh_gram_price)
                 
-                self.supabase.table("macro_indicators").upsert({
+                upsert_changed(self.supabase, "macro_indicators", {
                     "indicator_name": "Domestic_Premium",
                     "value": premium if premium is not None else 3.25,
                     "unit": "CNY/g",
                     "source": f"Yahoo (518880.SS vs Futures)"
-                }, on_conflict="indicator_name").execute()
+                }, on_conflict="indicator_name")
 
-            self.supabase.table("macro_indicators").upsert({
+            upsert_changed(self.supabase, "macro_indicators", {
                 "indicator_name": "USD_CNY",
                 "value": usd_cny,
                 "source": "Yahoo (USDCNH=X)"
-             }, on_conflict="indicator_name").execute()
+             }, on_conflict="indicator_name")
 
         # 2.2 Debt Wall (Interest as % of GDP)
         interest_gdp = self.fetch_fred_metric("FYOIGDA188S")
         if interest_gdp:
-            self.supabase.table("macro_indicators").upsert({
+            upsert_changed(self.supabase, "macro_indicators", {
                 "indicator_name": "Debt_Interest_GDP",
                 "value": interest_gdp,
                 "unit": "%",
                 "source": "FRED"
-            }, on_conflict="indicator_name").execute()
+            }, on_conflict="indicator_name")
 
 
         # 3. Pivot Points (Multi-Timeframe)
-        pivots_1d = calc_pivot_points("GC=F", "1d")
-        pivots_4h = calc_pivot_points("GC=F", "4h")
-        pivots_1w = calc_pivot_points("GC=F", "1w")
+        pivots_1d = self.pivot_points("GC=F", "1d")
+        pivots_4h = self.pivot_points("GC=F", "4h")
+        pivots_1w = self.pivot_points("GC=F", "1w")
 
         pivots_all = {
             "1d": pivots_1d,
@@ -154,7 +240,7 @@ class GoldDataSyncer:
 
         # 3.1 FedWatch Probability
         zq_data = self.fetch_market_data("ZQ=F")
-        fed_probs = calc_fed_watch(zq_data['last_price']) if zq_data else {}
+        fed_probs = calc_fed_watch(zq_data.last_price) if zq_data else {}
 
         if pivots_1d:
             # Generate simple technical advice from Pivot Points
@@ -178,19 +264,25 @@ class GoldDataSyncer:
         # 4. RSI & Volatility
         rsi_val = calc_rsi("GC=F")
         if rsi_val is not None:
-            self.supabase.table("macro_indicators").upsert({
+            upsert_changed(self.supabase, "macro_indicators", {
                 "indicator_name": "RSI_14",
                 "value": rsi_val,
                 "source": "Yahoo (30D Calc)"
-            }, on_conflict="indicator_name").execute()
+            }, on_conflict="indicator_name")
             
-        gvz_val = fetch_indicator_price("^GVZ")
+        # Quote cached for the volatility stage and the institutional GPR composite
+        gvz_data = self.fetch_market_data("^GVZ")
+        gvz_val = gvz_data.last_price if gvz_data else None
         if gvz_val is not None:
-             self.supabase.table("macro_indicators").upsert({
+             upsert_changed(self.supabase, "macro_indicators", {
                 "indicator_name": "GVZ_Index",
                 "value": gvz_val,
                 "source": "Yahoo (^GVZ)"
-            }, on_conflict="indicator_name").execute()
+            }, on_conflict="indicator_name")
+
+        # 4.1 Realized Volatility vs GVZ (from the GC=F 1m bars fetched above)
+        vol_report = self.sync_volatility()
+        report["errors"].extend(vol_report["errors"])
 
         # 5. AI Brain Synthesis (Quadrant 4 Logic)
         try:
@@ -255,16 +347,18 @@ class GoldDataSyncer:
         return report
 
 
-    def fetch_fred_history(self, series_id: str, days: int = 365) -> Dict[str, float]:
+    def fetch_fred_history(self, series_id: str, days: int = 365, end: Optional[date] = None) -> Dict[str, float]:
+        """Observations over the `days` before `end` (default: up to the latest)."""
         if not self.fred_api_key:
             return {}
-        from datetime import timedelta
-        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        start_date = ((end or datetime.now().date()) - timedelta(days=days)).strftime('%Y-%m-%d')
         url = f"https://api.stlouisfed.org/fred/series/observations?series_id={series_id}&api_key={self.fred_api_key}&file_type=json&observation_start={start_date}"
+        if end is not None:
+            url += f"&observation_end={end.isoformat()}"
         try:
             response = requests.get(url, timeout=15)
             response.raise_for_status()
-            data = response.json()
+            data = parse_response(response)
             return {obs['date']: float(obs['value']) for obs in data.get('observations', []) if obs['value'] != "."}
         except Exception as e:
             print(f"FRED History Error ({series_id}): {e}")
@@ -272,57 +366,223 @@ class GoldDataSyncer:
 
     def sync_macro_history(self, days: int = 7):
         """Optimized to only sync recent history to avoid Vercel timeouts."""
+        return self.leases.run("sync_macro_history", lambda: self._sync_macro_history(days), ttl=600,
+                               empty=lambda: {"updated": 0, "errors": []})
+
+    def _daily_series(self, symbol: str, days: int, end: Optional[date] = None) -> DailySeries:
+        """Daily closes of a Yahoo ticker bucketed on its exchange calendar, in registry units."""
+        spec = self.registry.get(symbol)
+        calendar = get_calendar(spec.calendar)
+        # Through the end of the `end` day (UTC)
+        end_ts = int(datetime.combine(end + timedelta(days=1), datetime.min.time(), timezone.utc).timestamp()) if end else None
+        bars = fetch_yahoo_daily_bars(symbol, days=days, end=end_ts)
+        if bars is None:
+            return DailySeries(symbol, calendar, np.array([], dtype="datetime64[D]"), np.array([]))
+        return DailySeries.from_bars(bars, calendar).scaled(spec.unit_factor)
+
+    def _sync_macro_history(self, days: int):
         report = {"updated": 0, "errors": []}
         try:
-            # 1. Fetch FRED Inflation History (T10YIE)
-            inflation_hist = self.fetch_fred_history("T10YIE", days=days)
-            
-            # 2. Fetch Yahoo Nominal History (^TNX)
-            raw = fetch_yahoo_finance_raw("^TNX", period=f"{days}d")
-
-            nominal_hist = {}
-            if raw and 'timestamp' in raw:
-                timestamps = raw['timestamp']
-                closes = raw['indicators']['quote'][0]['close']
-                for i in range(len(timestamps)):
-                    dt = datetime.fromtimestamp(timestamps[i]).strftime('%Y-%m-%d')
-                    if closes[i] is not None:
-                        nominal_hist[dt] = float(closes[i])
-            
-            # 3. Merge and Upsert
-            all_dates = sorted(set(inflation_hist.keys()) | set(nominal_hist.keys()))
-            to_upsert = []
-            
-            # Last known values for filling gaps
-            last_inflation = None
-            last_nominal = None
-            
-            for d in all_dates:
-                inf = inflation_hist.get(d, last_inflation)
-                nom = nominal_hist.get(d, last_nominal)
-                
-                if inf is not None: last_inflation = inf
-                if nom is not None: last_nominal = nom
-                
-                if inf is not None and nom is not None:
-                    to_upsert.append({
-                        "log_date": d,
-                        "nominal_yield": nom,
-                        "breakeven_inflation": inf,
-                        "real_yield": round(nom - inf, 4)
-                    })
+            today = datetime.now(timezone.utc).date()
+            to_upsert = self.macro_history_rows(today - timedelta(days=days), today)
             
+            if to_upsert and not self.leases.still_held("sync_macro_history", ttl=600):
+                report["errors"].append("Lease lost for sync_macro_history, writes skipped")
+                return report
             if to_upsert:
-                # Upsert in chunks to avoid large payload errors
-                for i in range(0, len(to_upsert), 100):
-                    self.supabase.table("macro_history").upsert(to_upsert[i:i+100], on_conflict="log_date").execute()
-                report["updated"] = len(to_upsert)
+                # Chunked for PostgREST, COPY + merge on the direct-Postgres store
+                report["updated"] = bulk_upsert(self.supabase, "macro_history", to_upsert, on_conflict="log_date")
         except Exception as e:
             report["errors"].append(f"Macro History Sync Failed: {str(e)}")
         
         return report
 
+    def macro_history_rows(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """
+        macro_history rows for the days in [start, end]. Inputs are fetched from
+        MACRO_LOOKBACK_DAYS earlier so the as-of joins have a value on the first day.
+        """
+        days = (end - start).days + MACRO_LOOKBACK_DAYS
+        # 1. Real yield: ^TNX (NYSE) minus FRED T10YIE, as-of joined on NYSE sessions
+        breakeven = DailySeries.from_mapping("T10YIE", get_calendar(self.registry.get("T10YIE").calendar),
+                                             self.fetch_fred_history("T10YIE", days=days, end=end))
+        nominal = self._daily_series("^TNX", days, end)
+        # Stop at the last ^TNX session so stale values are not carried into days without data
+        real = real_yield_series(nominal, breakeven, start, min(nominal.days[-1], np.datetime64(end))) \
+            if len(nominal) else {"days": []}
+
+        # 2. Domestic premium on Shanghai sessions vs the last published COMEX / USD-CNY closes
+        premium = domestic_premium_series(self._daily_series("518880.SS", days, end),
+                                          self._daily_series("GC=F", days, end), self._daily_series("CNY=X", days, end))
+
+        # 3. Merge by date (every row carries every column, as PostgREST bulk upserts require)
+        rows: Dict[str, Dict[str, Any]] = {}
+        empty = {"nominal_yield": None, "breakeven_inflation": None, "real_yield": None, "domestic_premium": None}
+        for i, d in enumerate(real["days"]):
+            rows[str(d)] = dict(empty, log_date=str(d), nominal_yield=float(real["nominal_yield"][i]),
+                                breakeven_inflation=float(real["breakeven_inflation"][i]),
+                                real_yield=float(real["real_yield"][i]))
+        for d, value in zip(premium["days"], premium["premium"]):
+            if np.datetime64(start) <= d <= np.datetime64(end):
+                rows.setdefault(str(d), dict(empty, log_date=str(d)))["domestic_premium"] = float(value)
+        return [rows[d] for d in sorted(rows)]
+
+    def backfill(self, job: str, days: int, deadline: Optional[float] = None,
+                 workers: int = DEFAULT_WORKERS, force: bool = False) -> Dict[str, Any]:
+        """
+        Resumable backfill of the last `days` days; rerun until `remaining` is 0.
+        `deadline` is a time.monotonic() instant, after which no chunk starts.
+        """
+        backfill_job = make_job(job, self)
+        start = datetime.now(timezone.utc).date() - timedelta(days=days)
+        ttl = int(max(0.0, deadline - time.monotonic()) + 120) if deadline is not None else 3600
+        return self.leases.run(f"backfill:{job}",
+                               lambda: run_backfill(self.supabase, backfill_job, start, deadline=deadline,
+                                                    workers=workers, force=force),
+                               ttl=ttl, empty=lambda: {"job": job, "completed": 0, "remaining": None, "errors": []})
+
+    def _real_yield_series(self, days: int) -> DailySeries:
+        nominal = self._daily_series("^TNX", days)
+        breakeven = DailySeries.from_mapping("T10YIE", get_calendar(self.registry.get("T10YIE").calendar),
+                                             self.fetch_fred_history("T10YIE", days=days))
+        if not len(nominal):
+            return nominal
+        real = real_yield_series(nominal, breakeven, nominal.days[0], nominal.days[-1])
+        return DailySeries("REAL_YIELD", nominal.calendar, real["days"], real["real_yield"])
+
+    def sync_correlations(self):
+        """Advance the rolling gold/factor correlations by the sessions closed since the last run."""
+        return self.leases.run("sync_correlations", self._sync_correlations, ttl=300,
+                               empty=lambda: {"updated": 0, "errors": []})
+
+    def _sync_correlations(self):
+        report = {"updated": 0, "errors": []}
+        try:
+            state = load_state(self.supabase, CORRELATION_STATE_KEY)
+            book = CorrelationBook.from_state(state)
+            calendar = get_calendar(self.registry.get(TARGET).calendar)
+            now = datetime.now(timezone.utc)
+            if not book.due(calendar, now.timestamp()):
+                return report
+            days = book.fetch_days(np.datetime64(now.date(), "D"))
+            gold = self._daily_series(TARGET, days)
+            factors = {label: self._real_yield_series(days) if symbol == "REAL_YIELD" else self._daily_series(symbol, days)
+                       for label, (symbol, _) in FACTORS.items()}
+            # The running sums must continue exactly where the stored ones stopped: if another
+            # writer moved the watermark during the fetches above, feeding would repeat or skip sessions
+            if load_state(self.supabase, CORRELATION_STATE_KEY).get("through") != state.get("through"):
+                report["errors"].append("Correlation state moved by another writer, sessions not fed")
+                return report
+            fed = book.feed(gold, factors, now.timestamp())
+            if not fed:
+                return report
+            if not self.leases.still_held("sync_correlations", ttl=300):
+                report["errors"].append("Lease lost for sync_correlations, writes skipped")
+                return report
+            save_state(self.supabase, CORRELATION_STATE_KEY, {**book.to_state(), "results": book.results()})
+            rows = book.indicator_rows()
+            if rows:
+                upsert_changed(self.supabase, "macro_indicators", rows, on_conflict="indicator_name")
+            report["updated"] = fed
+        except Exception as e:
+            report["errors"].append(f"Correlation Sync Failed: {str(e)}")
+        return report
+
+    def sync_volatility(self) -> Dict[str, Any]:
+        """
+        Realized volatility of GC=F (close-to-close, Parkinson, Garman-Klass) from the
+        session's 1m bars and the last 20 completed sessions, against ^GVZ implied vol.
+        The running session only feeds the intraday figures: its partial range would
+        drag the 20D estimators down all day.
+        Reuses the quote fetches; Yahoo daily bars are only requested while
+        volatility_history holds fewer than 20 sessions.
+        """
+        report = {"updated": 0, "errors": []}
+        try:
+            if self.fetch_market_data(VOL_TARGET) is None or VOL_TARGET not in self.bars:
+                return report
+            calendar = get_calendar(self.registry.get(VOL_TARGET).calendar)
+            day, session = session_bars(self.bars[VOL_TARGET], calendar)
+            ohlc = session_ohlc(session)
+            if ohlc is None:
+                return report
+            intraday = intraday_realized(session, SESSION_SECONDS)
+
+            history = self.supabase.table("volatility_history").select("log_date,open,high,low,close") \
+                .eq("ticker", VOL_TARGET).gte("log_date", str(day - 45)).lt("log_date", str(day)).order("log_date", desc=True).limit(VOL_WINDOW + 1).execute().data
+            # 20 close-to-close returns need 21 closes; fewer in the last 45 days: cold start or a gap in the syncs
+            if len(history) < VOL_WINDOW + 1:
+                history = self._backfill_volatility_history(calendar, day) or history
+            history = sorted(history, key=lambda r: r["log_date"])
+            daily = daily_realized(*(np.array([r[k] for r in history], dtype=np.float64)
+                                     for k in ("open", "high", "low", "close")))
+
+            gvz = self.fetch_market_data(VOL_IMPLIED)
+            row = history_row(VOL_TARGET, day, ohlc, intraday, daily, gvz.last_price if gvz else None)
+            self.supabase.table("volatility_history").upsert(row, on_conflict="ticker,log_date").execute()
+
+            indicators = [
+                ("RV_Intraday", row["rv_garman_klass_intraday"], "Garman-Klass (GC=F 1m bars, session)"),
+                ("RV_CloseToClose_20D", row["rv_close_20d"], "Close-to-Close (GC=F, 20 completed sessions)"),
+                ("RV_Parkinson_20D", row["rv_parkinson_20d"], "Parkinson (GC=F, 20 completed sessions)"),
+                ("RV_GarmanKlass_20D", row["rv_garman_klass_20d"], "Garman-Klass (GC=F, 20 completed sessions)"),
+                ("GVZ_RV_Spread", row["gvz_spread"], "^GVZ minus 20D Garman-Klass"),
+            ]
+            rows = [{"indicator_name": name, "value": value, "unit": "%", "source": source}
+                    for name, value, source in indicators if value is not None]
+            if rows:
+                upsert_changed(self.supabase, "macro_indicators", rows, on_conflict="indicator_name")
+            report["updated"] = len(rows)
+        except Exception as e:
+            report["errors"].append(f"Volatility Sync Failed: {str(e)}")
+        return report
+
+    def _backfill_volatility_history(self, calendar, day: np.datetime64) -> List[Dict[str, Any]]:
+        """Seed volatility_history with daily OHLC before `day` (cold start or after a gap)."""
+        bars = fetch_yahoo_daily_bars(VOL_TARGET, days=VOL_WINDOW * 2 + 10)
+        if bars is None:
+            return []
+        days = calendar.trading_days(bars.timestamps)
+        mask = (days < day) & ~np.isnan(bars.open) & ~np.isnan(bars.high) & ~np.isnan(bars.low) & ~np.isnan(bars.close)
+        rows = [{"ticker": VOL_TARGET, "log_date": str(d), "open": float(o), "high": float(h), "low": float(l), "close": float(c)}
+                for d, o, h, l, c in zip(days[mask], bars.open[mask], bars.high[mask], bars.low[mask], bars.close[mask])]
+        rows = list({r["log_date"]: r for r in rows}.values())[-(VOL_WINDOW + 1):]
+        bulk_upsert(self.supabase, "volatility_history", rows, on_conflict="ticker,log_date")
+        return rows
+
+    def sync_alerts(self):
+        """Re-evaluate the alert rules whose inputs changed, then push queued events to their webhooks."""
+        return self.leases.run("sync_alerts", self._sync_alerts, ttl=120,
+                               empty=lambda: {"queued": 0, "delivery": {}, "errors": []})
+
+    def _sync_alerts(self):
+        report = {"queued": 0, "delivery": {}, "errors": []}
+        try:
+            report.update(run_alerts(self.supabase, still_held=lambda: self.leases.still_held("sync_alerts", ttl=120)))
+        except Exception as e:
+            report["errors"].append(f"Alert Evaluation Failed: {str(e)}")
+        if not self.leases.still_held("sync_alerts", ttl=120):
+            # The new holder delivers the outbox; sending it here too would duplicate webhooks
+            report["errors"].append("Lease lost for sync_alerts, delivery skipped")
+            return report
+        try:
+            # Also retries events left over from earlier runs
+            report["delivery"] = deliver_pending(self.supabase)
+        except Exception as e:
+            report["errors"].append(f"Alert Delivery Failed: {str(e)}")
+        return report
+
+    def sync_rollups(self):
+        """Compact market_history into the OHLC tiers and apply retention."""
+        if self.write_buffer is not None:
+            self.write_buffer.flush()
+        return self.leases.run("sync_rollups", lambda: run_rollups(self.supabase), ttl=600,
+                               empty=lambda: {"rolled_up": 0, "pruned": 0, "errors": []})
+
     def sync_institutional(self):
+        return self.leases.run("sync_institutional", self._sync_institutional, ttl=300)
+
+    def _sync_institutional(self):
         report = {"updated": [], "errors": []}
         try:
             # Fetch latest Gold Price for correlation to make data dynamic
@@ -339,12 +599,12 @@ class GoldDataSyncer:
             if gld_data:
                 # Using Market Cap or Price change as a proxy if direct tonnage isn't in simple API
                 # For now, let's store the price and volume which correlates to liquidity
-                self.supabase.table("institutional_stats").upsert({
+                upsert_changed(self.supabase, "institutional_stats", {
                     "category": "GLD_ETF",
                     "label": "GLD ETF Price",
-                    "value": gld_data['last_price'],
-                    "change_value": gld_data['change_percent']
-                }, on_conflict="category,label").execute()
+                    "value": gld_data.last_price,
+                    "change_value": gld_data.change_percent
+                }, on_conflict="category,label")
 
             # 2. CFTC Managed Money (Need real ticker or source)
             # Since CFTC isn't directly in Yahoo, we keep the dynamic logic but mark it as 'Calculated'
@@ -356,11 +616,11 @@ class GoldDataSyncer:
             # China Gold Reserves (FRED: WORLDGOLDRESERVES_CHN)
             cn_gold = self.fetch_fred_metric("WORLDGOLDRESERVES_CHN") or 2264.0
             
-            self.supabase.table("institutional_stats").upsert([
+            upsert_changed(self.supabase, "institutional_stats", [
                 { "category": "CentralBank", "label": "PBoC Gold Reserve", "value": cn_gold, "change_value": 0.0 },
                 { "category": "CentralBank", "label": "USA (Fed) Reserve", "value": 8133.5, "change_value": 0.0 },
                 { "category": "CFTC", "label": "Managed Money Net Long", "value": int(managed_money), "change_value": int(managed_money_change) }
-            ], on_conflict="category,label").execute()
+            ], on_conflict="category,label")
 
             # 4. Geopolitical Risk (GPR) - Real Proxy: Volatility Index (VIX)
             vix_data = self.fetch_market_data("^VIX")
@@ -368,23 +628,23 @@ class GoldDataSyncer:
             
             if vix_data and gvz_data:
                 # Combine Equity Vol (VIX) and Gold Vol (GVZ) for a "Fear Index"
-                gpr_composite = (vix_data['last_price'] * 0.4) + (gvz_data['last_price'] * 0.6)
-                self.supabase.table("macro_indicators").upsert({
+                gpr_composite = (vix_data.last_price * 0.4) + (gvz_data.last_price * 0.6)
+                upsert_changed(self.supabase, "macro_indicators", {
                     "indicator_name": "GPR_Index",
                     "value": round(gpr_composite, 2),
                     "source": "Yahoo (VIX/GVZ Composite)"
-                }, on_conflict="indicator_name").execute()
+                }, on_conflict="indicator_name")
 
             # 5. Market Sentiment (0-100 Score)
             # 100 = Panic, 0 = Complacency
             if vix_data:
-                sentiment_score = min(max((vix_data['last_price'] - 10) * 2, 0), 100)
-                self.supabase.table("macro_indicators").upsert({
+                sentiment_score = min(max((vix_data.last_price - 10) * 2, 0), 100)
+                upsert_changed(self.supabase, "macro_indicators", {
                     "indicator_name": "Market_Sentiment",
                     "value": round(sentiment_score, 1),
                     "unit": "%",
                     "source": "Calculated (VIX)"
-                }, on_conflict="indicator_name").execute()
+                }, on_conflict="indicator_name")
 
 
             report["updated"].append("institutional_stats")
@@ -393,42 +653,89 @@ class GoldDataSyncer:
         
         return report
     def sync_news(self):
-        """Fetches latest Gold news from Yahoo RSS and stores in DB."""
+        """
+        Incrementally ingest Gold news from Yahoo RSS.
+        Sends the last ETag/Last-Modified (a 304 ends the run with zero writes),
+        stream-parses the feed and stops at the first already-seen item.
+        """
+        return self.leases.run("sync_news", self._sync_news, ttl=120,
+                               empty=lambda: {"updated": 0, "errors": [], "not_modified": False})
+
+    def _sync_news(self):
         import xml.etree.ElementTree as ET
-        report = {"updated": 0, "errors": []}
+        report = {"updated": 0, "errors": [], "not_modified": False}
         url = "https://finance.yahoo.com/rss/headline?s=XAUUSD=X"
+        state = load_state(self.supabase, NEWS_STATE_KEY)
+        seen = SeenIndex(NEWS_SEEN_LIMIT, state.get("seen"))
         try:
             headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, timeout=10)
+            if state.get("etag"):
+                headers['If-None-Match'] = state["etag"]
+            if state.get("last_modified"):
+                headers['If-Modified-Since'] = state["last_modified"]
+            response = requests.get(url, headers=headers, timeout=10, stream=True)
+            if response.status_code == 304:
+                response.close()
+                report["not_modified"] = True
+                return report
             response.raise_for_status()
             
-            tree = ET.fromstring(response.content)
-            items = tree.findall('.//item')
-            
+            # Items are newest first, so the first known item means the rest are stored already
+            parser = ET.XMLPullParser(events=("end",))
             to_upsert = []
-            for item in items:
-                title = item.find('title').text
-                link = item.find('link').text
-                pub_date_raw = item.find('pubDate').text
-                # Convert RSS date to ISO. Standard RSS: Mon, 09 Feb 2026 01:22:05 +0000
-                try:
-                    dt = datetime.strptime(pub_date_raw, "%a, %d %b %Y %H:%M:%S %z")
-                    pub_date = dt.isoformat()
-                except:
-                    pub_date = datetime.now().isoformat()
-
-                to_upsert.append({
-                    "title": title,
-                    "url": link,
-                    "published_at": pub_date,
-                    "source": "Yahoo Finance",
-                    "msg_type": "DATA" if "data" in title.lower() or "report" in title.lower() else "FLASH"
-                })
+            done = False
+            try:
+                for chunk in response.iter_content(chunk_size=8192):
+                    parser.feed(chunk)
+                    for _, elem in parser.read_events():
+                        if elem.tag != 'item':
+                            continue
+                        row = self._parse_news_item(elem)
+                        elem.clear()
+                        key = item_hash(row["title"], row["published_at"])
+                        if key in seen:
+                            done = True
+                            break
+                        to_upsert.append((key, row))
+                    if done:
+                        break
+            finally:
+                response.close()
 
             if to_upsert:
-                self.supabase.table("news_stream").upsert(to_upsert, on_conflict="title,published_at").execute()
+                self.supabase.table("news_stream").upsert([row for _, row in to_upsert], on_conflict="title,published_at").execute()
                 report["updated"] = len(to_upsert)
+                # Oldest first so the newest items are the last to be evicted
+                for key, _ in reversed(to_upsert):
+                    seen.add(key)
+
+            validators = {
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+            }
+            if to_upsert or validators != {k: state.get(k) for k in validators}:
+                save_state(self.supabase, NEWS_STATE_KEY, {**validators, "seen": seen.to_list()})
         except Exception as e:
             report["errors"].append(f"News Sync Error: {str(e)}")
         
         return report
+
+    @staticmethod
+    def _parse_news_item(item) -> Dict[str, Any]:
+        title = item.findtext('title') or ""
+        link = item.findtext('link')
+        pub_date_raw = item.findtext('pubDate') or ""
+        # Convert RSS date to ISO. Standard RSS: Mon, 09 Feb 2026 01:22:05 +0000
+        try:
+            dt = datetime.strptime(pub_date_raw, "%a, %d %b %Y %H:%M:%S %z")
+            pub_date = dt.isoformat()
+        except:
+            pub_date = datetime.now().isoformat()
+
+        return {
+            "title": title,
+            "url": link,
+            "published_at": pub_date,
+            "source": "Yahoo Finance",
+            "msg_type": "DATA" if "data" in title.lower() or "report" in title.lower() else "FLASH"
+        }
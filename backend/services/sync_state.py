@@ -0,0 +1,66 @@
+"""
+Small key/value store for sync bookkeeping (HTTP validators, seen-item indexes,
+cached upstream results). Backed by the `sync_state` table so state survives
+across serverless invocations. Every load reads the row: the scheduler, its
+shards and cron invocations all write it, so an in-process copy would go stale.
+"""
+
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterable, List
+
+def load_state(supabase, key: str) -> Dict[str, Any]:
+    """Return the stored value for `key` ({} if missing or unreadable)."""
+    value: Dict[str, Any] = {}
+    if supabase is not None:
+        try:
+            res = supabase.table("sync_state").select("value").eq("key", key).execute()
+            if res.data:
+                value = res.data[0].get('value') or {}
+        except Exception as e:
+            print(f"Sync state read error ({key}): {e}")
+    return value
+
+
+def save_state(supabase, key: str, value: Dict[str, Any]) -> None:
+    if supabase is None:
+        return
+    try:
+        supabase.table("sync_state").upsert({
+            "key": key,
+            "value": value,
+            "updated_at": datetime.now().isoformat()
+        }, on_conflict="key").execute()
+    except Exception as e:
+        print(f"Sync state write error ({key}): {e}")
+
+
+def item_hash(*parts: Any) -> str:
+    """Short stable fingerprint of a tuple of values."""
+    return hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+
+class SeenIndex:
+    """Bounded insertion-ordered set of item hashes (oldest entries are evicted first)."""
+
+    def __init__(self, maxlen: int = 500, hashes: Optional[Iterable[str]] = None):
+        self.maxlen = maxlen
+        self._items: "OrderedDict[str, None]" = OrderedDict()
+        for h in hashes or []:
+            self.add(h)
+
+    def __contains__(self, h: str) -> bool:
+        return h in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, h: str) -> None:
+        self._items[h] = None
+        self._items.move_to_end(h)
+        while len(self._items) > self.maxlen:
+            self._items.popitem(last=False)
+
+    def to_list(self) -> List[str]:
+        return list(self._items)
@@ -0,0 +1,92 @@
+"""
+Ticker registry: the synced universe and its per-symbol metadata.
+
+Loaded from backend/config/tickers.json (override with TICKER_REGISTRY_PATH).
+Each entry carries its source (yahoo / fred), refresh tier, whether it is
+written to market_data_cache, unit conversions such as the 518880.SS
+share -> gram factor, and the exchange calendar its daily bars follow
+(see alignment.CALENDARS).
+"""
+
+import json
+import os
+import zlib
+from typing import Dict, Optional, List, Iterable
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "tickers.json")
+
+
+class TickerSpec:
+    __slots__ = ("symbol", "name", "source", "tier", "cache", "unit", "unit_factor", "calendar")
+
+    def __init__(self, symbol: str, name: str = "", source: str = "yahoo", tier: str = "hot",
+                 cache: bool = False, unit: Optional[str] = None, unit_factor: float = 1.0, calendar: str = "UTC"):
+        self.symbol = symbol
+        self.name = name
+        self.source = source
+        self.tier = tier
+        self.cache = cache
+        self.unit = unit
+        self.unit_factor = unit_factor
+        self.calendar = calendar
+
+    def convert(self, value: Optional[float]) -> Optional[float]:
+        """Apply the unit conversion (e.g. 518880.SS share price x100 -> CNY/gram)."""
+        return value * self.unit_factor if value is not None else None
+
+    def __repr__(self) -> str:
+        return f"TickerSpec({self.symbol} {self.source}/{self.tier})"
+
+
+def shard_of(symbol: str, shards: int) -> int:
+    """Deterministic shard index (stable across processes, unlike hash())."""
+    return zlib.crc32(symbol.encode("utf-8")) % shards
+
+
+class TickerRegistry:
+    def __init__(self, specs: Iterable[TickerSpec], tiers: Optional[Dict[str, int]] = None):
+        self._specs: Dict[str, TickerSpec] = {s.symbol: s for s in specs}
+        self.tiers = tiers or {}
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "TickerRegistry":
+        path = path or os.getenv("TICKER_REGISTRY_PATH") or DEFAULT_REGISTRY_PATH
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return cls((TickerSpec(**entry) for entry in config.get("tickers", [])), config.get("tiers"))
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._specs
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def get(self, symbol: str) -> TickerSpec:
+        # Unknown symbols behave like plain Yahoo tickers without conversion
+        return self._specs.get(symbol) or TickerSpec(symbol)
+
+    def convert(self, symbol: str, value: Optional[float]) -> Optional[float]:
+        return self.get(symbol).convert(value)
+
+    def select(self, source: Optional[str] = None, tiers: Optional[Iterable[str]] = None,
+               cache: Optional[bool] = None, shard: int = 0, shards: int = 1) -> List[TickerSpec]:
+        """Filter the universe; with shards > 1 only this shard's deterministic slice is returned."""
+        tiers = set(tiers) if tiers else None
+        return [
+            s for s in self._specs.values()
+            if (source is None or s.source == source)
+            and (tiers is None or s.tier in tiers)
+            and (cache is None or s.cache == cache)
+            and (shards <= 1 or shard_of(s.symbol, shards) == shard)
+        ]
+
+
+_registry: Optional[TickerRegistry] = None
+
+
+def get_registry() -> TickerRegistry:
+    """Process-wide registry, loaded on first use."""
+    global _registry
+    if _registry is None:
+        _registry = TickerRegistry.load()
+    return _registry
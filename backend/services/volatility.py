@@ -0,0 +1,125 @@
+"""
+Realized volatility of gold from bars we already download.
+
+Three estimators, each reduced to a per-bar variance array so they vectorize over
+any bar size:
+- close-to-close: squared log returns
+- Parkinson: ln(H/L)^2 / (4 ln 2), uses the bar range
+- Garman-Klass: 0.5 ln(H/L)^2 - (2 ln 2 - 1) ln(C/O)^2, range plus open/close
+
+Intraday figures come from the 1m bars of the current session (the same chart
+fetch_market_data parses for the quote). Daily figures average the OHLC of the
+completed sessions kept in volatility_history, so after the first WINDOW sessions no extra
+upstream request is needed. Everything is annualized in percent, the unit of
+^GVZ, so implied minus realized is a plain difference.
+"""
+
+import math
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .alignment import ExchangeCalendar
+from .bars import BarSeries
+
+TARGET = "GC=F"
+IMPLIED = "^GVZ"
+WINDOW = 20
+# CME Globex trades gold 23 hours a day (17:00-18:00 New York break)
+SESSION_SECONDS = 23 * 3600
+SESSIONS_PER_YEAR = 252
+ESTIMATORS = ("close", "parkinson", "garman_klass")
+
+_LN2 = math.log(2)
+
+
+def close_to_close_var(close: np.ndarray) -> np.ndarray:
+    close = close[~np.isnan(close)]
+    if len(close) < 2:
+        return np.array([])
+    return np.diff(np.log(close)) ** 2
+
+
+def parkinson_var(high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    hl = np.log(high / low)
+    return (hl[~np.isnan(hl)] ** 2) / (4 * _LN2)
+
+
+def garman_klass_var(open: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    hl, co = np.log(high / low), np.log(close / open)
+    mask = ~(np.isnan(hl) | np.isnan(co))
+    return 0.5 * hl[mask] ** 2 - (2 * _LN2 - 1) * co[mask] ** 2
+
+
+def _annualized(per_bar_var: np.ndarray, bars_per_session: float) -> Optional[float]:
+    if not len(per_bar_var):
+        return None
+    return round(math.sqrt(max(float(per_bar_var.mean()), 0.0) * bars_per_session * SESSIONS_PER_YEAR) * 100, 4)
+
+
+def session_bars(bars: BarSeries, calendar: ExchangeCalendar) -> Tuple[Optional[np.datetime64], BarSeries]:
+    """The bars of the latest trading session in `bars` (bucketed on the exchange calendar)."""
+    if not len(bars):
+        return None, bars
+    days = calendar.trading_days(bars.timestamps)
+    mask = days == days[-1]
+    return days[-1], BarSeries(bars.ticker, bars.timestamps[mask], bars.open[mask], bars.high[mask],
+                               bars.low[mask], bars.close[mask], bars.volume[mask], bars.meta)
+
+
+def intraday_realized(bars: BarSeries, session_seconds: float) -> Dict[str, Optional[float]]:
+    """Annualized vol per estimator from one session's intraday bars (partial sessions are scaled by bar count)."""
+    if len(bars) < 2:
+        return {name: None for name in ESTIMATORS}
+    bar_seconds = float(np.median(np.diff(bars.timestamps)))
+    per_session = session_seconds / bar_seconds if bar_seconds > 0 else 0
+    return {
+        "close": _annualized(close_to_close_var(bars.close), per_session),
+        "parkinson": _annualized(parkinson_var(bars.high, bars.low), per_session),
+        "garman_klass": _annualized(garman_klass_var(bars.open, bars.high, bars.low, bars.close), per_session),
+    }
+
+
+def daily_realized(open: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                   window: int = WINDOW) -> Dict[str, Optional[float]]:
+    """Annualized vol per estimator over the last `window` daily bars (None with fewer)."""
+    open, high, low, close = (np.asarray(a, dtype=np.float64)[-(window + 1):] for a in (open, high, low, close))
+    returns = np.diff(np.log(close[~np.isnan(close)]))[-window:]
+    out: Dict[str, Optional[float]] = {"close": None, "parkinson": None, "garman_klass": None}
+    if len(returns) >= window:
+        # Sample variance of daily log returns (the usual historical-volatility definition)
+        out["close"] = round(math.sqrt(float(returns.var(ddof=1)) * SESSIONS_PER_YEAR) * 100, 4)
+    park = parkinson_var(high[-window:], low[-window:])
+    if len(park) >= window:
+        out["parkinson"] = _annualized(park, 1)
+    gk = garman_klass_var(open[-window:], high[-window:], low[-window:], close[-window:])
+    if len(gk) >= window:
+        out["garman_klass"] = _annualized(gk, 1)
+    return out
+
+
+def session_ohlc(bars: BarSeries) -> Optional[Dict[str, float]]:
+    closes = bars.valid_closes()
+    if not len(closes):
+        return None
+    return {"open": bars.first_open() or float(closes[0]), "high": bars.session_high(), "low": bars.session_low(),
+            "close": float(closes[-1])}
+
+
+def history_row(ticker: str, day: np.datetime64, ohlc: Dict[str, float], intraday: Dict[str, Optional[float]],
+                daily: Dict[str, Optional[float]], implied: Optional[float]) -> Dict[str, Any]:
+    """One volatility_history row; gvz_spread is implied minus the 20-session Garman-Klass vol."""
+    realized = daily["garman_klass"]
+    return {
+        "ticker": ticker,
+        "log_date": str(day),
+        **ohlc,
+        "rv_close_intraday": intraday["close"],
+        "rv_parkinson_intraday": intraday["parkinson"],
+        "rv_garman_klass_intraday": intraday["garman_klass"],
+        "rv_close_20d": daily["close"],
+        "rv_parkinson_20d": daily["parkinson"],
+        "rv_garman_klass_20d": realized,
+        "gvz": implied,
+        "gvz_spread": round(implied - realized, 4) if implied is not None and realized is not None else None,
+    }
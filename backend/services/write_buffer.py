@@ -0,0 +1,130 @@
+"""
+Write-behind buffer for high-frequency price writes.
+
+Quote updates are coalesced per market_data_cache key (only the latest value per
+ticker is written) and market_history appends are batched. The buffer flushes
+when it reaches `max_rows` or every `flush_interval` seconds, whichever comes
+first, so DB round trips scale with the flush interval instead of the tick rate.
+Producers block (backpressure) while more than `max_pending` rows are waiting,
+and close() performs a final flush (also registered with atexit).
+"""
+
+import atexit
+import threading
+import time
+from typing import Dict, Any, List
+
+from .deltas import upsert_changed
+from .storage import bulk_insert
+
+HISTORY_CHUNK = 500
+
+
+class WriteBehindBuffer:
+    def __init__(self, supabase_client, flush_interval: float = 5.0, max_rows: int = 500,
+                 max_pending: int = 10000, block_timeout: float = 30.0):
+        self.supabase = supabase_client
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+
+        self._quotes: Dict[str, Dict[str, Any]] = {}
+        self._history: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()  # One flush in flight at a time
+        self._wake = threading.Event()
+        self._closed = False
+        self.stats = {"flushes": 0, "quotes_written": 0, "history_written": 0, "coalesced": 0, "errors": 0}
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _pending(self) -> int:
+        return len(self._quotes) + len(self._history)
+
+    def _admit(self) -> None:
+        """Backpressure: wait for the flusher while the buffer is over capacity (lock held)."""
+        deadline = time.time() + self.block_timeout
+        while self._pending() >= self.max_pending and not self._closed:
+            self._wake.set()
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise TimeoutError("Write-behind buffer is full and not draining")
+            self._drained.wait(remaining)
+
+    def put_quote(self, row: Dict[str, Any]) -> bool:
+        """
+        Queue a market_data_cache row; a newer row for the same ticker replaces the pending one.
+        Returns False when it is identical to the pending row (nothing new to record).
+        """
+        with self._lock:
+            pending = self._quotes.get(row["ticker"])
+            if pending == row:
+                return False
+            self._admit()
+            if pending is not None:
+                self.stats["coalesced"] += 1
+            self._quotes[row["ticker"]] = row
+            if self._pending() >= self.max_rows:
+                self._wake.set()
+            return True
+
+    def append_history(self, ticker: str, price: float, timestamp: str) -> None:
+        with self._lock:
+            self._admit()
+            self._history.append({"ticker": ticker, "price": price, "timestamp": timestamp})
+            if self._pending() >= self.max_rows:
+                self._wake.set()
+
+    def flush(self) -> Dict[str, int]:
+        """Write everything pending now. Failed batches are put back for the next flush."""
+        with self._flush_lock:
+            with self._lock:
+                quotes, self._quotes = self._quotes, {}
+                history, self._history = self._history, []
+            written = {"quotes": 0, "history": 0}
+            try:
+                if quotes:
+                    upsert_changed(self.supabase, "market_data_cache", list(quotes.values()), on_conflict="ticker")
+                    written["quotes"] = len(quotes)
+                    quotes = {}
+                for i in range(0, len(history), HISTORY_CHUNK):
+                    bulk_insert(self.supabase, "market_history", history[i:i + HISTORY_CHUNK])
+                    written["history"] += len(history[i:i + HISTORY_CHUNK])
+                history = []
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"Write-behind flush error: {e}")
+                with self._lock:
+                    # Keep newer quotes that arrived meanwhile; unwritten history goes first
+                    self._quotes = {**quotes, **self._quotes}
+                    self._history = history[written["history"]:] + self._history
+            finally:
+                with self._lock:
+                    self._drained.notify_all()
+            self.stats["flushes"] += 1
+            self.stats["quotes_written"] += written["quotes"]
+            self.stats["history_written"] += written["history"]
+            return written
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._pending():
+                self.flush()
+
+    def close(self) -> None:
+        """Stop the flusher and write whatever is left."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=self.flush_interval + 5)
+        if self._pending():
+            self.flush()
+        with self._lock:
+            self._drained.notify_all()
@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import time
+import random
+
+# Ensure backend can be imported
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.services import fastjson
+
+def make_chart_payload(bars: int = 1440) -> bytes:
+    """Synthetic Yahoo v8 1m chart body (one trading day of GC=F bars, with gaps)."""
+    ts0 = 1760000000
+    price = 2350.0
+    quote = {"open": [], "high": [], "low": [], "close": [], "volume": []}
+    for _ in range(bars):
+        if random.random() < 0.03:
+            for k in quote:
+                quote[k].append(None)
+            continue
+        o = price
+        price += random.uniform(-1.5, 1.5)
+        quote["open"].append(round(o, 2))
+        quote["high"].append(round(max(o, price) + random.random(), 2))
+        quote["low"].append(round(min(o, price) - random.random(), 2))
+        quote["close"].append(round(price, 2))
+        quote["volume"].append(random.randint(0, 5000))
+    body = {"chart": {"result": [{
+        "meta": {"symbol": "GC=F", "currency": "USD", "regularMarketPrice": round(price, 2)},
+        "timestamp": [ts0 + 60 * i for i in range(bars)],
+        "indicators": {"quote": [quote]}
+    }], "error": None}}
+    return json.dumps(body).encode()
+
+def make_full_state() -> dict:
+    """Synthetic /api/v1/full-state response shaped like latest_dashboard_state."""
+    tickers = [{"id": i, "ticker": f"T{i}", "last_price": 100 + i * 0.5, "open_price": 100.0,
+                "high_price": 101.0, "low_price": 99.0, "change_percent": 0.12,
+                "cached_at": "2026-10-18T08:00:00+00:00", "metadata": None} for i in range(200)]
+    macro = [{"id": i, "indicator_name": f"IND_{i}", "value": i * 1.1, "unit": "%", "is_stale": False,
+              "last_updated": "2026-10-18T08:00:00+00:00", "source": "FRED"} for i in range(50)]
+    news = [{"id": i, "msg_type": "FLASH", "title": f"Gold headline number {i} " * 3, "content": None,
+             "source": "Yahoo Finance", "url": f"https://finance.yahoo.com/news/{i}",
+             "published_at": "2026-10-18T08:00:00+00:00"} for i in range(15)]
+    return {"tickers": tickers, "macro": macro, "institutional": macro[:10],
+            "today_strategy": {"log_date": "2026-10-18", "pivot_points": {"1d": {"P": 2350.1}}},
+            "news": news, "analysis_sop": {"alerts": {"premium_warning": False}}}
+
+def bench(label: str, fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    per_call = (time.perf_counter() - start) / n * 1e6
+    print(f"  {label:<32} {per_call:>10.1f} us/op")
+    return per_call
+
+def main():
+    print(f"--- JSON Benchmark (fast backend: {fastjson.BACKEND}) ---")
+    chart = make_chart_payload()
+    state = make_full_state()
+    print(f"Chart payload: {len(chart) / 1024:.1f} KiB | Full-state: {len(json.dumps(state)) / 1024:.1f} KiB\n")
+
+    print("Decode 1m chart payload:")
+    base = bench("stdlib json.loads", lambda: json.loads(chart), 200)
+    fast = bench("fastjson.loads", lambda: fastjson.loads(chart), 200)
+    print(f"  speedup: {base / fast:.1f}x\n")
+
+    print("Encode full-state response:")
+    base = bench("stdlib json.dumps", lambda: json.dumps(state).encode(), 500)
+    fast = bench("fastjson.dumps", lambda: fastjson.dumps(state), 500)
+    print(f"  speedup: {base / fast:.1f}x\n")
+
+    try:
+        from fastapi.encoders import jsonable_encoder
+        print("FastAPI default path vs direct FastJSONResponse:")
+        base = bench("jsonable_encoder + json.dumps", lambda: json.dumps(jsonable_encoder(state)).encode(), 200)
+        fast = bench("fastjson.dumps", lambda: fastjson.dumps(state), 200)
+        print(f"  speedup: {base / fast:.1f}x")
+    except ImportError:
+        print("(fastapi not installed, skipping jsonable_encoder comparison)")
+
+if __name__ == "__main__":
+    main()
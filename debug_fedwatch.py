@@ -7,10 +7,12 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from backend.services.calculator import fetch_yahoo_finance_raw, calc_fed_watch
+    from backend.services.cassette import install_from_env
 except ImportError as e:
     print(f"Import Error: {e}")
     sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
     from services.calculator import fetch_yahoo_finance_raw, calc_fed_watch
+    from services.cassette import install_from_env
 
 load_dotenv(dotenv_path=".env.local")
 
@@ -74,4 +76,10 @@ def main():
     print("\n=== Debug Complete ===")
 
 if __name__ == "__main__":
-    main()
+    # HTTP_CASSETTE=fedwatch.json HTTP_CASSETTE_MODE=record|replay to capture or re-run offline
+    cassette = install_from_env()
+    try:
+        main()
+    finally:
+        if cassette:
+            cassette.uninstall()
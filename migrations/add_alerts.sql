@@ -0,0 +1,33 @@
+-- Migration: Alert engine (user rules + delivery outbox)
+-- Execute this in your Supabase SQL Editor
+--
+-- Built-in rules live in backend/config/alerts.json; alert_rules adds user-defined ones.
+-- Rules are disabled instead of deleted so MAX(updated_at) tells the engine when to reload.
+-- alert_events is the outbox drained by backend/services/alerts.py:deliver_pending().
+
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    conditions JSONB NOT NULL, -- [{"metric": "RSI_14", "op": ">", "value": 75, "clear": 70}], all must hold
+    for_seconds INT NOT NULL DEFAULT 0, -- Debounce: conditions must hold this long before firing
+    severity TEXT DEFAULT 'warning',
+    webhook TEXT, -- Overrides ALERT_WEBHOOK_URL
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_alert_rules_updated ON alert_rules(updated_at DESC);
+
+CREATE TABLE IF NOT EXISTS alert_events (
+    id BIGSERIAL PRIMARY KEY,
+    rule_id TEXT NOT NULL,
+    status TEXT NOT NULL, -- fired, resolved
+    sink TEXT, -- Webhook URL (NULL: no sink configured, dropped)
+    payload JSONB NOT NULL,
+    delivery TEXT NOT NULL DEFAULT 'pending', -- pending, delivered, dead, dropped
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ DEFAULT NOW(),
+    last_error TEXT,
+    delivered_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_alert_events_due ON alert_events(next_attempt_at) WHERE delivery = 'pending';
@@ -0,0 +1,18 @@
+-- Migration: Checkpoints for resumable historical backfills
+-- Execute this in your Supabase SQL Editor
+--
+-- One row per (job, chunk) written by backend/services/backfill.py. Chunks marked
+-- 'done' are skipped on rerun; 'partial' chunks (reaching today) always rerun;
+-- 'failed' chunks are retried until attempts runs out.
+
+CREATE TABLE IF NOT EXISTS backfill_chunks (
+    job TEXT NOT NULL, -- e.g. macro_history, market_history:1d:GC=F
+    chunk_start DATE NOT NULL,
+    chunk_end DATE NOT NULL, -- Exclusive
+    status TEXT NOT NULL, -- done | partial | failed
+    rows_written INT NOT NULL DEFAULT 0,
+    attempts INT NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (job, chunk_start)
+);
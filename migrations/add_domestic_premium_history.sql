@@ -0,0 +1,7 @@
+-- Migration: Add domestic premium history to macro_history
+-- Execute this in your Supabase SQL Editor
+
+ALTER TABLE macro_history
+ADD COLUMN IF NOT EXISTS domestic_premium DECIMAL;
+
+COMMENT ON COLUMN macro_history.domestic_premium IS 'Shanghai gold (CNY/g, 518880.SS) minus COMEX GC=F converted at USD/CNY, on Shanghai sessions paired with the last COMEX close before the Shanghai close';
@@ -0,0 +1,109 @@
+-- Migration: OHLC rollup tiers + retention for market_history
+-- Execute this in your Supabase SQL Editor
+--
+-- Tiers: market_history (raw) -> 1m -> 15m -> 1h -> 1d
+-- rollup_market_history(p_since) rebuilds every bucket touched since p_since from the tier below it;
+-- prune_market_history(...) applies per-tier retention. Both are driven by backend/services/rollups.py.
+
+CREATE TABLE IF NOT EXISTS market_history_1m (
+    ticker TEXT NOT NULL,
+    bucket TIMESTAMPTZ NOT NULL,
+    open DECIMAL, high DECIMAL, low DECIMAL, close DECIMAL,
+    samples INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ticker, bucket)
+);
+CREATE TABLE IF NOT EXISTS market_history_15m (LIKE market_history_1m INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS market_history_1h (LIKE market_history_1m INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS market_history_1d (LIKE market_history_1m INCLUDING ALL);
+-- Rollups and retention scan raw points by time across all tickers
+CREATE INDEX IF NOT EXISTS idx_market_history_time ON market_history(timestamp);
+
+CREATE OR REPLACE FUNCTION rollup_market_history(p_since TIMESTAMPTZ)
+RETURNS INT AS $$
+DECLARE
+    total INT := 0;
+    n INT;
+BEGIN
+    -- raw -> 1m
+    INSERT INTO market_history_1m (ticker, bucket, open, high, low, close, samples)
+    SELECT ticker, date_trunc('minute', timestamp),
+           (array_agg(price ORDER BY timestamp))[1], MAX(price), MIN(price),
+           (array_agg(price ORDER BY timestamp DESC))[1], COUNT(*)
+      FROM market_history
+     WHERE timestamp >= date_trunc('minute', p_since)
+     GROUP BY 1, 2
+    ON CONFLICT (ticker, bucket) DO UPDATE
+       SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+           close = EXCLUDED.close, samples = EXCLUDED.samples;
+    GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+
+    -- 1m -> 15m
+    INSERT INTO market_history_15m (ticker, bucket, open, high, low, close, samples)
+    SELECT ticker, date_bin('15 minutes', bucket, TIMESTAMPTZ '2000-01-01'),
+           (array_agg(open ORDER BY bucket))[1], MAX(high), MIN(low),
+           (array_agg(close ORDER BY bucket DESC))[1], SUM(samples)
+      FROM market_history_1m
+     WHERE bucket >= date_bin('15 minutes', p_since, TIMESTAMPTZ '2000-01-01')
+     GROUP BY 1, 2
+    ON CONFLICT (ticker, bucket) DO UPDATE
+       SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+           close = EXCLUDED.close, samples = EXCLUDED.samples;
+    GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+
+    -- 15m -> 1h
+    INSERT INTO market_history_1h (ticker, bucket, open, high, low, close, samples)
+    SELECT ticker, date_trunc('hour', bucket),
+           (array_agg(open ORDER BY bucket))[1], MAX(high), MIN(low),
+           (array_agg(close ORDER BY bucket DESC))[1], SUM(samples)
+      FROM market_history_15m
+     WHERE bucket >= date_trunc('hour', p_since)
+     GROUP BY 1, 2
+    ON CONFLICT (ticker, bucket) DO UPDATE
+       SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+           close = EXCLUDED.close, samples = EXCLUDED.samples;
+    GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+
+    -- 1h -> 1d (UTC days)
+    INSERT INTO market_history_1d (ticker, bucket, open, high, low, close, samples)
+    SELECT ticker, date_trunc('day', bucket),
+           (array_agg(open ORDER BY bucket))[1], MAX(high), MIN(low),
+           (array_agg(close ORDER BY bucket DESC))[1], SUM(samples)
+      FROM market_history_1h
+     WHERE bucket >= date_trunc('day', p_since)
+     GROUP BY 1, 2
+    ON CONFLICT (ticker, bucket) DO UPDATE
+       SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+           close = EXCLUDED.close, samples = EXCLUDED.samples;
+    GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Deletes rows older than each tier's cutoff (NULL = keep forever); returns rows deleted
+CREATE OR REPLACE FUNCTION prune_market_history(p_raw_before TIMESTAMPTZ, p_1m_before TIMESTAMPTZ,
+                                                p_15m_before TIMESTAMPTZ, p_1h_before TIMESTAMPTZ)
+RETURNS INT AS $$
+DECLARE
+    total INT := 0;
+    n INT;
+BEGIN
+    IF p_raw_before IS NOT NULL THEN
+        DELETE FROM market_history WHERE timestamp < p_raw_before;
+        GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+    END IF;
+    IF p_1m_before IS NOT NULL THEN
+        DELETE FROM market_history_1m WHERE bucket < p_1m_before;
+        GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+    END IF;
+    IF p_15m_before IS NOT NULL THEN
+        DELETE FROM market_history_15m WHERE bucket < p_15m_before;
+        GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+    END IF;
+    IF p_1h_before IS NOT NULL THEN
+        DELETE FROM market_history_1h WHERE bucket < p_1h_before;
+        GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+    END IF;
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
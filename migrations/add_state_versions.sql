@@ -0,0 +1,72 @@
+-- Migration: Versioned dashboard state for /api/v1/full-state?since=<version>
+-- Execute this in your Supabase SQL Editor
+--
+-- Every write to a dashboard table takes the next value of one global sequence, so
+-- versions are monotonically increasing across sections. Heartbeat-only updates
+-- (timestamp column changed, nothing else) keep their old version. Stamping is
+-- serialized with a transaction-scoped advisory lock, so versions commit in order
+-- and `current` (the highest committed version) never passes an in-flight write.
+
+CREATE SEQUENCE IF NOT EXISTS dashboard_state_seq;
+
+CREATE OR REPLACE FUNCTION bump_state_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- TG_ARGV[0]: heartbeat column ignored when deciding whether the row changed
+    IF TG_OP = 'UPDATE'
+       AND (to_jsonb(NEW) - TG_ARGV[0] - 'state_version') = (to_jsonb(OLD) - TG_ARGV[0] - 'state_version') THEN
+        NEW.state_version := OLD.state_version;
+    ELSE
+        -- Held until commit: versions are handed out in commit order, so a version below
+        -- `current` can never become visible later (clients would skip it with ?since=)
+        PERFORM pg_advisory_xact_lock(hashtext('dashboard_state_seq'));
+        NEW.state_version := nextval('dashboard_state_seq');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE market_data_cache ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE macro_indicators ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE institutional_stats ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE daily_strategy_log ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE news_stream ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_market_data_cache_version ON market_data_cache(state_version);
+CREATE INDEX IF NOT EXISTS idx_macro_indicators_version ON macro_indicators(state_version);
+CREATE INDEX IF NOT EXISTS idx_institutional_stats_version ON institutional_stats(state_version);
+CREATE INDEX IF NOT EXISTS idx_daily_strategy_log_version ON daily_strategy_log(state_version);
+CREATE INDEX IF NOT EXISTS idx_news_stream_version ON news_stream(state_version);
+
+DROP TRIGGER IF EXISTS trg_market_data_cache_version ON market_data_cache;
+CREATE TRIGGER trg_market_data_cache_version BEFORE INSERT OR UPDATE ON market_data_cache
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('cached_at');
+DROP TRIGGER IF EXISTS trg_macro_indicators_version ON macro_indicators;
+CREATE TRIGGER trg_macro_indicators_version BEFORE INSERT OR UPDATE ON macro_indicators
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('last_updated');
+DROP TRIGGER IF EXISTS trg_institutional_stats_version ON institutional_stats;
+CREATE TRIGGER trg_institutional_stats_version BEFORE INSERT OR UPDATE ON institutional_stats
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('timestamp');
+DROP TRIGGER IF EXISTS trg_daily_strategy_log_version ON daily_strategy_log;
+CREATE TRIGGER trg_daily_strategy_log_version BEFORE INSERT OR UPDATE ON daily_strategy_log
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('created_at');
+DROP TRIGGER IF EXISTS trg_news_stream_version ON news_stream;
+CREATE TRIGGER trg_news_stream_version BEFORE INSERT OR UPDATE ON news_stream
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('id');
+
+-- Latest version per section plus the global one (what a client stores after each poll)
+CREATE OR REPLACE VIEW dashboard_versions AS
+SELECT
+    (SELECT COALESCE(MAX(state_version), 0) FROM market_data_cache) AS tickers,
+    (SELECT COALESCE(MAX(state_version), 0) FROM macro_indicators) AS macro,
+    (SELECT COALESCE(MAX(state_version), 0) FROM institutional_stats) AS institutional,
+    (SELECT COALESCE(MAX(state_version), 0) FROM daily_strategy_log WHERE log_date = CURRENT_DATE) AS today_strategy,
+    (SELECT COALESCE(MAX(state_version), 0) FROM news_stream) AS news,
+    -- Highest committed version (the sequence itself runs ahead of uncommitted writes)
+    GREATEST(
+        (SELECT COALESCE(MAX(state_version), 0) FROM market_data_cache),
+        (SELECT COALESCE(MAX(state_version), 0) FROM macro_indicators),
+        (SELECT COALESCE(MAX(state_version), 0) FROM institutional_stats),
+        (SELECT COALESCE(MAX(state_version), 0) FROM daily_strategy_log),
+        (SELECT COALESCE(MAX(state_version), 0) FROM news_stream)
+    ) AS current;
@@ -0,0 +1,57 @@
+-- Migration: Add sync_leases table + lease functions for sync job coordination
+-- Execute this in your Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS sync_leases (
+    job TEXT PRIMARY KEY, -- sync_all:0/1, sync_institutional, sync_macro_history, sync_news
+    holder TEXT,
+    token BIGINT NOT NULL DEFAULT 0, -- Fencing token, bumped on every acquisition
+    acquired_at TIMESTAMPTZ,
+    expires_at TIMESTAMPTZ,
+    released_at TIMESTAMPTZ,
+    last_result JSONB -- Report of the last completed run (returned to joining triggers)
+);
+
+-- Returns the new fencing token, or NULL while another holder has a live lease
+CREATE OR REPLACE FUNCTION acquire_sync_lease(p_job TEXT, p_holder TEXT, p_ttl_seconds INT)
+RETURNS BIGINT AS $$
+DECLARE
+    new_token BIGINT;
+BEGIN
+    INSERT INTO sync_leases (job) VALUES (p_job) ON CONFLICT (job) DO NOTHING;
+    UPDATE sync_leases
+       SET holder = p_holder,
+           token = token + 1,
+           acquired_at = NOW(),
+           expires_at = NOW() + make_interval(secs => p_ttl_seconds),
+           released_at = NULL
+     WHERE job = p_job
+       AND (released_at IS NOT NULL OR expires_at IS NULL OR expires_at < NOW())
+    RETURNING token INTO new_token;
+    RETURN new_token;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Extends a live lease; FALSE if the token is no longer current (the run must stop writing).
+-- Advisory: data writes are not fenced by the token, callers check this before each write batch
+CREATE OR REPLACE FUNCTION renew_sync_lease(p_job TEXT, p_token BIGINT, p_ttl_seconds INT)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE sync_leases
+       SET expires_at = NOW() + make_interval(secs => p_ttl_seconds)
+     WHERE job = p_job AND token = p_token AND released_at IS NULL;
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Releases the lease and stores the run's report; ignored for stale tokens
+CREATE OR REPLACE FUNCTION release_sync_lease(p_job TEXT, p_token BIGINT, p_result JSONB)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE sync_leases
+       SET released_at = NOW(),
+           expires_at = NOW(),
+           last_result = COALESCE(p_result, last_result)
+     WHERE job = p_job AND token = p_token AND released_at IS NULL;
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
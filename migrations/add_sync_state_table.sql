@@ -0,0 +1,10 @@
+-- Migration: Add sync_state key/value table for incremental sync bookkeeping
+-- Execute this in your Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value JSONB NOT NULL DEFAULT '{}'::jsonb,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+COMMENT ON TABLE sync_state IS 'Per-job sync bookkeeping, e.g. news_rss = { etag, last_modified, seen: [hash, ...] }';
@@ -0,0 +1,23 @@
+-- Migration: Realized volatility history (GC=F vs ^GVZ)
+-- Execute this in your Supabase SQL Editor
+--
+-- One row per COMEX session, refreshed by every sync while the session is open
+-- (backend/services/volatility.py). Volatilities are annualized percent, like ^GVZ.
+
+CREATE TABLE IF NOT EXISTS volatility_history (
+    id SERIAL PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    log_date DATE NOT NULL, -- Exchange trading day
+    open DECIMAL, high DECIMAL, low DECIMAL, close DECIMAL, -- Session OHLC (daily estimators)
+    rv_close_intraday DECIMAL, -- From the session's 1m bars
+    rv_parkinson_intraday DECIMAL,
+    rv_garman_klass_intraday DECIMAL,
+    rv_close_20d DECIMAL, -- Over the 20 completed sessions before log_date
+    rv_parkinson_20d DECIMAL,
+    rv_garman_klass_20d DECIMAL,
+    gvz DECIMAL, -- ^GVZ implied vol
+    gvz_spread DECIMAL, -- gvz - rv_garman_klass_20d
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE(ticker, log_date)
+);
+CREATE INDEX IF NOT EXISTS idx_volatility_history_ticker_date ON volatility_history(ticker, log_date DESC);
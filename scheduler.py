@@ -1,47 +1,257 @@
-
 import time
 import schedule
 import os
 import sys
+import argparse
+import multiprocessing
+import signal
+import threading
 from dotenv import load_dotenv
-from supabase import create_client
 
 # Ensure backend can be imported
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from backend.services.sync_service import GoldDataSyncer
+from backend.services.ticker_registry import get_registry
+from backend.services.write_buffer import WriteBehindBuffer
+from backend.services.storage import get_storage
+from backend.services.cassette import Cassette
+from backend.services.collector import Collector, serve, DEFAULT_INTERVAL, DEFAULT_WINDOW_HOURS, DEFAULT_PORT
+from backend.services.calculator import fetch_yahoo_quote
+from backend.profiling import maybe_profile
 
 load_dotenv(dotenv_path=".env.local")
 
-def run_sync():
-    print(f"[{time.strftime('%H:%M:%S')}] Starting sync...")
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
-    if not url or not key:
-        print("Error: Supabase credentials missing")
+# Per-process write-behind buffer (set by worker_loop when --write-behind is enabled)
+_write_buffer = None
+
+# One store per process (a connection pool for STORAGE_BACKEND=postgres)
+_storage = None
+
+def make_syncer():
+    global _storage
+    if _storage is None:
+        _storage = get_storage()
+    if _storage is None:
+        print("Error: storage not configured (Supabase credentials missing)")
+        return None
+    return GoldDataSyncer(_storage, write_buffer=_write_buffer)
+
+def run_sync(shard: int = 0, shards: int = 1):
+    """Hot tier + derived indicators (derived/institutional/correlations/alerts only on shard 0)."""
+    tag = f" [shard {shard}/{shards}]" if shards > 1 else ""
+    print(f"[{time.strftime('%H:%M:%S')}]{tag} Starting sync...")
+    try:
+        syncer = make_syncer()
+        if not syncer:
+            return
+        with maybe_profile(f"sync-hot-shard{shard}"):
+            syncer.sync_all(tiers=["hot"], shard=shard, shards=shards)
+            if shard == 0:
+                syncer.sync_institutional()
+                # No-op (no HTTP) until the next gold session has closed
+                syncer.sync_correlations()
+                syncer.sync_alerts()
+        print(f"[{time.strftime('%H:%M:%S')}]{tag} Sync completed.")
+    except Exception as e:
+        print(f"Sync error{tag}: {e}")
+
+def run_backfill_job(job: str, days: int, workers: int, force: bool = False):
+    """Backfill without a time budget; an interrupted run resumes from its checkpoints when restarted."""
+    syncer = make_syncer()
+    if not syncer:
         return
-        
+    report = syncer.backfill(job, days, workers=workers, force=force)
+    print(f"Backfill {job}: {report.get('completed', 0)} chunks, {report.get('rows', 0)} rows, "
+          f"{report.get('skipped', 0)} already done, {report.get('failed', 0)} failed")
+    for error in report.get("errors", []):
+        print(f"  {error}")
+
+def run_tier_sync(tier: str, shard: int = 0, shards: int = 1):
+    """Slower tiers only refresh their tickers in market_data_cache."""
     try:
-        supabase = create_client(url, key)
-        syncer = GoldDataSyncer(supabase)
-        syncer.sync_all()
-        syncer.sync_institutional()
-        print(f"[{time.strftime('%H:%M:%S')}] Sync completed.")
+        syncer = make_syncer()
+        if not syncer:
+            return
+        with maybe_profile(f"sync-{tier}-shard{shard}"):
+            report = syncer.sync_tickers(tiers=[tier], shard=shard, shards=shards)
+        print(f"[{time.strftime('%H:%M:%S')}] {tier} tier [shard {shard}/{shards}]: {len(report['updated'])} updated, {len(report['errors'])} errors")
     except Exception as e:
-        print(f"Sync error: {e}")
+        print(f"Tier sync error ({tier}): {e}")
 
-def main():
-    print("--- Goldtracer PRO Data Scheduler ---")
-    print("Running sync every 5 minutes...")
-    
+def run_rollups():
+    try:
+        syncer = make_syncer()
+        if not syncer:
+            return
+        report = syncer.sync_rollups()
+        print(f"[{time.strftime('%H:%M:%S')}] Rollups: {report['rolled_up']} buckets, {report['pruned']} pruned")
+    except Exception as e:
+        print(f"Rollup error: {e}")
+
+def enable_write_behind(write_behind: float):
+    global _write_buffer
+    if write_behind > 0 and _write_buffer is None:
+        store = get_storage()
+        if store is not None:
+            # Quote writes are coalesced and flushed every `write_behind` seconds (final flush at exit)
+            _write_buffer = WriteBehindBuffer(store, flush_interval=write_behind)
+
+def start_collector(interval: float, window_hours: float, host: str, port: int, write_behind: float):
+    """
+    Poll the hot tickers every `interval` seconds in a background thread and serve
+    latest quotes / sparklines from memory on host:port. Moved quotes of cached
+    tickers are forwarded to storage (through the write-behind buffer if enabled).
+    """
+    enable_write_behind(write_behind)
+    registry = get_registry()
+    hot = registry.select(source="yahoo", tiers=["hot"])
+    cached = {spec.symbol for spec in hot if spec.cache}
+    syncer = make_syncer()
+
+    def forward(rows):
+        rows = [r for r in rows if r["ticker"] in cached]
+        if rows and syncer:
+            syncer.write_quotes(rows)
+
+    collector = Collector(fetch_yahoo_quote, [spec.symbol for spec in hot], interval=interval,
+                          window_hours=window_hours, on_change=forward)
+    server = serve(collector, host, port)
+    threading.Thread(target=collector.run, name="collector", daemon=True).start()
+    print(f"Collector: {len(hot)} hot tickers every {interval:g}s, last {window_hours:g}h in memory, "
+          f"serving http://{host}:{server.server_port}/latest")
+    return collector
+
+def _exit_on_signal(signum, frame):
+    # SystemExit unwinds through the finally blocks, so buffered writes get flushed
+    raise SystemExit(128 + signum)
+
+def install_signal_handlers():
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    signal.signal(signal.SIGINT, _exit_on_signal)
+
+def close_write_buffer():
+    """Final flush; shard processes exit via os._exit, where the buffer's atexit hook never runs."""
+    global _write_buffer
+    if _write_buffer is not None:
+        _write_buffer.close()
+        _write_buffer = None
+
+def worker_loop(shard: int = 0, shards: int = 1, write_behind: float = 0):
+    install_signal_handlers()
+    enable_write_behind(write_behind)
+    try:
+        _worker_schedule(shard, shards)
+    finally:
+        close_write_buffer()
+
+def _worker_schedule(shard: int, shards: int):
     # Run once on startup
-    run_sync()
-    
-    schedule.every(5).minutes.do(run_sync)
-    
+    run_sync(shard, shards)
+
+    if shard == 0:
+        schedule.every(15).minutes.do(run_rollups)
+
+    tiers = get_registry().tiers
+    schedule.every(tiers.get("hot", 300)).seconds.do(run_sync, shard, shards)
+    for tier, seconds in tiers.items():
+        if tier != "hot":
+            run_tier_sync(tier, shard, shards)
+            schedule.every(seconds).seconds.do(run_tier_sync, tier, shard, shards)
+
     while True:
         schedule.run_pending()
         time.sleep(1)
 
+def run_once():
+    """A single pass over every tier (used with --record/--replay for repeatable runs)."""
+    started = time.perf_counter()
+    run_sync()
+    for tier in get_registry().tiers:
+        if tier != "hot":
+            run_tier_sync(tier)
+    print(f"Single sync pass took {time.perf_counter() - started:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Goldtracer PRO Data Scheduler")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SYNC_SHARDS", "1")),
+                        help="Number of worker processes; each syncs a deterministic slice of the ticker universe")
+    parser.add_argument("--write-behind", type=float, default=float(os.getenv("SYNC_WRITE_BEHIND", "0")),
+                        help="Buffer price writes and flush every N seconds (0 = write through)")
+    parser.add_argument("--profile", action="store_true", help="Profile every sync run (same as PROFILE_ENABLED=1)")
+    parser.add_argument("--once", action="store_true", help="Run one sync pass over all tiers and exit")
+    parser.add_argument("--record", metavar="CASSETTE", help="Record upstream HTTP traffic to a cassette file (implies --once)")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve upstream HTTP from a cassette file instead of the network (implies --once)")
+    parser.add_argument("--replay-latency", choices=["original", "zero"], default="zero",
+                        help="Replay with the recorded response times or instantly")
+    parser.add_argument("--collect", action="store_true",
+                        help="Also poll hot quotes at a sub-minute cadence and serve them from an in-memory ring buffer")
+    parser.add_argument("--collect-interval", type=float, default=float(os.getenv("COLLECT_INTERVAL", str(DEFAULT_INTERVAL))),
+                        help="Collector poll interval in seconds")
+    parser.add_argument("--collect-hours", type=float, default=float(os.getenv("COLLECT_WINDOW_HOURS", str(DEFAULT_WINDOW_HOURS))),
+                        help="Hours of ticks kept per ticker")
+    parser.add_argument("--collect-host", default=os.getenv("COLLECT_HOST", "127.0.0.1"), help="Collector HTTP bind address")
+    parser.add_argument("--collect-port", type=int, default=int(os.getenv("COLLECT_PORT", str(DEFAULT_PORT))),
+                        help="Collector HTTP port")
+    parser.add_argument("--backfill", metavar="JOB",
+                        help="Run a resumable backfill to completion and exit (macro_history or market_history:<res>:<ticker>)")
+    parser.add_argument("--backfill-days", type=int, default=365, help="Days of history to backfill")
+    parser.add_argument("--backfill-workers", type=int, default=4, help="Chunks fetched in parallel (still rate limited per upstream)")
+    parser.add_argument("--force", action="store_true", help="Backfill again even the chunks already marked done")
+    args = parser.parse_args()
+    install_signal_handlers()
+    if args.profile:
+        os.environ["PROFILE_ENABLED"] = "1"
+
+    print("--- Goldtracer PRO Data Scheduler ---")
+    print(f"Universe: {len(get_registry())} tickers | Tiers: {get_registry().tiers}")
+
+    if args.backfill:
+        run_backfill_job(args.backfill, args.backfill_days, args.backfill_workers, args.force)
+        return
+
+    if args.once or args.record or args.replay:
+        cassette = None
+        if args.record:
+            cassette = Cassette(args.record, "record").install()
+        elif args.replay:
+            cassette = Cassette(args.replay, "replay", args.replay_latency).install()
+        try:
+            run_once()
+        finally:
+            if cassette:
+                cassette.uninstall()
+        return
+
+    def collect(write_behind: float):
+        if args.collect:
+            # Sub-minute ticks produce many small writes: buffer them unless a flush interval was given
+            start_collector(args.collect_interval, args.collect_hours, args.collect_host, args.collect_port,
+                            write_behind if write_behind > 0 else 5.0)
+
+    if args.shards <= 1:
+        collect(args.write_behind)
+        print("Running hot sync every 5 minutes...")
+        worker_loop(write_behind=args.write_behind)
+        return
+
+    print(f"Sharded mode: {args.shards} worker processes")
+    workers = [multiprocessing.Process(target=worker_loop, args=(i, args.shards, args.write_behind), daemon=True) for i in range(args.shards)]
+    for w in workers:
+        w.start()
+    try:
+        # Started after the fork so the workers don't inherit its threads or storage connections
+        collect(args.write_behind)
+        for w in workers:
+            w.join()
+    finally:
+        # SIGTERM lets each shard flush its buffer before it exits
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+        for w in workers:
+            w.join(timeout=30)
+        close_write_buffer()
+
 if __name__ == "__main__":
     main()
@@ -55,6 +55,110 @@ CREATE TABLE market_history (
 );
 CREATE INDEX idx_market_history_ticker_time ON market_history(ticker, timestamp DESC);
 
+-- 5.1 OHLC Rollup Tiers for market_history (raw -> 1m -> 15m -> 1h -> 1d, see backend/services/rollups.py)
+CREATE TABLE market_history_1m (
+    ticker TEXT NOT NULL,
+    bucket TIMESTAMPTZ NOT NULL,
+    open DECIMAL, high DECIMAL, low DECIMAL, close DECIMAL,
+    samples INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (ticker, bucket)
+);
+CREATE TABLE market_history_15m (LIKE market_history_1m INCLUDING ALL);
+CREATE TABLE market_history_1h (LIKE market_history_1m INCLUDING ALL);
+CREATE TABLE market_history_1d (LIKE market_history_1m INCLUDING ALL);
+-- Rollups and retention scan raw points by time across all tickers
+CREATE INDEX idx_market_history_time ON market_history(timestamp);
+
+CREATE OR REPLACE FUNCTION rollup_market_history(p_since TIMESTAMPTZ)
+RETURNS INT AS $$
+DECLARE
+    total INT := 0;
+    n INT;
+BEGIN
+    -- raw -> 1m
+    INSERT INTO market_history_1m (ticker, bucket, open, high, low, close, samples)
+    SELECT ticker, date_trunc('minute', timestamp),
+           (array_agg(price ORDER BY timestamp))[1], MAX(price), MIN(price),
+           (array_agg(price ORDER BY timestamp DESC))[1], COUNT(*)
+      FROM market_history
+     WHERE timestamp >= date_trunc('minute', p_since)
+     GROUP BY 1, 2
+    ON CONFLICT (ticker, bucket) DO UPDATE
+       SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+           close = EXCLUDED.close, samples = EXCLUDED.samples;
+    GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+
+    -- 1m -> 15m
+    INSERT INTO market_history_15m (ticker, bucket, open, high, low, close, samples)
+    SELECT ticker, date_bin('15 minutes', bucket, TIMESTAMPTZ '2000-01-01'),
+           (array_agg(open ORDER BY bucket))[1], MAX(high), MIN(low),
+           (array_agg(close ORDER BY bucket DESC))[1], SUM(samples)
+      FROM market_history_1m
+     WHERE bucket >= date_bin('15 minutes', p_since, TIMESTAMPTZ '2000-01-01')
+     GROUP BY 1, 2
+    ON CONFLICT (ticker, bucket) DO UPDATE
+       SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+           close = EXCLUDED.close, samples = EXCLUDED.samples;
+    GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+
+    -- 15m -> 1h
+    INSERT INTO market_history_1h (ticker, bucket, open, high, low, close, samples)
+    SELECT ticker, date_trunc('hour', bucket),
+           (array_agg(open ORDER BY bucket))[1], MAX(high), MIN(low),
+           (array_agg(close ORDER BY bucket DESC))[1], SUM(samples)
+      FROM market_history_15m
+     WHERE bucket >= date_trunc('hour', p_since)
+     GROUP BY 1, 2
+    ON CONFLICT (ticker, bucket) DO UPDATE
+       SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+           close = EXCLUDED.close, samples = EXCLUDED.samples;
+    GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+
+    -- 1h -> 1d (UTC days)
+    INSERT INTO market_history_1d (ticker, bucket, open, high, low, close, samples)
+    SELECT ticker, date_trunc('day', bucket),
+           (array_agg(open ORDER BY bucket))[1], MAX(high), MIN(low),
+           (array_agg(close ORDER BY bucket DESC))[1], SUM(samples)
+      FROM market_history_1h
+     WHERE bucket >= date_trunc('day', p_since)
+     GROUP BY 1, 2
+    ON CONFLICT (ticker, bucket) DO UPDATE
+       SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+           close = EXCLUDED.close, samples = EXCLUDED.samples;
+    GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Deletes rows older than each tier's cutoff (NULL = keep forever); returns rows deleted
+CREATE OR REPLACE FUNCTION prune_market_history(p_raw_before TIMESTAMPTZ, p_1m_before TIMESTAMPTZ,
+                                                p_15m_before TIMESTAMPTZ, p_1h_before TIMESTAMPTZ)
+RETURNS INT AS $$
+DECLARE
+    total INT := 0;
+    n INT;
+BEGIN
+    IF p_raw_before IS NOT NULL THEN
+        DELETE FROM market_history WHERE timestamp < p_raw_before;
+        GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+    END IF;
+    IF p_1m_before IS NOT NULL THEN
+        DELETE FROM market_history_1m WHERE bucket < p_1m_before;
+        GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+    END IF;
+    IF p_15m_before IS NOT NULL THEN
+        DELETE FROM market_history_15m WHERE bucket < p_15m_before;
+        GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+    END IF;
+    IF p_1h_before IS NOT NULL THEN
+        DELETE FROM market_history_1h WHERE bucket < p_1h_before;
+        GET DIAGNOSTICS n = ROW_COUNT; total := total + n;
+    END IF;
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
 -- 6. Macro History Data (3-Line Chart: Nominal, Breakeven, Real)
 CREATE TABLE macro_history (
     id SERIAL PRIMARY KEY,
@@ -62,10 +166,71 @@ CREATE TABLE macro_history (
     nominal_yield DECIMAL,
     breakeven_inflation DECIMAL,
     real_yield DECIMAL,
+    domestic_premium DECIMAL, -- Shanghai close vs last COMEX close (CNY/g)
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 CREATE INDEX idx_macro_history_date ON macro_history(log_date DESC);
 
+-- 6.1 Realized Volatility History (GC=F vs ^GVZ, annualized %, see backend/services/volatility.py)
+CREATE TABLE volatility_history (
+    id SERIAL PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    log_date DATE NOT NULL, -- Exchange trading day
+    open DECIMAL, high DECIMAL, low DECIMAL, close DECIMAL, -- Session OHLC (daily estimators)
+    rv_close_intraday DECIMAL, -- From the session's 1m bars
+    rv_parkinson_intraday DECIMAL,
+    rv_garman_klass_intraday DECIMAL,
+    rv_close_20d DECIMAL, -- Over the 20 completed sessions before log_date
+    rv_parkinson_20d DECIMAL,
+    rv_garman_klass_20d DECIMAL,
+    gvz DECIMAL, -- ^GVZ implied vol
+    gvz_spread DECIMAL, -- gvz - rv_garman_klass_20d
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE(ticker, log_date)
+);
+CREATE INDEX idx_volatility_history_ticker_date ON volatility_history(ticker, log_date DESC);
+
+-- 6.2 Alerts: user rules (built-ins in backend/config/alerts.json) + delivery outbox, see backend/services/alerts.py
+CREATE TABLE alert_rules (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    conditions JSONB NOT NULL, -- [{"metric": "RSI_14", "op": ">", "value": 75, "clear": 70}], all must hold
+    for_seconds INT NOT NULL DEFAULT 0, -- Debounce: conditions must hold this long before firing
+    severity TEXT DEFAULT 'warning',
+    webhook TEXT, -- Overrides ALERT_WEBHOOK_URL
+    enabled BOOLEAN NOT NULL DEFAULT TRUE, -- Disabled instead of deleted (MAX(updated_at) drives reloads)
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE INDEX idx_alert_rules_updated ON alert_rules(updated_at DESC);
+
+CREATE TABLE alert_events (
+    id BIGSERIAL PRIMARY KEY,
+    rule_id TEXT NOT NULL,
+    status TEXT NOT NULL, -- fired, resolved
+    sink TEXT, -- Webhook URL (NULL: no sink configured, dropped)
+    payload JSONB NOT NULL,
+    delivery TEXT NOT NULL DEFAULT 'pending', -- pending, delivered, dead, dropped
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ DEFAULT NOW(),
+    last_error TEXT,
+    delivered_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE INDEX idx_alert_events_due ON alert_events(next_attempt_at) WHERE delivery = 'pending';
+
+-- 6.3 Backfill checkpoints: one row per (job, chunk), see backend/services/backfill.py
+CREATE TABLE backfill_chunks (
+    job TEXT NOT NULL, -- e.g. macro_history, market_history:1d:GC=F
+    chunk_start DATE NOT NULL,
+    chunk_end DATE NOT NULL, -- Exclusive
+    status TEXT NOT NULL, -- done | partial | failed
+    rows_written INT NOT NULL DEFAULT 0,
+    attempts INT NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (job, chunk_start)
+);
+
 -- 7. Real-time News & Intel Stream
 CREATE TABLE news_stream (
     id SERIAL PRIMARY KEY,
@@ -78,6 +243,69 @@ CREATE TABLE news_stream (
     UNIQUE(title, published_at)
 );
 
+-- 8. Sync Bookkeeping (HTTP validators, seen-item indexes, cached upstream results)
+CREATE TABLE sync_state (
+    key TEXT PRIMARY KEY, -- news_rss, ...
+    value JSONB NOT NULL DEFAULT '{}'::jsonb,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- 9. Sync Job Leases (one row per job, fencing token bumped per acquisition)
+CREATE TABLE sync_leases (
+    job TEXT PRIMARY KEY, -- sync_all:0/1, sync_institutional, sync_macro_history, sync_news
+    holder TEXT,
+    token BIGINT NOT NULL DEFAULT 0, -- Fencing token, bumped on every acquisition
+    acquired_at TIMESTAMPTZ,
+    expires_at TIMESTAMPTZ,
+    released_at TIMESTAMPTZ,
+    last_result JSONB -- Report of the last completed run (returned to joining triggers)
+);
+
+-- Returns the new fencing token, or NULL while another holder has a live lease
+CREATE OR REPLACE FUNCTION acquire_sync_lease(p_job TEXT, p_holder TEXT, p_ttl_seconds INT)
+RETURNS BIGINT AS $$
+DECLARE
+    new_token BIGINT;
+BEGIN
+    INSERT INTO sync_leases (job) VALUES (p_job) ON CONFLICT (job) DO NOTHING;
+    UPDATE sync_leases
+       SET holder = p_holder,
+           token = token + 1,
+           acquired_at = NOW(),
+           expires_at = NOW() + make_interval(secs => p_ttl_seconds),
+           released_at = NULL
+     WHERE job = p_job
+       AND (released_at IS NOT NULL OR expires_at IS NULL OR expires_at < NOW())
+    RETURNING token INTO new_token;
+    RETURN new_token;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Extends a live lease; FALSE if the token is no longer current (the run must stop writing).
+-- Advisory: data writes are not fenced by the token, callers check this before each write batch
+CREATE OR REPLACE FUNCTION renew_sync_lease(p_job TEXT, p_token BIGINT, p_ttl_seconds INT)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE sync_leases
+       SET expires_at = NOW() + make_interval(secs => p_ttl_seconds)
+     WHERE job = p_job AND token = p_token AND released_at IS NULL;
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Releases the lease and stores the run's report; ignored for stale tokens
+CREATE OR REPLACE FUNCTION release_sync_lease(p_job TEXT, p_token BIGINT, p_result JSONB)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE sync_leases
+       SET released_at = NOW(),
+           expires_at = NOW(),
+           last_result = COALESCE(p_result, last_result)
+     WHERE job = p_job AND token = p_token AND released_at IS NULL;
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Helper table for "Mega-Endpoint" quick fetch
 DROP VIEW IF EXISTS latest_dashboard_state;
 CREATE VIEW latest_dashboard_state AS
@@ -88,4 +316,67 @@ SELECT
     (SELECT row_to_json(d) FROM daily_strategy_log d WHERE log_date = CURRENT_DATE) as today_strategy,
     (SELECT json_agg(n) FROM (SELECT * FROM news_stream ORDER BY published_at DESC LIMIT 15) n) as news;
 
+-- Versioned Dashboard State (delta polling via /api/v1/full-state?since=<version>)
+CREATE SEQUENCE IF NOT EXISTS dashboard_state_seq;
+
+CREATE OR REPLACE FUNCTION bump_state_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- TG_ARGV[0]: heartbeat column ignored when deciding whether the row changed
+    IF TG_OP = 'UPDATE'
+       AND (to_jsonb(NEW) - TG_ARGV[0] - 'state_version') = (to_jsonb(OLD) - TG_ARGV[0] - 'state_version') THEN
+        NEW.state_version := OLD.state_version;
+    ELSE
+        -- Held until commit: versions are handed out in commit order, so a version below
+        -- `current` can never become visible later (clients would skip it with ?since=)
+        PERFORM pg_advisory_xact_lock(hashtext('dashboard_state_seq'));
+        NEW.state_version := nextval('dashboard_state_seq');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE market_data_cache ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE macro_indicators ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE institutional_stats ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE daily_strategy_log ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE news_stream ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_market_data_cache_version ON market_data_cache(state_version);
+CREATE INDEX IF NOT EXISTS idx_macro_indicators_version ON macro_indicators(state_version);
+CREATE INDEX IF NOT EXISTS idx_institutional_stats_version ON institutional_stats(state_version);
+CREATE INDEX IF NOT EXISTS idx_daily_strategy_log_version ON daily_strategy_log(state_version);
+CREATE INDEX IF NOT EXISTS idx_news_stream_version ON news_stream(state_version);
+
+DROP TRIGGER IF EXISTS trg_market_data_cache_version ON market_data_cache;
+CREATE TRIGGER trg_market_data_cache_version BEFORE INSERT OR UPDATE ON market_data_cache
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('cached_at');
+DROP TRIGGER IF EXISTS trg_macro_indicators_version ON macro_indicators;
+CREATE TRIGGER trg_macro_indicators_version BEFORE INSERT OR UPDATE ON macro_indicators
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('last_updated');
+DROP TRIGGER IF EXISTS trg_institutional_stats_version ON institutional_stats;
+CREATE TRIGGER trg_institutional_stats_version BEFORE INSERT OR UPDATE ON institutional_stats
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('timestamp');
+DROP TRIGGER IF EXISTS trg_daily_strategy_log_version ON daily_strategy_log;
+CREATE TRIGGER trg_daily_strategy_log_version BEFORE INSERT OR UPDATE ON daily_strategy_log
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('created_at');
+DROP TRIGGER IF EXISTS trg_news_stream_version ON news_stream;
+CREATE TRIGGER trg_news_stream_version BEFORE INSERT OR UPDATE ON news_stream
+    FOR EACH ROW EXECUTE FUNCTION bump_state_version('id');
 
+-- Latest version per section plus the global one (what a client stores after each poll)
+CREATE OR REPLACE VIEW dashboard_versions AS
+SELECT
+    (SELECT COALESCE(MAX(state_version), 0) FROM market_data_cache) AS tickers,
+    (SELECT COALESCE(MAX(state_version), 0) FROM macro_indicators) AS macro,
+    (SELECT COALESCE(MAX(state_version), 0) FROM institutional_stats) AS institutional,
+    (SELECT COALESCE(MAX(state_version), 0) FROM daily_strategy_log WHERE log_date = CURRENT_DATE) AS today_strategy,
+    (SELECT COALESCE(MAX(state_version), 0) FROM news_stream) AS news,
+    -- Highest committed version (the sequence itself runs ahead of uncommitted writes)
+    GREATEST(
+        (SELECT COALESCE(MAX(state_version), 0) FROM market_data_cache),
+        (SELECT COALESCE(MAX(state_version), 0) FROM macro_indicators),
+        (SELECT COALESCE(MAX(state_version), 0) FROM institutional_stats),
+        (SELECT COALESCE(MAX(state_version), 0) FROM daily_strategy_log),
+        (SELECT COALESCE(MAX(state_version), 0) FROM news_stream)
+    ) AS current;